@@ -0,0 +1,151 @@
+"""
+Bluetooth receive jitter in the event loop while CPU-heavy work runs alongside it.
+
+A separate process plays Frame: it sends audio-sized packets (--mtu bytes every
+--interval ms, about the 8kHz/16-bit audio stream) stamped with their send time over a
+socket the event loop watches, the way Bluetooth notifications reach FrameMsg. Meanwhile
+the loop keeps doing the app's CPU-heavy work: converting a 10s recording to a WAV file,
+preparing a 720px photo for the model, rasterizing it into display sprites and rendering
+an answer with TxTextSpriteBlock (a per-pixel Python loop that holds the GIL), run
+
+    inline     in the event loop (recordings and sprites were converted like this)
+    threads    in asyncio.to_thread (photos were prepared like this)
+    processes  in a WorkerPool, payloads shared through shared memory
+
+and reports how late packets were handled. Late handling is what backs up tap and audio
+packets on a busy host.
+
+Usage:
+    python -m benchmarks.ble_jitter [--duration 10] [--interval 15] [--mtu 240] [--workers 2]
+"""
+import argparse
+import asyncio
+import io
+import multiprocessing
+import socket
+import struct
+import time
+
+import numpy as np
+from frame_msg import TxTextSpriteBlock
+from PIL import Image
+
+from benchmarks.progressive_photo import synthetic_photos
+from utils.audio_format import DEFAULT_FORMAT, pcm_to_wav
+from utils.sprite import convert_image
+from utils.vision import prepare_image_for_model
+from utils.worker_pool import WorkerPool
+
+ANSWER = ("The quickest way there is the number twelve bus\nfrom across the road, changing at the\n"
+          "station. It runs every ten minutes and\ntakes about half an hour.")
+
+# Packets handled this much later than sent count as late
+LATE_THRESHOLD = 0.050
+
+def send_packets(sock: socket.socket, duration: float, interval: float, mtu: int) -> None:
+    """Sender process: one packet every interval seconds, stamped with time.monotonic()."""
+    padding = bytes(mtu - 8)
+    start = time.monotonic()
+    sent = 0
+    while (now := time.monotonic()) - start < duration:
+        sock.send(struct.pack('<d', now) + padding)
+        sent += 1
+        time.sleep(max(0.0, start + sent * interval - time.monotonic()))
+    sock.close()
+
+def rasterize_photo(jpeg_bytes) -> bytes:
+    """Decode a photo and convert it into display sprite messages."""
+    conversion = convert_image(Image.open(io.BytesIO(jpeg_bytes)), dither='floyd-steinberg')
+    return b''.join(conversion.messages)
+
+def rasterize_text(text) -> bytes:
+    """Render text into sprites with TxTextSpriteBlock, as for a custom font."""
+    block = TxTextSpriteBlock(width=640, font_size=40, max_display_rows=6, text=str(text, 'utf-8'))
+    return block.pack() + b''.join(sprite.pack() for sprite in block.sprites)
+
+async def run_jobs(mode: str, pool: WorkerPool | None, pcm: bytes, photo: bytes) -> None:
+    """One interaction's worth of CPU-heavy work."""
+    jobs = [(pcm_to_wav, pcm, DEFAULT_FORMAT), (prepare_image_for_model, photo, 512),
+            (rasterize_photo, photo), (rasterize_text, ANSWER.encode('utf-8'))]
+    if mode == 'inline':
+        for function, *args in jobs:
+            function(*args)
+    elif mode == 'threads':
+        await asyncio.gather(*(asyncio.to_thread(*job) for job in jobs))
+    else:
+        await asyncio.gather(*(pool.submit(*job) for job in jobs))
+
+async def measure(mode: str | None, args, pool: WorkerPool | None, pcm: bytes, photo: bytes) -> tuple[np.ndarray, int]:
+    """
+    Receive one sender's packets while running mode's jobs back to back (None: no load).
+
+    Returns:
+        tuple: (handling delay of each packet in seconds, interactions processed)
+    """
+    loop = asyncio.get_running_loop()
+    receiver, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    receiver.setblocking(False)
+    delays = []
+    finished = asyncio.Event()
+
+    def on_packet():
+        now = time.monotonic()
+        while True:
+            try:
+                packet = receiver.recv(args.mtu)
+            except BlockingIOError:
+                return
+            if not packet:
+                loop.remove_reader(receiver.fileno())
+                finished.set()
+                return
+            delays.append(now - struct.unpack_from('<d', packet)[0])
+
+    loop.add_reader(receiver.fileno(), on_packet)
+    process = multiprocessing.get_context('spawn').Process(
+        target=send_packets, args=(sender, args.duration, args.interval / 1000, args.mtu))
+    process.start()
+    sender.close()
+
+    interactions = 0
+    while not finished.is_set():
+        if mode is None:
+            await asyncio.sleep(0.1)
+            continue
+        await run_jobs(mode, pool, pcm, photo)
+        interactions += 1
+        # let packets that queued up during an inline job be handled before the next one
+        await asyncio.sleep(0)
+
+    await asyncio.to_thread(process.join)
+    receiver.close()
+    return np.array(delays), interactions
+
+async def run(args) -> None:
+    rng = np.random.default_rng(0)
+    pcm = rng.integers(-3000, 3000, 8000 * 10, dtype=np.int16).astype('<i2').tobytes()
+    photo = synthetic_photos(1)[0]
+    pool = WorkerPool(args.workers)
+    await pool.start()
+
+    print(f"{args.duration:g}s of {args.mtu}-byte packets every {args.interval:g}ms; handling delay per packet")
+    print(f"{'load':<10} {'packets':>7} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'late':>6} {'interactions/s':>15}")
+    for mode in (None, 'inline', 'threads', 'processes'):
+        delays, interactions = await measure(mode, args, pool, pcm, photo)
+        p50, p99 = np.percentile(delays, [50, 99]) * 1000
+        print(f"{mode or 'idle':<10} {len(delays):>7} {p50:>7.2f} {p99:>7.2f} {delays.max() * 1000:>7.1f} "
+              f"{np.mean(delays > LATE_THRESHOLD):>6.1%} {interactions / args.duration:>15.1f}")
+    print(pool.report())
+    await pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per load')
+    parser.add_argument('--interval', type=float, default=15.0, help='milliseconds between packets')
+    parser.add_argument('--mtu', type=int, default=240)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Bytes on air and Frameside decode time of compact text pages against plain TxPlainText.
+
+Typical answers are laid out into display pages as display_text_safely() does, and each
+page (and each of the app's status strings) is packed both ways; pack_text() picks the
+smaller, so "compact" counts the pages it would send plain too. Bytes include the
+3-byte message header send_message() adds, and airtime is at --throughput. Packets are
+the Bluetooth writes send_message() splits each message into at --mtu; every one is
+also a notification Frame's data handler has to process, so fewer bytes only save
+anything on Frame when they mean fewer packets.
+
+Decoding runs the deployed lua/compact_text.lua and plain_text.min.lua in the Lua
+harness (see utils/lua_harness.py) and checks every page decodes back to its text;
+times are host CPU, so only compare them with each other. The memory figure is what
+the compact text parser and its dictionary keep on Frame once loaded.
+
+Needs lupa (pip install lupa) for the decode measurements.
+
+Usage:
+    python -m benchmarks.compact_text [--throughput 15000] [--mtu 240] [--repeat 2000]
+"""
+import argparse
+
+from frame_msg import TxPlainText
+
+from utils.capture_policy import DEFAULT_THROUGHPUT
+from utils.compact_text import (COMPACT_TEXT_CHANNEL, DICTIONARY, DICTIONARY_FILE, TxCompactText, dictionary_lua,
+                                pack_text)
+from utils.lua_harness import DEFAULT_MTU, LuaHarness
+from utils.message import MESSAGE_HEADER_SIZE
+from utils.text import format_text_for_frame
+
+ANSWERS = [
+    "The Eiffel Tower is about 330 metres tall, including its antennas. It was the tallest "
+    "structure in the world until 1930, when the Chrysler Building in New York overtook it.",
+    "Ice floats because water expands as it freezes. The molecules lock into a crystal lattice "
+    "that holds them further apart than in the liquid, so ice is less dense than the water around it.",
+    "A heat pump moves heat rather than making it. It uses electricity to run a compressor, and "
+    "for every unit of energy it uses it can move three or four units of heat from the air or "
+    "ground outside into your home, which is why it's more efficient than a heater.",
+    "If you move every few years, renting is usually the better choice. Buying has large costs "
+    "up front, such as fees and taxes, that take several years to recover, and selling quickly "
+    "can mean a loss if prices fall. Renting also makes it easier to move for work.",
+    "For a three day trip to Lisbon, spend the first day walking around Alfama and the castle, "
+    "the second in Belem for the monastery and the famous custard tarts, and the third at the "
+    "Time Out market and along the river. Take tram 28 at least once, early in the morning.",
+    "Electric cars lose some of their range in cold weather, often around a fifth, because the "
+    "battery is less efficient and heating the cabin uses energy. Preheating while plugged in "
+    "helps. They do start reliably in the cold and need less maintenance than petrol cars.",
+    "To get there, take the number twelve bus from across the road and change at the station. "
+    "It runs every ten minutes and the whole journey takes about half an hour.",
+    "Dracula was written by Bram Stoker, an Irish author, and published in 1897. It wasn't the "
+    "first vampire novel, but it is the one that shaped most of the vampire stories that followed.",
+    "You should water most houseplants when the top few centimetres of soil are dry. Check with "
+    "your finger rather than watering on a schedule, since plants need much less in winter.",
+    "The main difference is that a virus needs a host cell to reproduce, while bacteria are "
+    "living cells that can reproduce on their own. This is why antibiotics work against "
+    "bacteria but not against viruses like the flu or a cold.",
+    "Sourdough rises with wild yeast and bacteria from a starter instead of baker's yeast. The "
+    "bacteria give it its sour taste, and the long, slow rise makes the bread keep for longer.",
+    "It's eight degrees and cloudy right now, with light rain expected this afternoon. Take an "
+    "umbrella if you're going out later, as it should stay wet until the evening.",
+]
+
+STATUS_STRINGS = ["Tap to record", "Recording...", "Processing...", "Nothing to repeat", "Battery: 80%"]
+
+def pages() -> list[str]:
+    """Every display page of the answers, laid out as display_text_safely() does."""
+    return [page for answer in ANSWERS for page in format_text_for_frame(answer, max_lines=6)]
+
+def packets(payload_size: int, mtu: int) -> int:
+    """Bluetooth writes send_message() needs for a payload: the first carries the 3-byte header, the rest 1."""
+    return 1 + max(0, -(-(payload_size - (mtu - MESSAGE_HEADER_SIZE)) // (mtu - 1)))
+
+def measure_bytes(texts: list[str], throughput: float, mtu: int) -> None:
+    plain_bytes = compact_bytes = plain_sent = plain_packets = compact_packets = 0
+    for text in texts:
+        plain_payload = TxPlainText(text).pack()
+        plain_bytes += MESSAGE_HEADER_SIZE + len(plain_payload)
+        plain_packets += packets(len(plain_payload), mtu)
+        msg_code, payload = pack_text(text)
+        compact_bytes += MESSAGE_HEADER_SIZE + len(payload)
+        compact_packets += packets(len(payload), mtu)
+        plain_sent += msg_code != COMPACT_TEXT_CHANNEL
+    print(f"{len(texts):>5} {plain_bytes:>8} {compact_bytes:>8} {1 - compact_bytes / plain_bytes:>7.1%} "
+          f"{plain_sent:>10} {(plain_bytes - compact_bytes) / len(texts) / throughput * 1000:>16.2f}ms "
+          f"{plain_packets:>8} {compact_packets:>8}")
+
+def measure_decoding(texts: list[str], repeat: int) -> None:
+    harness = LuaHarness('lua/tap_audio.lua', files={DICTIONARY_FILE: dictionary_lua()})
+    lua = harness.lua
+    plain_payloads = [TxPlainText(text).pack() for text in texts]
+    compact_payloads = [TxCompactText(text).pack() for text in texts]
+
+    memory = lua.execute(b"""
+        plain_text = require('plain_text.min')
+        harness_collect()
+        local before = harness_memory()
+        compact_text = require('compact_text')
+        harness_collect()
+        return harness_memory() - before
+    """)
+    time_parses = lua.execute(b"""
+        return function(parse, payloads, passes)
+            local start = os.clock()
+            for _ = 1, passes do
+                for i = 1, #payloads do
+                    parse(payloads[i])
+                end
+                harness_collect()
+            end
+            return (os.clock() - start) / (passes * #payloads)
+        end
+    """)
+    parse_compact = lua.globals()[b'compact_text'][b'parse_compact_text']
+    for text, payload in zip(texts, compact_payloads):
+        decoded = parse_compact(payload)[b'string'].decode('utf-8')
+        if decoded != text:
+            raise SystemExit(f"Decoded {decoded!r}, expected {text!r}")
+
+    plain = time_parses(lua.globals()[b'plain_text'][b'parse_plain_text'], lua.table(*plain_payloads), repeat)
+    compact = time_parses(parse_compact, lua.table(*compact_payloads), repeat)
+    print(f"parse per page: plain {plain * 1e6:.1f}us, compact {compact * 1e6:.1f}us (host CPU); "
+          f"compact_text and its {len(DICTIONARY)}-token dictionary hold {memory:.1f} KB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--throughput', type=float, default=DEFAULT_THROUGHPUT, help='Bluetooth bytes/s')
+    parser.add_argument('--mtu', type=int, default=DEFAULT_MTU, help='Bluetooth payload bytes per write')
+    parser.add_argument('--repeat', type=int, default=2000, help='passes over the pages when timing decoding')
+    args = parser.parse_args()
+
+    answer_pages = pages()
+    print(f"{'':<16} {'pages':>5} {'plain B':>8} {'compact':>8} {'saved':>7} {'sent plain':>10} {'airtime saved/page':>18} "
+          f"{'plain pk':>8} {'compact':>8}")
+    print(f"{'answers':<16}", end=' ')
+    measure_bytes(answer_pages, args.throughput, args.mtu)
+    print(f"{'status strings':<16}", end=' ')
+    measure_bytes(STATUS_STRINGS, args.throughput, args.mtu)
+    measure_decoding(answer_pages, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Connection reuse of the shared HTTP client against a local HTTP stand-in.
+
+Starts a minimal keep-alive HTTP/1.1 server on localhost that counts the TCP
+connections it accepts, then compares:
+
+  * a fresh client per request (a cold connection every time), and
+  * the shared pooled client from utils.http_client, pre-warmed like on a tap.
+
+Usage:
+    python -m benchmarks.http_reuse [--requests 20] [--handshake-ms 50]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from utils import http_client
+
+class StandInServer:
+    """Keep-alive HTTP/1.1 server that counts connections and answers every request with {}."""
+
+    def __init__(self, handshake_delay: float):
+        # simulated TCP/TLS setup cost, paid once per new connection
+        self.handshake_delay = handshake_delay
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await asyncio.sleep(self.handshake_delay)
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                # HEAD responses (used for pre-warming) must not carry a body
+                body = b'' if head.startswith(b'HEAD') else b'{}'
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n' + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+async def run(requests: int, handshake_delay: float) -> None:
+    stand_in = StandInServer(handshake_delay)
+    server = await asyncio.start_server(stand_in.handle, '127.0.0.1', 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1/audio/transcriptions"
+
+    async with server:
+        # baseline: a new client, and so a new connection, for every request
+        start = time.perf_counter()
+        for _ in range(requests):
+            async with httpx.AsyncClient() as client:
+                await client.post(url, content=b'x' * 1024)
+        cold = (time.perf_counter() - start) / requests
+        cold_connections = stand_in.connections
+
+        # shared pool, pre-warmed before the first request as tap_audio does on a tap
+        stand_in.connections = 0
+        await http_client.prewarm_connection(url)
+        start = time.perf_counter()
+        for _ in range(requests):
+            await http_client.get_http_client().post(url, content=b'x' * 1024)
+        warm = (time.perf_counter() - start) / requests
+        await http_client.close_http_client()
+
+    print(f"Requests per mode:         {requests}")
+    print(f"Fresh client per request:  {cold_connections} connections, {cold * 1000:.1f} ms/request")
+    print(f"Shared pre-warmed client:  {stand_in.connections} connections, {warm * 1000:.1f} ms/request")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--handshake-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.handshake_ms / 1000))
+
+if __name__ == '__main__':
+    main()
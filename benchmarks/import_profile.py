@@ -0,0 +1,61 @@
+"""
+Import-time profile of the host app, to keep startup cost in check over time.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter, prints the
+total and the slowest imports by cumulative time, and optionally appends a summary
+line to a JSON Lines history file so runs can be compared.
+
+Usage:
+    python -m benchmarks.import_profile [--module tap_audio] [--top 15] [--history import_profile.jsonl]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from datetime import datetime
+
+def profile_imports(module: str) -> list[tuple[str, int, int]]:
+    """
+    Import the module in a fresh interpreter and parse the -X importtime report.
+
+    Returns:
+        list: (package, self_us, cumulative_us) per imported package, in import order
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='tap_audio')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--history', help='JSON Lines file to append this run to')
+    args = parser.parse_args()
+
+    entries = profile_imports(args.module)
+    total_us = next((cumulative for name, _, cumulative in entries if name == args.module), 0)
+
+    print(f"import {args.module}: {total_us / 1000:.1f} ms ({len(entries)} modules)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    if args.history:
+        with open(args.history, 'a') as history:
+            history.write(json.dumps({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'module': args.module,
+                'total_ms': round(total_us / 1000, 1),
+                'modules': len(entries),
+            }) + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Offline accuracy and CPU cost of the host-side keyword spotter.
+
+Fixture layout (16-bit mono WAV, 8kHz as recorded by tap_audio.py):
+
+    <fixtures>/templates/<keyword>.wav      one enrolment example per keyword
+    <fixtures>/clips/<keyword>_<n>.wav      clips expected to trigger <keyword>
+    <fixtures>/clips/none_<n>.wav           clips expected not to trigger anything
+
+Usage:
+    python -m benchmarks.keyword_spotting <fixtures> [--threshold 6.0] [--budget-ms 5.0]
+"""
+import argparse
+from pathlib import Path
+
+from utils.keyword_spotter import TemplateKeywordSpotter, evaluate, read_wav_samples
+
+def load_clips(clips_dir: Path):
+    """Yield (samples, expected keyword or None) for every clip in the directory."""
+    for path in sorted(clips_dir.glob('*.wav')):
+        label = path.stem.rsplit('_', 1)[0]
+        samples, _ = read_wav_samples(path)
+        yield samples, None if label == 'none' else label
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', type=Path)
+    parser.add_argument('--threshold', type=float, default=6.0)
+    parser.add_argument('--budget-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    templates = {path.stem: str(path) for path in sorted((args.fixtures / 'templates').glob('*.wav'))}
+    spotter = TemplateKeywordSpotter.from_wav_files(templates, threshold=args.threshold, budget_ms=args.budget_ms)
+    results = evaluate(spotter, load_clips(args.fixtures / 'clips'), sample_rate=spotter.sample_rate)
+
+    print(f"Keywords:              {', '.join(templates)}")
+    print(f"Clips:                 {results['clips']}")
+    print(f"Accuracy:              {results['accuracy']:.1%}")
+    print(f"False accepts:         {results['false_accepts']}")
+    print(f"False rejects:         {results['false_rejects']}")
+    print(f"CPU per audio second:  {results['cpu_per_audio_second'] * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Main loop timing of the Frameside Lua apps, run on the host in the Lua harness.
+
+Each scenario runs an app on a virtual clock (see utils/lua_harness.py) with scripted
+host messages and taps, and reports per-iteration Lua time (host CPU, so only relative
+between runs), allocations, explicit GC calls, Bluetooth traffic and busy waits, and
+how far the microphone buffer fell behind. Use it to compare changes to sleep
+intervals, GC calls or send bursts before deploying them.
+
+Needs lupa (pip install lupa).
+
+Usage:
+    python -m benchmarks.lua_loop [--throughput 15000] [--mtu 240] [--app examples/lua/plaintext.lua --duration 5]
+"""
+import argparse
+import glob
+
+from frame_msg import TxCaptureSettings, TxCode, TxPlainText
+
+from utils.audio_format import AUDIO_FORMAT_CHANNEL, AudioFormat
+from utils.compact_text import DICTIONARY_FILE, TxCompactText, dictionary_lua
+from utils.lua_harness import DEFAULT_MTU, LuaHarness
+from utils.capture_policy import DEFAULT_THROUGHPUT
+
+TAP_APP = 'lua/tap_audio.lua'
+
+# msg_codes of lua/tap_audio.lua
+TEXT_FLAG = 0x0a
+COMPACT_TEXT_FLAG = 0x0e
+CAPTURE_SETTINGS_MSG = 0x0d
+TAP_SUBS_MSG = 0x10
+AUDIO_SUBS_MSG = 0x30
+
+ANSWER = ("The quickest way there is the number twelve bus from across the road, changing at "
+          "the station. It runs every ten minutes and takes about half an hour.")
+
+def idle(harness: LuaHarness) -> None:
+    harness.message(1.5, TAP_SUBS_MSG, TxCode(value=1).pack())
+
+def recording(harness: LuaHarness) -> None:
+    idle(harness)
+    harness.tap(2.0)
+    harness.message(2.05, AUDIO_SUBS_MSG, TxCode(value=1).pack())
+    harness.message(2.05, TEXT_FLAG, TxPlainText(text='Recording...').pack())
+    harness.tap(7.0)
+    harness.message(7.05, AUDIO_SUBS_MSG, TxCode(value=0).pack())
+
+def recording_8bit(harness: LuaHarness) -> None:
+    harness.message(2.0, AUDIO_FORMAT_CHANNEL, AudioFormat(8000, 8).pack())
+    recording(harness)
+
+def answer(harness: LuaHarness) -> None:
+    idle(harness)
+    for page in range(3):
+        harness.message(2.0 + page * 5, TEXT_FLAG, TxPlainText(text=ANSWER).pack())
+
+def compact_answer(harness: LuaHarness) -> None:
+    idle(harness)
+    for page in range(3):
+        harness.message(2.0 + page * 5, COMPACT_TEXT_FLAG, TxCompactText(text=ANSWER).pack())
+
+def vision(harness: LuaHarness) -> None:
+    recording(harness)
+    harness.message(2.05, CAPTURE_SETTINGS_MSG, TxCaptureSettings(resolution=512, quality_index=2).pack())
+
+def vision_8bit(harness: LuaHarness) -> None:
+    recording_8bit(harness)
+    harness.message(2.05, CAPTURE_SETTINGS_MSG, TxCaptureSettings(resolution=512, quality_index=2).pack())
+
+SCENARIOS = [
+    ('idle', idle, 5.0),
+    ('recording 5s', recording, 9.0),
+    ('recording 5s, 8kHz/8-bit', recording_8bit, 9.0),
+    ('answer pages', answer, 15.0),
+    ('answer pages, compact', compact_answer, 15.0),
+    ('recording + photo', vision, 9.0),
+    ('recording + photo, 8kHz/8-bit', vision_8bit, 9.0),
+]
+
+def report(label: str, harness: LuaHarness, duration: float) -> None:
+    result = harness.run(duration)
+    summary = result.summary()
+    errors = [line for line in result.prints if 'rror' in line]
+    print(f"{label:<32} {summary['loops_per_second']:>7.0f} {summary['cpu_p50_us']:>7.1f} {summary['cpu_p99_us']:>8.1f} "
+          f"{summary['alloc_kb_per_iteration']:>8.2f} {summary['peak_memory_kb']:>7.0f} "
+          f"{summary['gc_calls_per_second']:>6.0f} {summary['busy_wait']:>6.2f}s "
+          f"{summary['bytes_per_second']:>7.0f} {result.max_mic_backlog:>7} {result.dropped_audio:>7}"
+          + (f"  errors: {errors}" if errors else ''))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--throughput', type=float, default=DEFAULT_THROUGHPUT, help='Bluetooth bytes/s, 0 for unlimited')
+    parser.add_argument('--mtu', type=int, default=DEFAULT_MTU)
+    parser.add_argument('--app', help='run only this app, idle')
+    parser.add_argument('--duration', type=float, default=5.0, help='virtual seconds to run --app for')
+    args = parser.parse_args()
+    throughput = args.throughput or None
+
+    print(f"{'scenario':<32} {'loops/s':>7} {'p50 us':>7} {'p99 us':>8} {'KB/iter':>8} {'peak KB':>7} "
+          f"{'GC/s':>6} {'busy':>7} {'sent B/s':>7} {'mic max':>7} {'dropped':>7}")
+    if args.app:
+        report(args.app, LuaHarness(args.app, mtu=args.mtu, throughput=throughput), args.duration)
+        return
+
+    for label, script, duration in SCENARIOS:
+        harness = LuaHarness(TAP_APP, mtu=args.mtu, throughput=throughput, files={DICTIONARY_FILE: dictionary_lua()})
+        script(harness)
+        report(label, harness, duration)
+
+    # the example apps, idle
+    for app in sorted(glob.glob('examples/lua/*_app.lua')) + ['examples/lua/plaintext.lua']:
+        report(app.split('/')[-1], LuaHarness(app, mtu=args.mtu, throughput=throughput), 5.0)
+
+if __name__ == '__main__':
+    main()
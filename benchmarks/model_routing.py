@@ -0,0 +1,192 @@
+"""
+SLO attainment of latency-based model routing against fake model endpoints.
+
+Each fake model answers after a delay drawn from a lognormal distribution around its
+median, with an occasional slow tail (--tail-rate answers take --tail-factor times longer),
+like a busy API. A mix of simple and reasoning questions is sent through:
+
+    strong only      every question to the strong model (the old behaviour)
+    routed           ModelRouter without hedging: question features and observed latency pick the model
+    routed + hedged  ModelRouter: slow requests are hedged with the other model
+
+--time-scale shrinks every delay so the run is quick; latencies are reported unscaled.
+
+With --http, the fakes are served as a local OpenAI-compatible HTTP endpoint instead,
+and questions go through utils.ai_utils.get_ai_response() end to end (use a larger
+--time-scale there, since the client's own overhead is scaled up too).
+
+Usage:
+    python -m benchmarks.model_routing [--questions 200] [--slo 4] [--hedge-quantile 0.9] [--time-scale 0.01] [--http]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from utils.model_router import ModelEndpoint, ModelRouter
+
+SIMPLE_QUESTIONS = [
+    "What's the capital of Peru?",
+    "How tall is the Eiffel Tower?",
+    "What year did the Berlin wall fall?",
+    "Who wrote Dracula?",
+    "What's eight times seven?",
+]
+
+REASONING_QUESTIONS = [
+    "Why does ice float on water?",
+    "Explain how a heat pump can move more heat than the energy it uses.",
+    "Compare renting and buying a flat for someone who moves every few years.",
+    "Plan a three day trip to Lisbon for someone who likes food and walking.",
+    "What are the pros and cons of electric cars in cold climates?",
+]
+
+class FakeModel:
+    """Answer delays for one fake model."""
+
+    def __init__(self, median: float, tail_rate: float, tail_factor: float, seed: int):
+        self.median = median
+        self.tail_rate = tail_rate
+        self.tail_factor = tail_factor
+        self.random = random.Random(seed)
+
+    def delay(self) -> float:
+        seconds = self.median * self.random.lognormvariate(0.0, 0.3)
+        if self.random.random() < self.tail_rate:
+            seconds *= self.tail_factor
+        return seconds
+
+def fake_endpoint(name: str, model: FakeModel, scale: float) -> ModelEndpoint:
+    async def invoke(state):
+        await asyncio.sleep(model.delay() * scale)
+        return {"messages": [f"answer from {name}"]}
+    return ModelEndpoint(name=name, invoke=invoke, expected_latency=model.median * scale)
+
+def questions(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [rng.choice(SIMPLE_QUESTIONS if rng.random() < 0.6 else REASONING_QUESTIONS) for _ in range(count)]
+
+def summarize(label: str, latencies: list[float], slo: float, strong_share: float) -> None:
+    latencies = np.array(latencies)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    print(f"{label:<16} {np.mean(latencies <= slo):>7.1%} {p50:>7.2f}s {p90:>7.2f}s {p99:>7.2f}s {strong_share:>7.0%}")
+
+async def run_policies(args) -> None:
+    scale = args.time_scale
+    strong_model = FakeModel(args.strong_median, args.tail_rate, args.tail_factor, seed=1)
+    fast_model = FakeModel(args.fast_median, args.tail_rate, args.tail_factor, seed=2)
+    asked = questions(args.questions)
+
+    print(f"{args.questions} questions, SLO {args.slo:g}s, strong median {args.strong_median:g}s, "
+          f"fast median {args.fast_median:g}s, {args.tail_rate:.0%} of answers {args.tail_factor:g}x slower")
+    print(f"{'policy':<16} {'in SLO':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'strong':>7}")
+
+    strong = fake_endpoint('strong', strong_model, scale)
+    latencies = []
+    for question in asked:
+        start = time.monotonic()
+        await strong.invoke({"messages": [question]})
+        latencies.append((time.monotonic() - start) / scale)
+    summarize('strong only', latencies, args.slo, 1.0)
+
+    for label, hedging in (('routed', False), ('routed + hedged', True)):
+        router = ModelRouter(fast=fake_endpoint('fast', fast_model, scale),
+                             strong=fake_endpoint('strong', strong_model, scale),
+                             slo=args.slo * scale, hedge_quantile=args.hedge_quantile, hedging=hedging)
+        latencies = []
+        for question in asked:
+            start = time.monotonic()
+            await router.ainvoke({"messages": [question]}, question)
+            latencies.append((time.monotonic() - start) / scale)
+        summarize(label, latencies, args.slo, router.wins['strong'] / router.requests)
+        if hedging:
+            print(f"  {router.hedged} hedged, answers: {router.wins}")
+
+async def serve_fake_openai(models: dict[str, FakeModel], scale: float) -> asyncio.AbstractServer:
+    """A minimal OpenAI-compatible chat completions server that answers after each model's delay."""
+    async def handle(reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                body = json.loads(await reader.readexactly(length)) if length else {}
+                model = body.get('model', '')
+                if model in models:
+                    await asyncio.sleep(models[model].delay() * scale)
+                response = json.dumps({
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": f"A short answer from {model}."}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 8, "total_tokens": 18},
+                }).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(response)).encode() + b"\r\n\r\n" + response)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+async def run_http(args) -> None:
+    scale = args.time_scale
+    from utils import ai_utils
+    from utils.http_client import close_http_client
+    models = {
+        ai_utils.CHAT_MODEL: FakeModel(args.strong_median, args.tail_rate, args.tail_factor, seed=1),
+        ai_utils.FAST_MODEL: FakeModel(args.fast_median, args.tail_rate, args.tail_factor, seed=2),
+    }
+    server = await serve_fake_openai(models, scale)
+    port = server.sockets[0].getsockname()[1]
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{port}/v1"
+    os.environ.setdefault('OPENAI_API_KEY', 'fake')
+
+    router = ai_utils.get_model_router()
+    router.slo = args.slo * scale
+    for endpoint, median in ((router.fast, args.fast_median), (router.strong, args.strong_median)):
+        endpoint.expected_latency = median * scale
+
+    # build both chatbot graphs first so their imports aren't timed
+    for model in models:
+        ai_utils.get_chatbot_app(model)
+
+    latencies = []
+    for question in questions(args.questions):
+        start = time.monotonic()
+        await ai_utils.get_ai_response(question, slo=router.slo)
+        latencies.append((time.monotonic() - start) / scale)
+        ai_utils.clear_conversation_history()
+    print(f"{'policy':<16} {'in SLO':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'strong':>7}")
+    summarize('http, hedged', latencies, args.slo, router.wins[ai_utils.CHAT_MODEL] / router.requests)
+    print(router.report())
+    await close_http_client()
+    server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--slo', type=float, default=4.0)
+    parser.add_argument('--strong-median', type=float, default=3.0)
+    parser.add_argument('--fast-median', type=float, default=1.0)
+    parser.add_argument('--tail-rate', type=float, default=0.1)
+    parser.add_argument('--tail-factor', type=float, default=4.0)
+    parser.add_argument('--hedge-quantile', type=float, default=0.9)
+    parser.add_argument('--time-scale', type=float, default=0.01)
+    parser.add_argument('--http', action='store_true')
+    args = parser.parse_args()
+
+    asyncio.run(run_http(args) if args.http else run_policies(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Time to first usable image: progressive previews vs waiting for the full photo.
+
+Replays photo streams chunk by chunk through ProgressiveRxPhoto on a simulated
+Bluetooth link, and compares when the first preview covering --usable of the
+image is ready against when the full JPEG has arrived and been decoded.
+
+Photos are JPEGs saved from Frame (e.g. with examples/frame_camera.py); without
+any, synthetic 720px photos are used. The link rate is --throughput, or the mean
+measured rate in a capture log written by CapturePolicy.
+
+Usage:
+    python -m benchmarks.progressive_photo [--photos 'fixtures/photos/*.jpg'] [--throughput 15000]
+        [--capture-log captures.jsonl] [--chunk 240] [--usable 0.5]
+"""
+import argparse
+import asyncio
+import glob
+import io
+import json
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.photo_preview import ProgressiveRxPhoto
+
+def synthetic_photos(count: int = 3, size: int = 720) -> list[bytes]:
+    """Baseline JPEGs with some gradient and texture, roughly the size of Frame photos."""
+    rng = np.random.default_rng(0)
+    photos = []
+    for _ in range(count):
+        y, x = np.mgrid[0:size, 0:size]
+        base = np.stack([x * 255 / size, y * 255 / size, (x + y) * 127 / size], axis=-1)
+        pixels = np.clip(base + rng.normal(0, 20, base.shape), 0, 255).astype(np.uint8)
+        output = io.BytesIO()
+        Image.fromarray(pixels).save(output, format='JPEG', quality=75)
+        photos.append(output.getvalue())
+    return photos
+
+def measured_throughput(capture_log: str) -> float:
+    with open(capture_log) as log:
+        rates = [json.loads(line)['throughput'] for line in log if line.strip()]
+    rates = [rate for rate in rates if rate > 0]
+    if not rates:
+        raise SystemExit(f"No throughput measurements in {capture_log}")
+    return sum(rates) / len(rates)
+
+async def replay(jpeg_bytes: bytes, throughput: float, chunk_size: int, usable: float) -> dict:
+    """
+    Stream one photo through ProgressiveRxPhoto on a simulated link.
+
+    Returns:
+        dict: seconds from the first chunk to the first preview, the first usable preview
+            and the decoded full photo, plus the preview count
+    """
+    clock = [0.0]
+    rx_photo = ProgressiveRxPhoto(upright=False, clock=lambda: clock[0])
+    rx_photo.queue = asyncio.Queue()
+    rx_photo.preview_queue = asyncio.Queue(maxsize=1)
+
+    first_preview = first_usable = None
+    previews = 0
+    for offset in range(0, len(jpeg_bytes), chunk_size):
+        chunk = jpeg_bytes[offset:offset + chunk_size]
+        final = offset + chunk_size >= len(jpeg_bytes)
+        # the chunk has fully arrived at this point on the link
+        clock[0] = (offset + len(chunk)) / throughput
+
+        # decoding happens on the host while the link keeps going, so its cost is added
+        start = time.perf_counter()
+        rx_photo.handle_data(bytes([rx_photo.final_chunk_flag if final else rx_photo.non_final_chunk_flag]) + chunk)
+        ready = clock[0] + time.perf_counter() - start
+
+        if not rx_photo.preview_queue.empty():
+            preview = rx_photo.preview_queue.get_nowait()
+            previews += 1
+            if first_preview is None:
+                first_preview = ready
+            if first_usable is None and preview.coverage >= usable:
+                first_usable = ready
+
+    full_jpeg = await rx_photo.queue.get()
+    start = time.perf_counter()
+    Image.open(io.BytesIO(full_jpeg)).load()
+    full = len(jpeg_bytes) / throughput + time.perf_counter() - start
+
+    return {
+        'first_preview': first_preview,
+        'first_usable': first_usable if first_usable is not None else full,
+        'full': full,
+        'previews': previews,
+    }
+
+async def run(photos: list[bytes], throughput: float, chunk_size: int, usable: float) -> None:
+    print(f"Link: {throughput / 1000:.1f} kB/s in {chunk_size} byte chunks; usable = {usable:.0%} of rows")
+    print(f"{'bytes':>8} {'first preview':>14} {'first usable':>13} {'full photo':>11} {'previews':>9}")
+    results = []
+    for jpeg_bytes in photos:
+        result = await replay(jpeg_bytes, throughput, chunk_size, usable)
+        results.append(result)
+        first_preview = f"{result['first_preview']:.2f}s" if result['first_preview'] is not None else '-'
+        print(f"{len(jpeg_bytes):>8} {first_preview:>14} {result['first_usable']:>12.2f}s "
+              f"{result['full']:>10.2f}s {result['previews']:>9}")
+
+    mean_usable = sum(r['first_usable'] for r in results) / len(results)
+    mean_full = sum(r['full'] for r in results) / len(results)
+    print(f"Mean time to usable image: {mean_usable:.2f}s vs {mean_full:.2f}s for the full photo "
+          f"({(1 - mean_usable / mean_full):.0%} sooner)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photos', default='fixtures/photos/*.jpg')
+    parser.add_argument('--throughput', type=float, default=15000.0, help='link rate in bytes per second')
+    parser.add_argument('--capture-log', help='CapturePolicy log to take the measured link rate from')
+    parser.add_argument('--chunk', type=int, default=240, help='bytes of photo data per Bluetooth packet')
+    parser.add_argument('--usable', type=float, default=0.5, help='fraction of rows that makes a preview usable')
+    args = parser.parse_args()
+
+    photos = []
+    for path in sorted(glob.glob(args.photos)):
+        with open(path, 'rb') as f:
+            photos.append(f.read())
+    if not photos:
+        print(f"No photos match {args.photos}, using synthetic ones")
+        photos = synthetic_photos()
+
+    throughput = measured_throughput(args.capture_log) if args.capture_log else args.throughput
+    asyncio.run(run(photos, throughput, args.chunk, args.usable))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Per-channel bandwidth and gaps in a recorded Frame session, and session replay.
+
+Sessions are recorded by tap_audio.py when SESSION_LOG is set (see utils/session_log.py).
+The summary is computed from the index alone, so it's quick even for long sessions.
+
+With --replay, the session's inbound packets are fed through the host receivers
+(gestures, audio, photo) on an unconnected FrameMsg at --speed times real time, and
+what each receiver produces is printed with its timing.
+
+--overhead measures what recording costs per packet, to check it can stay on.
+
+Usage:
+    python -m benchmarks.session_summary <session log> [--replay] [--speed 10] [--start 0] [--end 60]
+    python -m benchmarks.session_summary --overhead [--packets 100000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from frame_msg import FrameMsg, RxAudio, RxPhoto
+
+from utils.gestures import GESTURE_ACTIONS, GestureClassifier, RxGesture
+from utils.session_log import KIND_NAMES, SessionLog, SessionRecorder, DATA, OUTBOUND, replay, summarize
+
+def print_summary(log: SessionLog) -> None:
+    started = datetime.fromtimestamp(log.start_time).isoformat(timespec='seconds')
+    print(f"{log.path}: {len(log)} records over {log.duration:.1f}s, started {started}")
+    print(f"{'dir':>5} {'code':>5} {'channel':<18} {'records':>8} {'bytes':>10} {'B/s':>9} "
+          f"{'mean gap':>9} {'max gap':>8} {'at':>8}")
+    for channel in summarize(log):
+        print(f"{KIND_NAMES[channel.kind]:>5} 0x{channel.code:02x} {channel.name:<18} {channel.count:>8} "
+              f"{channel.bytes:>10} {channel.bytes_per_second:>9.0f} {channel.mean_gap:>8.3f}s "
+              f"{channel.max_gap:>7.2f}s {channel.max_gap_at:>7.1f}s")
+
+async def drain(name: str, queue: asyncio.Queue, began: float, describe) -> None:
+    while True:
+        item = await queue.get()
+        print(f"{time.monotonic() - began:8.3f}s {name}: {describe(item)}")
+
+async def run_replay(log: SessionLog, speed: float, start: float, end: float | None) -> None:
+    frame = FrameMsg()
+    frame.attach_print_response_handler(lambda text: print(f"{time.monotonic() - began:8.3f}s print: {text}"))
+    receivers = [
+        ('gesture', RxGesture(GestureClassifier(GESTURE_ACTIONS, mode='idle')),
+         lambda event: f"{event.gesture} {event.status} ({event.action})"),
+        ('audio', RxAudio(), lambda clip: 'end of clip' if clip is None else f"{len(clip)} bytes"),
+        ('photo', RxPhoto(upright=False), lambda jpeg: f"{len(jpeg)} byte JPEG"),
+    ]
+
+    began = time.monotonic()
+    drains = [asyncio.create_task(drain(name, await receiver.attach(frame), began, describe))
+              for name, receiver, describe in receivers]
+    count = await replay(log, frame, speed=speed, start=start, end=end)
+    # give timers (e.g. gesture windows) and receiver tasks a moment to finish
+    await asyncio.sleep(0.5)
+    for task in drains:
+        task.cancel()
+    for _, receiver, _ in receivers:
+        receiver.detach(frame)
+    print(f"Replayed {count} packets in {time.monotonic() - began:.2f}s")
+
+def measure_overhead(packets: int) -> None:
+    payload = bytes(200)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'overhead.frsl')
+        recorder = SessionRecorder(path)
+        start = time.perf_counter()
+        for i in range(packets):
+            recorder.record(DATA if i % 4 else OUTBOUND, 0x05, payload)
+        recorder.close()
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with SessionLog(path) as log:
+            summarize(log)
+        summary_time = time.perf_counter() - start
+
+    print(f"Recording: {elapsed / packets * 1e6:.2f} us per {len(payload)} byte packet "
+          f"({packets / elapsed:,.0f} packets/s)")
+    print(f"Opening and summarizing {packets} records: {summary_time * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log', nargs='?')
+    parser.add_argument('--replay', action='store_true')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed, 0 for as fast as possible')
+    parser.add_argument('--start', type=float, default=0.0, help='seconds into the session to replay from')
+    parser.add_argument('--end', type=float, default=None, help='seconds into the session to replay to')
+    parser.add_argument('--overhead', action='store_true')
+    parser.add_argument('--packets', type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.overhead:
+        measure_overhead(args.packets)
+        return
+    if args.log is None:
+        parser.error('a session log is required')
+
+    with SessionLog(args.log) as log:
+        print_summary(log)
+        if args.replay:
+            asyncio.run(run_replay(log, args.speed, args.start, args.end))
+
+if __name__ == '__main__':
+    main()
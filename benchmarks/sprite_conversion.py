@@ -0,0 +1,71 @@
+"""
+Throughput of the image-to-sprite converter on camera-sized photos.
+
+Converts each photo to a display thumbnail at every palette size and dithering mode,
+and compares against TxSprite.from_image_bytes() followed by pack(). Also times a
+repeat conversion served from the SpriteConverter cache.
+
+Photos are JPEGs saved from Frame (e.g. with examples/frame_camera.py); without
+any, synthetic 720px photos are used.
+
+Usage:
+    python -m benchmarks.sprite_conversion [--photos 'fixtures/photos/*.jpg'] [--size 200] [--repeat 5]
+"""
+import argparse
+import glob
+import io
+import time
+
+from frame_msg import TxSprite
+from PIL import Image
+
+from benchmarks.progressive_photo import synthetic_photos
+from utils.sprite import SpriteConverter, convert_image
+
+def time_per_call(function, photos: list[bytes], repeat: int) -> float:
+    """Mean seconds per photo over repeat passes."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for jpeg_bytes in photos:
+            function(jpeg_bytes)
+    return (time.perf_counter() - start) / (repeat * len(photos))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photos', default='fixtures/photos/*.jpg')
+    parser.add_argument('--size', type=int, default=200, help='longest side of the thumbnail')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    photos = []
+    for path in sorted(glob.glob(args.photos)):
+        with open(path, 'rb') as f:
+            photos.append(f.read())
+    if not photos:
+        print(f"No photos match {args.photos}, using synthetic ones")
+        photos = synthetic_photos()
+
+    max_size = (args.size, args.size)
+    print(f"{'colours':>7} {'dither':>16} {'ms/photo':>9} {'photos/s':>9} {'bytes':>7} {'messages':>9}")
+    for num_colors in (2, 4, 16):
+        for dither in ('ordered', 'floyd-steinberg', None):
+            convert = lambda jpeg_bytes: convert_image(Image.open(io.BytesIO(jpeg_bytes)), max_size=max_size,
+                                                       num_colors=num_colors, dither=dither)
+            seconds = time_per_call(convert, photos, args.repeat)
+            conversion = convert(photos[0])
+            print(f"{num_colors:>7} {str(dither):>16} {seconds * 1000:>9.1f} {1 / seconds:>9.1f} "
+                  f"{conversion.size:>7} {len(conversion.messages):>9}")
+
+    max_pixels = args.size * args.size
+    seconds = time_per_call(lambda jpeg_bytes: TxSprite.from_image_bytes(jpeg_bytes, max_pixels=max_pixels).pack(),
+                            photos, args.repeat)
+    print(f"TxSprite.from_image_bytes + pack (16 colours): {seconds * 1000:.1f} ms/photo")
+
+    converter = SpriteConverter(max_size=max_size)
+    for jpeg_bytes in photos:
+        converter.convert(jpeg_bytes)
+    seconds = time_per_call(converter.convert, photos, args.repeat)
+    print(f"Cached repeat conversion: {seconds * 1000:.2f} ms/photo ({converter.hits} hits, {converter.misses} misses)")
+
+if __name__ == '__main__':
+    main()
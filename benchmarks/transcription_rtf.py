@@ -0,0 +1,66 @@
+"""
+Real-time factor of the transcription backends on recorded clips.
+
+RTF is processing time divided by clip length (below 1.0 is faster than real time).
+For the local engine, loading the model into the worker pool is timed separately,
+since tap_audio.py does it once while connecting to Frame.
+
+Fixtures are WAV files as saved by tap_audio.py (16-bit mono, 8kHz), e.g. copied from audio/.
+
+Usage:
+    python -m benchmarks.transcription_rtf <fixtures dir> [--backend local|cloud|both] [--model base.en] [--workers 1]
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from utils.transcription import CloudTranscriber, LocalTranscriber, clip_duration
+
+async def measure(backend, clips: list[Path]) -> None:
+    start = time.perf_counter()
+    await backend.start()
+    print(f"[{backend.name}] startup: {time.perf_counter() - start:.2f}s")
+
+    total_audio = total_time = 0.0
+    for path in clips:
+        duration = clip_duration(path)
+        start = time.perf_counter()
+        text = await backend.transcribe(path)
+        elapsed = time.perf_counter() - start
+        total_audio += duration
+        total_time += elapsed
+        print(f"[{backend.name}] {path.name}: {duration:.1f}s audio in {elapsed:.2f}s "
+              f"(RTF {elapsed / duration:.2f}) {text[:60]!r}")
+    await backend.close()
+
+    print(f"[{backend.name}] overall RTF {total_time / total_audio:.2f} "
+          f"({total_audio:.1f}s audio, {total_time / len(clips):.2f}s per clip)")
+
+async def run(clips: list[Path], backend_names: list[str], model: str, workers: int) -> None:
+    for name in backend_names:
+        if name == 'local':
+            backend = LocalTranscriber(model, workers=workers)
+            if not backend.available():
+                print("[local] faster-whisper is not installed, skipping (pip install faster-whisper)")
+                continue
+        else:
+            backend = CloudTranscriber()
+        await measure(backend, clips)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', type=Path)
+    parser.add_argument('--backend', choices=['local', 'cloud', 'both'], default='both')
+    parser.add_argument('--model', default='base.en')
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    clips = sorted(args.fixtures.glob('*.wav'))
+    if not clips:
+        raise SystemExit(f"No WAV files in {args.fixtures}")
+    backend_names = ['local', 'cloud'] if args.backend == 'both' else [args.backend]
+    asyncio.run(run(clips, backend_names, args.model, args.workers))
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,8 @@ import asyncio
 from PIL import Image
 import io
 
-from frame_msg import FrameMsg, RxPhoto, TxCaptureSettings
+from frame_msg import FrameMsg
+from utils.capture_policy import CapturePolicy, TimedRxPhoto
 
 async def main():
     """
@@ -41,8 +42,10 @@ async def main():
         # the main app loop on Frame is running).
         # From this point we do message-passing with first-class types and send_message() (or send_data())
 
-        # hook up the RxPhoto receiver
-        rx_photo = RxPhoto()
+        # hook up the RxPhoto receiver; it times the transfer so the capture policy
+        # can pick a resolution and quality that arrive within the latency budget
+        capture_policy = CapturePolicy(latency_budget=2.0)
+        rx_photo = TimedRxPhoto(capture_policy)
         photo_queue = await rx_photo.attach(frame)
 
         # give the frame some time for the autoexposure loop to run (50 times; every 0.1s)
@@ -51,7 +54,7 @@ async def main():
         print("Capturing a photo")
 
         # Request the photo by sending a TxCaptureSettings message
-        await frame.send_message(0x0d, TxCaptureSettings(resolution=720).pack())
+        await frame.send_message(0x0d, capture_policy.capture_settings().pack())
 
         # get the jpeg bytes as soon as they're ready
         jpeg_bytes = await asyncio.wait_for(photo_queue.get(), timeout=10.0)
@@ -3,8 +3,10 @@ from PIL import Image
 import io
 from pathlib import Path
 from frame_msg import FrameMsg, RxPhoto, TxCaptureSettings
+from utils.capture_policy import CapturePolicy, TimedRxPhoto
 
-async def _take_photo_async(output_path: str = None, resolution: int = 720, autoexposure_time: float = 5.0):
+async def _take_photo_async(output_path: str = None, resolution: int = 720, autoexposure_time: float = 5.0,
+                            latency_budget: float = None, capture_log: str = None):
     """
     Internal async function to take a photo using the Frame camera.
     
@@ -12,6 +14,10 @@ async def _take_photo_async(output_path: str = None, resolution: int = 720, auto
         output_path (str, optional): Path where to save the photo. If None, returns the image object.
         resolution (int, optional): Photo resolution. Defaults to 720.
         autoexposure_time (float, optional): Time in seconds to wait for autoexposure. Defaults to 5.0.
+        latency_budget (float, optional): Target seconds for the photo to arrive. If set, resolution and
+            JPEG quality are chosen from the measured Bluetooth throughput instead of using resolution.
+        capture_log (str, optional): JSON Lines file to append the achieved size, time and quality to,
+            and to load previous captures from, when using latency_budget.
     
     Returns:
         PIL.Image.Image or None: Returns the image object if output_path is None, otherwise saves to file and returns None
@@ -28,8 +34,14 @@ async def _take_photo_async(output_path: str = None, resolution: int = 720, auto
         frame.attach_print_response_handler()
         await frame.start_frame_app()
         
-        # Set up photo receiver
-        rx_photo = RxPhoto()
+        # Set up photo receiver (timed, when the capture settings adapt to the link)
+        if latency_budget is not None:
+            capture_policy = CapturePolicy(latency_budget=latency_budget, log_path=capture_log)
+            if capture_log and Path(capture_log).exists():
+                capture_policy.load_log(capture_log)
+            rx_photo = TimedRxPhoto(capture_policy)
+        else:
+            rx_photo = RxPhoto()
         photo_queue = await rx_photo.attach(frame)
         
         # Wait for autoexposure
@@ -38,7 +50,11 @@ async def _take_photo_async(output_path: str = None, resolution: int = 720, auto
         print("Capturing a photo")
         
         # Request the photo
-        await frame.send_message(0x0d, TxCaptureSettings(resolution=resolution).pack())
+        if latency_budget is not None:
+            capture_settings = capture_policy.capture_settings()
+        else:
+            capture_settings = TxCaptureSettings(resolution=resolution)
+        await frame.send_message(0x0d, capture_settings.pack())
         
         # Get the jpeg bytes
         jpeg_bytes = await asyncio.wait_for(photo_queue.get(), timeout=10.0)
@@ -67,7 +83,8 @@ async def _take_photo_async(output_path: str = None, resolution: int = 720, auto
             await frame.stop_frame_app()
             await frame.disconnect()
 
-def take_photo(output_path: str = None, resolution: int = 720, autoexposure_time: float = 5.0):
+def take_photo(output_path: str = None, resolution: int = 720, autoexposure_time: float = 5.0,
+               latency_budget: float = None, capture_log: str = None):
     """
     Take a photo using the Frame camera.
     
@@ -75,11 +92,15 @@ def take_photo(output_path: str = None, resolution: int = 720, autoexposure_time
         output_path (str, optional): Path where to save the photo. If None, returns the image object.
         resolution (int, optional): Photo resolution. Defaults to 720.
         autoexposure_time (float, optional): Time in seconds to wait for autoexposure. Defaults to 5.0.
+        latency_budget (float, optional): Target seconds for the photo to arrive. If set, resolution and
+            JPEG quality are chosen from the measured Bluetooth throughput instead of using resolution.
+        capture_log (str, optional): JSON Lines file to append the achieved size, time and quality to,
+            and to load previous captures from, when using latency_budget.
     
     Returns:
         PIL.Image.Image or None: Returns the image object if output_path is None, otherwise saves to file and returns None
     """
-    return asyncio.run(_take_photo_async(output_path, resolution, autoexposure_time))
+    return asyncio.run(_take_photo_async(output_path, resolution, autoexposure_time, latency_budget, capture_log))
 
 if __name__ == "__main__":
     # Example usage
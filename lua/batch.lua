@@ -0,0 +1,34 @@
+-- Module to unpack TxBatch messages sent from the host, which carry several
+-- (msg_code, payload) pairs in a single MTU-sized write
+local data = require('data.min')
+
+local _M = {}
+
+-- Parse the TxBatch message raw data:
+-- repeated [msg_code(1), length_msb(1), length_lsb(1), payload(length)]
+-- Each inner payload is handed to the parser registered for its msg_code
+-- and the result stored in data.app_data, exactly as if it had arrived on its own
+function _M.parse_batch(block)
+	local batch = { count = 0 }
+	local pos = 1
+	local len = string.len(block)
+
+	while pos + 2 <= len do
+		local msg_code = string.byte(block, pos)
+		local size = string.byte(block, pos + 1) << 8 | string.byte(block, pos + 2)
+		local payload = string.sub(block, pos + 3, pos + 2 + size)
+		pos = pos + 3 + size
+
+		local parser = data.parsers[msg_code]
+		if parser == nil then
+			print('Error: No parser for batched flag: ' .. tostring(msg_code))
+		else
+			data.app_data[msg_code] = parser(payload, data.app_data[msg_code])
+			batch.count = batch.count + 1
+		end
+	end
+
+	return batch
+end
+
+return _M
@@ -0,0 +1,42 @@
+-- Module to parse TxCompactText messages: TxPlainText whose text is encoded with the
+-- static dictionary the host uploads as text_dictionary.lua (see utils/compact_text.py)
+local plain_text = require('plain_text.min')
+local dictionary = require('text_dictionary')
+
+local _M = {}
+
+-- dictionary.tokens maps each one-byte code from 0x80 up to the token it stands for
+local tokens = dictionary.tokens
+
+-- an escape byte makes the byte after it literal (non-ASCII UTF-8, or the escape itself)
+local function unescape(match)
+	if #match == 2 then
+		return string.sub(match, 2)
+	end
+	return tokens[match]
+end
+
+-- Expand the encoded text; string.gsub does the scanning and table lookups in C
+function _M.decode_text(encoded)
+	if string.find(encoded, '\1', 1, true) == nil then
+		return (string.gsub(encoded, '[\128-\255]', tokens))
+	end
+	return (string.gsub(encoded, '\1?[\1\128-\255]', unescape))
+end
+
+-- Parse the TxCompactText message raw data:
+-- [x_msb, x_lsb, y_msb, y_lsb, palette_offset, spacing, dictionary_id, encoded_text...]
+-- The result is the same as plain_text.parse_plain_text() gives for the decoded text,
+-- or nil if the text was encoded with a different dictionary
+function _M.parse_compact_text(data)
+	local text = plain_text.parse_plain_text(string.sub(data, 1, 6))
+	local dictionary_id = string.byte(data, 7)
+	if dictionary_id ~= dictionary.id then
+		print('Error: text encoded with dictionary ' .. tostring(dictionary_id) .. ', but ' .. dictionary.id .. ' is installed')
+		return nil
+	end
+	text.string = _M.decode_text(string.sub(data, 8))
+	return text
+end
+
+return _M
@@ -3,16 +3,86 @@ local code = require('code.min')
 local audio = require('audio.min')
 local tap = require('tap.min')
 local plain_text = require('plain_text.min')
+local camera = require('camera.min')
+local battery = require('battery.min')
+local batch = require('batch')
 
 -- Phone to Frame flags
 TAP_SUBS_MSG = 0x10
 AUDIO_SUBS_MSG = 0x30
 TEXT_FLAG = 0x0a
+BATCH_FLAG = 0x0b
+COMPACT_TEXT_FLAG = 0x0e
+CAPTURE_SETTINGS_MSG = 0x0d
+BATTERY_REQUEST_MSG = 0x12
+AUDIO_FORMAT_MSG = 0x31
+
+-- Frame to phone flags
+IMAGE_MSG = 0x07
+IMAGE_FINAL_MSG = 0x08
+
+-- Photo pieces sent per loop iteration at most, between the audio reads
+PHOTO_CHUNKS_PER_LOOP = 4
+
+-- Parse the microphone format chosen by the host:
+-- [sample_rate_msb, sample_rate_lsb, bit_depth]
+function parse_audio_format(data)
+    local audio_format = {}
+    audio_format.sample_rate = string.byte(data, 1) << 8 | string.byte(data, 2)
+    audio_format.bit_depth = string.byte(data, 3)
+    return audio_format
+end
 
 -- register the message parsers
 data.parsers[TAP_SUBS_MSG] = code.parse_code
 data.parsers[AUDIO_SUBS_MSG] = code.parse_code
 data.parsers[TEXT_FLAG] = plain_text.parse_plain_text
+-- compact text is only uploaded when the host uses it, so load its parser (and the
+-- dictionary, ~17 KB) on the first compact message rather than at startup
+data.parsers[COMPACT_TEXT_FLAG] = function(data)
+    return require('compact_text').parse_compact_text(data)
+end
+data.parsers[BATCH_FLAG] = batch.parse_batch
+data.parsers[CAPTURE_SETTINGS_MSG] = camera.parse_capture_settings
+data.parsers[BATTERY_REQUEST_MSG] = code.parse_code
+data.parsers[AUDIO_FORMAT_MSG] = parse_audio_format
+
+-- Send the next piece of a captured photo (as camera.capture_and_send() would) if
+-- Bluetooth has room for it, without waiting; a piece that didn't fit is retried next time.
+-- Returns the photo's state, or nil once the final message is sent
+function send_photo_chunk(photo)
+    if not photo.ready then
+        -- still capturing
+        photo.ready = frame.camera.image_ready()
+        if not photo.ready then
+            return photo
+        end
+    end
+    if photo.pending == nil then
+        local chunk
+        if photo.raw then
+            chunk = frame.camera.read_raw(frame.bluetooth.max_length() - 1)
+        else
+            chunk = frame.camera.read(frame.bluetooth.max_length() - 1)
+        end
+        if chunk ~= nil then
+            photo.pending = string.char(IMAGE_MSG) .. chunk
+        else
+            photo.pending = string.char(IMAGE_FINAL_MSG)
+            photo.final = true
+        end
+    end
+    if pcall(frame.bluetooth.send, photo.pending) then
+        if photo.final then
+            return nil
+        end
+        photo.pending = nil
+        photo.sent = true
+    else
+        photo.sent = false
+    end
+    return photo
+end
 
 function print_text(text)
     -- Clear the display first by writing a space
@@ -40,6 +110,12 @@ function app_loop()
 
     local streaming = false
     local audio_data = ''
+    local last_auto_exp = 0
+    -- a photo being captured or sent, interleaved with the audio stream
+    local photo = nil
+    local audio_behind = false
+    -- the host may change this between recordings as the link allows
+    local audio_format = {sample_rate=8000, bit_depth=16}
 
     while true do
         rc, err = pcall(
@@ -48,6 +124,10 @@ function app_loop()
                 local items_ready = data.process_raw_items()
 
                 if items_ready > 0 then
+                    -- A batch has already been unpacked into the individual
+                    -- app_data entries by its parser, so just drop the summary
+                    data.app_data[BATCH_FLAG] = nil
+
                     -- Handle tap subscription
                     if data.app_data[TAP_SUBS_MSG] ~= nil then
                         if data.app_data[TAP_SUBS_MSG].value == 1 then
@@ -63,13 +143,26 @@ function app_loop()
                         data.app_data[TAP_SUBS_MSG] = nil
                     end
 
+                    -- Handle microphone format changes (sent before the audio start they apply to)
+                    if data.app_data[AUDIO_FORMAT_MSG] ~= nil then
+                        local requested = data.app_data[AUDIO_FORMAT_MSG]
+                        if (requested.sample_rate == 8000 or requested.sample_rate == 16000) and
+                                (requested.bit_depth == 8 or requested.bit_depth == 16) then
+                            audio_format = requested
+                        else
+                            print('Unsupported audio format: ' .. requested.sample_rate .. '/' .. requested.bit_depth)
+                        end
+                        data.app_data[AUDIO_FORMAT_MSG] = nil
+                    end
+
                     -- Handle audio control
                     if data.app_data[AUDIO_SUBS_MSG] ~= nil then
                         if data.app_data[AUDIO_SUBS_MSG].value == 1 then
                             if not streaming then
                                 audio_data = ''
                                 streaming = true
-                                audio.start({sample_rate=8000, bit_depth=16})
+                                -- audio.start() always uses 8kHz/16-bit, so start the microphone directly
+                                pcall(frame.microphone.start, {sample_rate=audio_format.sample_rate, bit_depth=audio_format.bit_depth})
                             end
                         else
                             if streaming then
@@ -83,6 +176,12 @@ function app_loop()
                         data.app_data[AUDIO_SUBS_MSG] = nil
                     end
 
+                    -- Compact text decodes to the same as a plain text message
+                    if data.app_data[COMPACT_TEXT_FLAG] ~= nil then
+                        data.app_data[TEXT_FLAG] = data.app_data[COMPACT_TEXT_FLAG]
+                        data.app_data[COMPACT_TEXT_FLAG] = nil
+                    end
+
                     -- Handle plain text messages
                     if data.app_data[TEXT_FLAG] ~= nil and data.app_data[TEXT_FLAG].string ~= nil then
                         local text = data.app_data[TEXT_FLAG]
@@ -92,6 +191,50 @@ function app_loop()
                         data.app_data[TEXT_FLAG] = nil
                         collectgarbage('collect')
                     end
+
+                    -- Handle battery level requests (for the "show battery" command)
+                    if data.app_data[BATTERY_REQUEST_MSG] ~= nil then
+                        battery.send_batt_if_elapsed(0, 0)
+                        data.app_data[BATTERY_REQUEST_MSG] = nil
+                    end
+
+                    -- Handle photo requests (sent alongside the audio start in vision mode):
+                    -- start the capture here, and send the photo a piece per loop iteration below
+                    -- rather than with camera.capture_and_send(), which would hold up the audio
+                    if data.app_data[CAPTURE_SETTINGS_MSG] ~= nil then
+                        local settings = data.app_data[CAPTURE_SETTINGS_MSG]
+                        local rc, err = pcall(frame.camera.capture, {resolution=settings.resolution, quality=settings.quality, pan=settings.pan})
+                        if rc == false then
+                            print(err)
+                        else
+                            photo = {raw=settings.raw}
+                        end
+                        data.app_data[CAPTURE_SETTINGS_MSG] = nil
+                    end
+                end
+
+                -- keep the auto exposure settled so a photo can be taken at any time
+                -- (the algorithm expects to be run every 100ms), except while the camera is busy with one
+                if photo == nil and camera.is_auto_exp and frame.time.utc() - last_auto_exp >= 0.1 then
+                    camera.run_auto_exposure()
+                    last_auto_exp = frame.time.utc()
+                end
+
+                -- Send a few pieces of the photo once it's ready, unless the audio is falling behind;
+                -- they go before this iteration's audio so they aren't always queued behind it
+                if photo ~= nil and not audio_behind then
+                    for i = 1, PHOTO_CHUNKS_PER_LOOP do
+                        local rc, result = pcall(send_photo_chunk, photo)
+                        if rc == false then
+                            print(result)
+                            photo = nil
+                        else
+                            photo = result
+                        end
+                        if photo == nil or not photo.sent then
+                            break
+                        end
+                    end
                 end
 
                 -- Handle audio streaming
@@ -108,8 +251,18 @@ function app_loop()
                     if sent == nil then
                         streaming = false
                     end
+                    -- still reading audio after 10 sends: the microphone buffer is filling up
+                    audio_behind = sent ~= nil and sent > 0
+                else
+                    audio_behind = false
+                end
 
+                if streaming then
                     -- 8kHz/16 bit is 16000b/s, which is ~66 packets/second, or 1 every 15ms
+                    -- (16kHz/16 bit doubles that, still well within 10 reads per 5ms)
+                    frame.sleep(0.005)
+                elseif photo ~= nil then
+                    -- a photo piece fits in about every 16ms at typical throughput
                     frame.sleep(0.005)
                 else
                     -- not streaming, sleep for longer
@@ -1,22 +1,100 @@
 import asyncio
 import os
+import time
 from datetime import datetime
+from functools import partial
 
-from frame_msg import FrameMsg, RxAudio, RxTap, TxCode, TxPlainText
+from frame_msg import FrameMsg, RxAudio, TxCode, TxPlainText
 from utils.mock_ai import mock_process_audio
 from utils.text import format_text_for_frame
-from utils.message import safe_send_message
+from utils.message import safe_send_message, safe_send_batch, send_uninterrupted
 from utils.frame_utils import cleanup
-from utils.audio_utils import transcribe_audio, cleanup_old_audio_files
-from utils.ai_utils import get_ai_response
+from utils.audio_utils import cleanup_old_audio_files, get_client
+from utils.ai_utils import (get_ai_response, get_chatbot_app, get_model_router, clear_conversation_history,
+                            response_stats, CHAT_MODEL, FAST_MODEL)
+from utils.http_client import prewarm_connection, close_http_client
+from utils.audio_buffer import AudioRingBuffer
+from utils.keyword_spotter import TemplateKeywordSpotter
+from utils.pipeline import InteractionScheduler
+from utils.vision import PhotoCapture
+from utils.capture_policy import CapturePolicy, TimedRxPhoto
+from utils.transcription import CloudTranscriber, LocalTranscriber, TranscriptionRouter
+from utils.gestures import GESTURE_ACTIONS, GestureClassifier, RxGesture, REVOKED, TENTATIVE
+from utils.intents import IntentRouter
+from utils.battery import RxBattery
+from utils.session_log import SessionRecorder
+from utils.audio_format import AudioFormatPolicy, TimedRxAudio, DEFAULT_FORMAT, pcm_to_wav
+from utils.worker_pool import WorkerPool
+from utils.compact_text import DICTIONARY_FILE, dictionary_lua, pack_text
 
 TEXT_CHANNEL = 0x0a
 TAP_CHANNEL = 0x10
 AUDIO_CHANNEL = 0x30
 
-async def display_text_safely(frame, text_blocks, max_retries=2):
+# Continuous capture: keep the microphone streaming into a host-side ring buffer
+# so a tap marks a point slightly in the past instead of starting the recording
+CONTINUOUS_CAPTURE = False
+RING_BUFFER_SECONDS = 30.0
+PREROLL_SECONDS = 0.5
+
+# Audio format: in tap-to-record mode, choose the sample rate and bit depth for each
+# recording from the throughput the link achieved on previous ones (8kHz/16-bit if False).
+# Continuous capture always streams 8kHz/16-bit, which its ring buffer and keyword spotter expect.
+ADAPTIVE_AUDIO_FORMAT = True
+
+# Keyword spotting: map of keyword to an example WAV recording of it (16-bit mono, 8kHz).
+# When set, saying a keyword acts like a tap; this needs continuous capture.
+KEYWORD_TEMPLATES = {}
+# Seconds after a keyword is acted on during which further detections are ignored
+KEYWORD_DEBOUNCE_SECONDS = 2.0
+
+# Vision: take a photo when recording starts and send it to the model with the question
+VISION_ENABLED = False
+# Seconds the photo may take to arrive; resolution and quality are chosen from the measured
+# Bluetooth throughput to fit it, and each capture is logged to PHOTO_CAPTURE_LOG if set
+PHOTO_LATENCY_BUDGET = 2.0
+PHOTO_CAPTURE_LOG = None
+
+# Offline transcription: a faster-whisper model (e.g. 'base.en') to run on this machine for
+# short clips and whenever the transcription service can't be reached; None for cloud only
+LOCAL_WHISPER_MODEL = None
+
+# Session recording: log every message sent to Frame and every packet received from it
+# to this file (summarize or replay it with benchmarks/session_summary.py); None to disable
+SESSION_LOG = None
+
+# Compact text: send pages encoded with the dictionary shared with lua/compact_text.lua
+# whenever that's smaller than the plain text. Off by default: at the usual MTU a page
+# fits in one packet either way (benchmarks/compact_text.py), so it only saves packets
+# on small-MTU links, at the cost of ~17 KB of Frame memory and two uploads at connect
+COMPACT_TEXT = False
+
+# CPU-heavy work (converting recordings, preparing photos) runs in this many worker
+# processes, sharing payloads through shared memory, so it can't delay Bluetooth traffic
+# (benchmarks/ble_jitter.py measures the difference); 0 to do it in this process
+OFFLOAD_WORKERS = 2
+
+def warm_up_clients():
+    """
+    Build the OpenAI client and the chatbot graph ahead of the first interaction.
+    Runs in a worker thread so their slow imports overlap with connecting to Frame.
+    """
+    get_client()
+    get_chatbot_app(FAST_MODEL)
+    get_chatbot_app(CHAT_MODEL)
+
+def text_message(text):
+    """The (msg_code, payload) that shows text on Frame, compact if COMPACT_TEXT and smaller."""
+    if COMPACT_TEXT:
+        return pack_text(text)
+    return TEXT_CHANNEL, TxPlainText(text).pack()
+
+async def display_text_safely(frame, text_blocks, max_retries=2, page_turn=None, hold=None):
     """
     Safely display text on the Frame with retries.
+    Each page stays up for 5 seconds, or until page_turn (an asyncio.Event) is set,
+    and no page is sent while hold() returns True. A page that has started sending is
+    always sent in full, so cancelling the display only takes effect between pages.
     """
     for attempt in range(max_retries):
         try:
@@ -25,8 +103,10 @@ async def display_text_safely(frame, text_blocks, max_retries=2):
             
             # Display each block with a small delay
             for block in formatted_text:
-                await safe_send_message(frame, TEXT_CHANNEL, TxPlainText(block).pack())
-                await asyncio.sleep(5)
+                while hold is not None and hold():
+                    await asyncio.sleep(0.05)
+                await send_uninterrupted(frame, *text_message(block))
+                await wait_for_page_turn(page_turn, 5)
             return True
         except Exception as e:
             print(f"Error displaying text (attempt {attempt + 1}/{max_retries}): {e}")
@@ -34,6 +114,28 @@ async def display_text_safely(frame, text_blocks, max_retries=2):
                 await asyncio.sleep(1.0)  # Wait before retry
     return False
 
+async def wait_for_page_turn(page_turn, timeout):
+    """
+    Wait until the page should change: after timeout seconds, or sooner when page_turn is set.
+    """
+    if page_turn is None:
+        await asyncio.sleep(timeout)
+        return
+    try:
+        await asyncio.wait_for(page_turn.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    page_turn.clear()
+
+async def discard_clip(audio_queue, timeout=5.0):
+    """
+    Drop the clip of an abandoned single-clip recording so the next capture doesn't get it.
+    """
+    try:
+        await asyncio.wait_for(audio_queue.get(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+
 async def collect_audio_data(audio_queue, max_retries=3, timeout=5.0):
     """
     Attempt to collect audio data with retries.
@@ -56,17 +158,257 @@ async def collect_audio_data(audio_queue, max_retries=3, timeout=5.0):
     
     return None
 
-async def main():
+async def capture_recording(interaction, audio_queue=None, ring_buffer=None):
+    """
+    Pipeline stage: gather the PCM for a finished recording.
+
+    Args:
+        interaction: The Interaction being processed
+        audio_queue: Queue from a single-clip RxAudio (tap-to-record mode)
+        ring_buffer: The AudioRingBuffer (continuous capture mode)
+    """
+    # Small delay to ensure all audio recorded before the tap has arrived
+    await asyncio.sleep(0.5)
+
+    if ring_buffer is not None:
+        interaction.audio_samples = ring_buffer.read_bytes(interaction.capture_start)
+    else:
+        # Collect audio data with retries
+        interaction.audio_samples = await collect_audio_data(audio_queue)
+
+    if not interaction.audio_samples:
+        raise Exception("Failed to collect audio data after all retries")
+
+async def transcribe_recording(interaction, transcriber, pool=None):
+    """
+    Pipeline stage: save the recording as a WAV file and transcribe it.
+
+    Args:
+        interaction: The Interaction being processed
+        transcriber: The TranscriptionBackend to use
+        pool: Optional WorkerPool to convert the recording in
+    """
+    # Convert to 16-bit at the recorded rate, whatever format the link allowed, then to WAV
+    audio_format = interaction.audio_format or DEFAULT_FORMAT
+    if pool is not None:
+        wav_bytes = await pool.submit(pcm_to_wav, interaction.audio_samples, audio_format)
+    else:
+        wav_bytes = pcm_to_wav(interaction.audio_samples, audio_format)
+
+    # Save the file
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    wav_file_path = os.path.join('audio', f'frame_audio_{timestamp}_{interaction.id}.wav')
+
+    with open(wav_file_path, 'wb') as wav_file:
+        wav_file.write(wav_bytes)
+
+    print(f"Audio saved to: {wav_file_path}")
+    interaction.wav_file_path = wav_file_path
+
+    # Clean up old audio files, keeping only the last 5
+    cleanup_old_audio_files()
+
+    print("Transcribing audio...")
+    interaction.transcript = await transcriber.transcribe(wav_file_path)
+    print(f"Transcribed text: {interaction.transcript}")
+
+def build_intent_router(frame, rx_battery, last_displayed):
+    """
+    The commands answered on the host without a model round trip.
+
+    Args:
+        frame: The FrameMsg instance
+        rx_battery: An attached RxBattery
+        last_displayed: Callable returning the Interaction most recently shown, or None
+    """
+    intents = IntentRouter()
+
+    async def repeat(transcript):
+        last = last_displayed()
+        return last.response if last is not None and last.response else "Nothing to repeat"
+
+    async def tell_time(transcript):
+        return f"It's {datetime.now():%H:%M}"
+
+    async def clear_history(transcript):
+        clear_conversation_history()
+        return "Conversation cleared"
+
+    async def show_battery(transcript):
+        level = await rx_battery.request(frame)
+        return f"Battery: {level}%" if level is not None else "Battery level unavailable"
+
+    intents.register('repeat', ["repeat that", "repeat", "say that again", "what did you say"], repeat)
+    intents.register('time', ["what time is it", "what's the time", "time"], tell_time)
+    intents.register('clear_history', ["clear history", "clear the conversation", "start over",
+                                       "forget everything"], clear_history)
+    intents.register('battery', ["show battery", "battery level", "how much battery is left",
+                                 "what's my battery"], show_battery)
+    return intents
+
+async def complete_interaction(interaction, intents=None):
+    """
+    Pipeline stage: get the AI response for the transcript, including the photo
+    taken when the recording started (if any). The photo has normally been
+    received and prepared while the user was still speaking.
+
+    Commands matched by intents (an IntentRouter) are answered locally instead.
+    """
+    if intents is not None:
+        response = await intents.route(interaction.transcript)
+        if response is not None:
+            if interaction.photo is not None:
+                interaction.photo.cancel()
+            interaction.response = response
+            return
+
+    image_url = None
+    if interaction.photo is not None:
+        image_url = await interaction.photo.result()
+
+    print("Getting AI response...")
+    interaction.response = await get_ai_response(interaction.transcript, image_url=image_url)
+    print(f"AI response: {interaction.response}")
+
+async def display_interaction(interaction, frame, is_recording, page_turn=None):
+    """
+    Pipeline stage: page the AI response on the display. Cancelled by the scheduler
+    when a newer answer arrives or a new recording starts.
+
+    Args:
+        interaction: The Interaction being processed
+        frame: The FrameMsg instance
+        is_recording: Callable returning True while a new recording is in progress
+        page_turn: Optional asyncio.Event set to skip to the next page
+    """
+    if page_turn is not None:
+        # a page turn requested before this answer arrived isn't meant for it
+        page_turn.clear()
+    # pages wait while a new recording owns the display
+    if not await display_text_safely(frame, [interaction.response], page_turn=page_turn, hold=is_recording):
+        print("Failed to display results on Frame")
+        await safe_send_message(frame, *text_message("Display failed"))
+
+    if not is_recording():
+        print("Waiting for next tap...")
+        await safe_send_message(frame, *text_message("Tap to record"))
+
+async def report_stage_error(interaction, stage, error, frame, is_recording):
+    """
+    Scheduler error callback: show what failed, unless a new recording owns the display.
+    """
+    if not is_recording():
+        message = "Recording failed" if stage == "capture" else "Processing failed"
+        await safe_send_message(frame, *text_message(message))
+
+async def feed_ring_buffer(audio_queue, ring_buffer, keyword_spotter=None, trigger_queue=None,
+                           debounce=KEYWORD_DEBOUNCE_SECONDS):
+    """
+    Copy streamed audio chunks into the ring buffer until the stream ends.
+
+    Args:
+        audio_queue: Queue from a streaming-mode RxAudio
+        ring_buffer: The AudioRingBuffer holding the latest audio
+        keyword_spotter: Optional KeywordSpotter that sees every chunk
+        trigger_queue: Queue that detected keywords are put on (the tap queue)
+        debounce: Seconds after a queued keyword during which detections are dropped
+    """
+    last_keyword = None
+    while True:
+        chunk = await audio_queue.get()
+        if chunk is None:
+            break
+        ring_buffer.write(chunk)
+
+        if keyword_spotter is not None:
+            keyword = keyword_spotter.process_chunk(chunk)
+            if keyword is None:
+                continue
+            # while the tap loop is still busy with an earlier trigger, a queued keyword would
+            # replay later and toggle recording again, so keep at most one and space them out
+            now = time.monotonic()
+            if not trigger_queue.empty() or (last_keyword is not None and now - last_keyword < debounce):
+                print(f"Ignoring keyword '{keyword}' while the last trigger is handled")
+                continue
+            last_keyword = now
+            await trigger_queue.put(keyword)
+
+async def main(continuous_capture=CONTINUOUS_CAPTURE, keyword_spotter=None, vision=VISION_ENABLED, transcriber=None,
+               session_log=SESSION_LOG):
     """
     Listen for taps on the Frame and record audio when a tap is detected.
     First tap starts recording, second tap stops recording.
     Process the audio through mock AI functions and display results.
+
+    Taps are classified on the host into gestures (see GESTURE_ACTIONS): a single tap
+    stops recording without waiting for the multi-tap window, and is undone if it becomes
+    a double tap (cancel) or a triple tap (repeat the last answer). A single tap starts
+    recording once it is confirmed, so a double tap (next page) doesn't disturb the
+    answer being read; with continuous_capture the recording still begins from the tap.
+
+    With continuous_capture, Frame streams audio the whole time into a host-side
+    ring buffer and the first tap marks a start point PREROLL_SECONDS in the past,
+    so speech that begins before the tap reaches the host isn't lost.
+
+    Otherwise each recording's sample rate and bit depth are negotiated with Frame from
+    how well previous clips kept up over the link (see utils/audio_format.py), and
+    8-bit recordings are widened to 16-bit before transcription (at the recorded rate).
+
+    A keyword_spotter (which implies continuous_capture) is fed the same audio and
+    any keyword it detects toggles recording exactly like a tap.
+
+    With vision, each recording also triggers a photo that is downscaled in a worker
+    thread while the user speaks, and the question is answered about that photo.
+
+    Commands like "repeat that", "what time is it", "clear history" and "show battery"
+    are matched on the host (see build_intent_router) and answered without the model.
+
+    Recordings are transcribed by transcriber (a TranscriptionBackend, OpenAI Whisper by
+    default), which can route to a local model when offline.
+
+    Converting recordings and preparing photos run in OFFLOAD_WORKERS worker processes
+    (see utils/worker_pool.py), leaving this process's event loop free for the Bluetooth link.
+
+    With session_log, all traffic over the link once the Frame app starts is recorded
+    to that file for later analysis and replay (see utils/session_log.py).
+
+    Finished recordings go through an InteractionScheduler, so capture, transcription,
+    completion and display run as concurrent stages and a new question can be recorded
+    while the previous answer is still being shown (starting one supersedes it).
     """
     frame = FrameMsg()
     speaker = None
     recording = False  # Initialize recording state
     rx_audio = None
     rx_tap = None
+    rx_photo = None
+    rx_battery = None
+    photo = None
+    recording_start = None
+    ring_buffer = None
+    ring_feeder = None
+    scheduler = None
+    recorder = None
+    audio_policy = None
+    pool = WorkerPool(OFFLOAD_WORKERS) if OFFLOAD_WORKERS else None
+    continuous_capture = continuous_capture or keyword_spotter is not None
+    is_recording = lambda: recording
+    transcriber = transcriber or CloudTranscriber()
+
+    # warm up the AI clients (and load any local model) while we connect and upload the Lua app
+    warm_up = asyncio.create_task(asyncio.to_thread(warm_up_clients))
+    load_transcriber = asyncio.create_task(transcriber.start())
+    start_pool = asyncio.create_task(pool.start()) if pool is not None else None
+    warmed_up = False
+
+    # fire-and-forget work (pre-warming, discarding orphaned clips): the event loop only keeps
+    # weak references to tasks, so hold them here until they finish, and cancel them on exit
+    background_tasks = set()
+
+    def run_in_background(coroutine):
+        task = asyncio.create_task(coroutine)
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
 
     try:
         await frame.connect()
@@ -78,7 +420,15 @@ async def main():
         print(f"Battery Level/Memory used: {batt_mem}")
 
         # send the std lua files to Frame that handle data accumulation, TxCode signalling and audio
-        await frame.upload_stdlua_libs(lib_names=['data', 'code', 'audio', 'tap', 'plain_text'])
+        await frame.upload_stdlua_libs(lib_names=['data', 'code', 'audio', 'tap', 'plain_text', 'camera', 'battery'])
+
+        # send the batch parser that lets several messages share a single write
+        await frame.upload_file("lua/batch.lua", "batch.lua")
+
+        if COMPACT_TEXT:
+            # send the compact text parser and the dictionary it shares with this program
+            await frame.upload_file("lua/compact_text.lua", "compact_text.lua")
+            await frame.ble.upload_file_from_string(dictionary_lua(), DICTIONARY_FILE)
 
         # Send the main lua application from this project to Frame that will run the app
         await frame.upload_frame_app(local_filename="lua/tap_audio.lua")
@@ -86,6 +436,11 @@ async def main():
         # attach the print response handler so we can see stdout from Frame Lua print() statements
         frame.attach_print_response_handler()
 
+        # record the session from here on, so print output and app messages are captured
+        if session_log:
+            recorder = SessionRecorder(session_log)
+            recorder.attach(frame)
+
         # Start the frame app
         await frame.start_frame_app()
 
@@ -93,94 +448,232 @@ async def main():
         os.makedirs('audio', exist_ok=True)
 
         # Set up audio recording
-        rx_audio = RxAudio()
-        audio_queue = await rx_audio.attach(frame)
+        if continuous_capture:
+            # stream every chunk into a fixed-size ring buffer and leave the microphone on
+            rx_audio = RxAudio(streaming=True)
+            audio_queue = await rx_audio.attach(frame)
+            ring_buffer = AudioRingBuffer(seconds=RING_BUFFER_SECONDS, sample_rate=8000)
+        else:
+            # the policy measures how each clip kept up to choose the next one's format
+            audio_policy = AudioFormatPolicy() if ADAPTIVE_AUDIO_FORMAT else None
+            rx_audio = TimedRxAudio(audio_policy) if audio_policy is not None else RxAudio()
+            audio_queue = await rx_audio.attach(frame)
+
+        # Set up photo capture; rotation is left to the worker thread that prepares the image
+        if vision:
+            capture_policy = CapturePolicy(latency_budget=PHOTO_LATENCY_BUDGET, log_path=PHOTO_CAPTURE_LOG)
+            rx_photo = TimedRxPhoto(capture_policy, upright=False)
+            photo_queue = await rx_photo.attach(frame)
 
-        # Set up tap detection
-        rx_tap = RxTap()
+        # Battery level reports, for the "show battery" command
+        rx_battery = RxBattery()
+        await rx_battery.attach(frame)
+
+        # Set up tap detection: raw taps are classified into gestures on the host
+        gestures = GestureClassifier(GESTURE_ACTIONS, mode='idle')
+        rx_tap = RxGesture(gestures)
         tap_queue = await rx_tap.attach(frame)
+        page_turn = asyncio.Event()
+
+        if continuous_capture:
+            # detected keywords share the tap queue so they drive the same start/stop toggle
+            ring_feeder = asyncio.create_task(
+                feed_ring_buffer(audio_queue, ring_buffer, keyword_spotter, tap_queue))
+            await safe_send_message(frame, AUDIO_CHANNEL, TxCode(value=1).pack())
+
+        # The clients are normally ready by now; if not they'll be built on first use
+        try:
+            await warm_up
+        except Exception as e:
+            print(f"Error warming up AI clients: {e}")
+        try:
+            await load_transcriber
+        except Exception as e:
+            print(f"Error loading transcription model: {e}")
+        if start_pool is not None:
+            try:
+                await start_pool
+            except Exception as e:
+                print(f"Error starting worker processes, working in-process: {e}")
+                await pool.close()
+                pool = None
+        warmed_up = True
+
+        # Deterministic commands are answered locally; everything else goes to the model
+        intents = build_intent_router(frame, rx_battery, lambda: scheduler.last_displayed)
+
+        # Each finished recording flows through these stages concurrently with the tap loop
+        scheduler = InteractionScheduler(
+            stages=[
+                ("capture", partial(capture_recording, audio_queue=audio_queue, ring_buffer=ring_buffer)),
+                ("transcribe", partial(transcribe_recording, transcriber=transcriber, pool=pool)),
+                ("complete", partial(complete_interaction, intents=intents)),
+                ("display", partial(display_interaction, frame=frame, is_recording=is_recording, page_turn=page_turn)),
+            ],
+            queue_size=2,
+            on_error=partial(report_stage_error, frame=frame, is_recording=is_recording),
+        )
+        scheduler.start()
 
         # Start listening for taps - this command tells Frame we are ready to receive taps
         await safe_send_message(frame, TAP_CHANNEL, TxCode(value=1).pack())
         print("Waiting for tap... (Press Ctrl+C to exit)")
 
+        async def start_recording(trigger=None, tap_time=None):
+            """Start a recording; returns a callable that abandons it again."""
+            nonlocal recording, recording_start, photo
+            print("Starting recording...")
+            recording = True
+            gestures.mode = 'recording'
+            # a transcription request is coming, so get the API connection ready now
+            run_in_background(prewarm_connection())
+            # the display is about to show "Recording...", so stop paging any previous answer
+            scheduler.supersede()
+
+            start_messages = [text_message("Recording...")]
+            if continuous_capture:
+                # audio is already flowing, so just mark where this recording begins: before the
+                # tap that started it, which was confirmed a multi-tap window later; a keyword
+                # has just finished so start right after it instead
+                preroll = 0.0 if isinstance(trigger, str) else PREROLL_SECONDS
+                if tap_time is not None:
+                    preroll += time.monotonic() - tap_time
+                recording_start = ring_buffer.mark(preroll)
+            else:
+                start_messages.insert(0, (AUDIO_CHANNEL, TxCode(value=1).pack()))
+                if audio_policy is not None:
+                    # the format has to be parsed before the start it applies to
+                    start_messages.insert(0, audio_policy.format_message())
+            if vision:
+                # take the photo now so it's ready by the time the transcript is
+                photo = PhotoCapture(photo_queue, policy=capture_policy, pool=pool)
+                start_messages.append(photo.capture_message())
+
+            # Start recording (and the photo) and update the display in one round trip
+            await safe_send_batch(frame, start_messages)
+            if photo is not None:
+                photo.start()
+            return partial(abandon_recording, "Tap to record")
+
+        async def stop_recording():
+            """Stop the recording and queue it for processing; returns a callable that drops it again."""
+            nonlocal recording, photo
+            print("Stopping recording...")
+            recording = False
+            gestures.mode = 'idle'
+            if continuous_capture:
+                await safe_send_message(frame, *text_message("Processing..."))
+                interaction = scheduler.submit(capture_start=recording_start, photo=photo)
+            else:
+                if audio_policy is not None:
+                    audio_policy.recording_stopped()
+                # Stop recording and update the display in one round trip
+                await safe_send_batch(frame, [
+                    (AUDIO_CHANNEL, TxCode(value=0).pack()),
+                    text_message("Processing..."),
+                ])
+                interaction = scheduler.submit(photo=photo,
+                                               audio_format=audio_policy.current if audio_policy is not None else None)
+            photo = None
+
+            # don't wait for the answer: the next tap can start a new recording right away
+            async def drop():
+                interaction.cancelled = True
+                print(f"Dropped interaction {interaction.id}")
+            return drop
+
+        async def abandon_recording(message):
+            """Stop the recording without processing it."""
+            nonlocal recording, photo
+            if not recording:
+                return
+            print("Abandoning recording")
+            recording = False
+            gestures.mode = 'idle'
+            if photo is not None:
+                photo.cancel()
+                photo = None
+            messages = [text_message(message)]
+            if not continuous_capture:
+                messages.insert(0, (AUDIO_CHANNEL, TxCode(value=0).pack()))
+                # the clip still arrives when the microphone stops; don't let the next capture take it
+                run_in_background(discard_clip(audio_queue))
+            await safe_send_batch(frame, messages)
+
+        async def perform(action, trigger=None, tap_time=None):
+            """Carry out a gesture (or keyword) action; returns a callable that undoes it, if it can be undone."""
+            print(f"Action: {action}")
+            if action == 'record':
+                return await stop_recording() if recording else await start_recording(trigger, tap_time)
+            if action == 'cancel':
+                if recording:
+                    await abandon_recording("Cancelled")
+                else:
+                    scheduler.cancel_all()
+                    await safe_send_message(frame, *text_message("Tap to record"))
+            elif action == 'next_page':
+                page_turn.set()
+            elif action == 'repeat':
+                last = scheduler.last_displayed
+                if last is not None and last.response:
+                    scheduler.supersede()
+                    scheduler.submit(stage="display", transcript=last.transcript, response=last.response)
+            return None
+
+        single_acted = False
+        undo_single = None
+        # when a tentative single tap that would start a recording was made
+        pending_start = None
+
         while True:
             try:
-                # Wait for tap signal
-                await asyncio.wait_for(tap_queue.get(), timeout=10.0)
-                
-                if not recording:
-                    print("Tap detected! Starting recording...")
-                    recording = True
-                    # Start audio recording
-                    await safe_send_message(frame, AUDIO_CHANNEL, TxCode(value=1).pack())
-                    await safe_send_message(frame, TEXT_CHANNEL, TxPlainText("Recording...").pack())
-                else:
-                    print("Tap detected! Stopping recording...")
-                    recording = False
-                    # Stop recording
-                    await safe_send_message(frame, AUDIO_CHANNEL, TxCode(value=0).pack())
-                    await safe_send_message(frame, TEXT_CHANNEL, TxPlainText("Processing...").pack())
-                    
-                    # Small delay to ensure all audio data is collected
-                    await asyncio.sleep(0.5)
-                    
-                    # Collect audio data with retries
-                    audio_samples = await collect_audio_data(audio_queue)
-                    
-                    if audio_samples:
-                        # Convert to WAV
-                        wav_bytes = RxAudio.to_wav_bytes(audio_samples, sample_rate=8000, bits_per_sample=16, channels=1)
-                        
-                        # Save the file
-                        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                        wav_file_path = os.path.join('audio', f'frame_audio_{timestamp}.wav')
-                        
-                        with open(wav_file_path, 'wb') as wav_file:
-                            wav_file.write(wav_bytes)
-                        
-                        print(f"Audio saved to: {wav_file_path}")
-                        
-                        # Clean up old audio files, keeping only the last 5
-                        cleanup_old_audio_files()
-
-                        # Process audio through OpenAI Whisper
-                        print("Transcribing audio...")
-                        try:
-                            transcribed_text = await transcribe_audio(wav_file_path)
-                            print(f"Transcribed text: {transcribed_text}")
-                            
-                            # Get AI response
-                            print("Getting AI response...")
-                            ai_response = await get_ai_response(transcribed_text)
-                            print(f"AI response: {ai_response}")
-                            
-                            # Display both the transcribed text and AI response
-                            display_text = [
-                                ai_response
-                            ]
-                            
-                            if not await display_text_safely(frame, display_text):
-                                print("Failed to display results on Frame")
-                                await safe_send_message(frame, TEXT_CHANNEL, TxPlainText("Display failed").pack())
-                        except Exception as e:
-                            print(f"Error processing audio: {e}")
-                            await safe_send_message(frame, TEXT_CHANNEL, TxPlainText("Processing failed").pack())
+                # Wait for a gesture (or a keyword from the spotter)
+                trigger = await asyncio.wait_for(tap_queue.get(), timeout=10.0)
+                if isinstance(trigger, str):
+                    print(f"Keyword '{trigger}' detected!")
+                    await perform('record', trigger)
+                    continue
+
+                print(f"{trigger.gesture.capitalize()} tap ({trigger.status})")
+                if trigger.status == TENTATIVE:
+                    if trigger.action == 'record' and not recording:
+                        # starting shows "Recording..." over the answer being read, so wait until
+                        # the tap isn't a page turn after all; just get the API connection ready
+                        run_in_background(prewarm_connection())
+                        pending_start = trigger.time
                     else:
-                        print("Failed to collect audio data after all retries")
-                        await safe_send_message(frame, TEXT_CHANNEL, TxPlainText("Recording failed").pack())
-                    
-                    print("Waiting for next tap...")
-                    await safe_send_message(frame, TEXT_CHANNEL, TxPlainText("Tap to record").pack())
+                        # act on a single tap straight away, but be ready to take it back
+                        single_acted = True
+                        undo_single = await perform(trigger.action) if trigger.action else None
+                elif trigger.status == REVOKED:
+                    # it was the start of a multi-tap after all
+                    if undo_single is not None:
+                        await undo_single()
+                    single_acted = False
+                    undo_single = None
+                    pending_start = None
+                elif trigger.gesture == 'single' and single_acted:
+                    # the tentative single tap stands, and has already been acted on
+                    single_acted = False
+                    undo_single = None
+                elif trigger.action:
+                    tap_time, pending_start = pending_start, None
+                    await perform(trigger.action, trigger, tap_time)
             
             except asyncio.TimeoutError:
                 print("Timeout waiting for tap")
             except Exception as e:
                 print(f"Error during recording cycle: {e}")
+                error_messages = [text_message("Error occurred")]
                 if recording:
                     recording = False
-                    await safe_send_message(frame, AUDIO_CHANNEL, TxCode(value=0).pack())
-                await safe_send_message(frame, TEXT_CHANNEL, TxPlainText("Error occurred").pack())
+                    gestures.mode = 'idle'
+                    if photo is not None:
+                        photo.cancel()
+                        photo = None
+                    if not continuous_capture:
+                        error_messages.insert(0, (AUDIO_CHANNEL, TxCode(value=0).pack()))
+                await safe_send_batch(frame, error_messages)
                 await asyncio.sleep(1.0)
 
     except KeyboardInterrupt:
@@ -188,10 +681,44 @@ async def main():
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        if scheduler is not None:
+            await scheduler.stop()
+        if ring_feeder is not None:
+            ring_feeder.cancel()
+        if rx_photo is not None:
+            rx_photo.detach(frame)
+        if rx_battery is not None:
+            rx_battery.detach(frame)
         if rx_audio is not None and rx_tap is not None:
-            await cleanup(frame, rx_audio, rx_tap, recording)
+            # in continuous mode the microphone is always on and needs stopping
+            await cleanup(frame, rx_audio, rx_tap, recording or continuous_capture)
+        if recorder is not None:
+            recorder.detach(frame)
+            recorder.close()
         if speaker is not None:
             speaker.delete()
+        if not warmed_up:
+            # connecting failed before the warm-up tasks were awaited: stop them, and report
+            # an error they already hit rather than leaving it unretrieved
+            startup = [task for task in (warm_up, load_transcriber, start_pool) if task is not None]
+            for task in startup:
+                task.cancel()
+            for result in await asyncio.gather(*startup, return_exceptions=True):
+                if isinstance(result, Exception):
+                    print(f"Error during start-up: {result}")
+        await transcriber.close()
+        if pool is not None:
+            start_pool.cancel()
+            await pool.close()
+        await close_http_client()
+        if response_stats.responses:
+            print(f"Response lengths: {response_stats.report()}")
+            print(f"Model routing: {get_model_router().report()}")
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    spotter = TemplateKeywordSpotter.from_wav_files(KEYWORD_TEMPLATES) if KEYWORD_TEMPLATES else None
+    transcriber = TranscriptionRouter(local=LocalTranscriber(LOCAL_WHISPER_MODEL)) if LOCAL_WHISPER_MODEL else None
+    asyncio.run(main(keyword_spotter=spotter, transcriber=transcriber)) 
\ No newline at end of file
@@ -0,0 +1,83 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from utils.audio_format import AudioFormat, AudioFormatPolicy, convert_pcm, pcm_to_wav, resample
+
+def record(policy: AudioFormatPolicy, link: float, seconds: float = 5.0) -> AudioFormat:
+    """Record a clip in the policy's format over a link carrying link bytes/s, and report it."""
+    audio_format = policy.choose()
+    size = int(audio_format.byte_rate * seconds)
+    # the clip streams while recording; whatever the link couldn't carry arrives after the stop
+    transfer_time = max(seconds, size / link)
+    policy.stopped_at = 100.0 + seconds
+    policy.clip_received(size, 100.0, 100.0 + transfer_time)
+    return audio_format
+
+def test_fast_link_moves_up_to_the_best_format():
+    policy = AudioFormatPolicy()
+    formats = [record(policy, link=100000) for _ in range(4)]
+
+    assert formats[-1] == AudioFormat(16000, 16)
+
+def test_lagging_clip_brings_the_format_down():
+    policy = AudioFormatPolicy()
+    record(policy, link=5000)
+
+    assert policy.choose() == AudioFormat(8000, 8)
+
+def test_failed_probes_back_off():
+    policy = AudioFormatPolicy(initial=AudioFormat(8000, 8))
+    # 12 kB/s carries 8kHz/8-bit but not 8kHz/16-bit
+    formats = [record(policy, link=12000) for _ in range(60)]
+    lagged = [index for index, audio_format in enumerate(formats) if audio_format == AudioFormat(8000, 16)]
+
+    assert len(lagged) <= 4
+    gaps = np.diff(lagged)
+    assert all(later > earlier for earlier, later in zip(gaps, gaps[1:]))
+
+def test_successful_probe_resets_the_interval():
+    policy = AudioFormatPolicy(initial=AudioFormat(8000, 8))
+    for _ in range(4):
+        record(policy, link=12000)
+    # the link got better: the next probe succeeds and the one after comes at the usual interval
+    formats = [record(policy, link=100000) for _ in range(12)]
+
+    assert formats[-1] == AudioFormat(16000, 16)
+
+def test_resample_downsamples_by_averaging():
+    samples = np.array([0, 2, 4, 6, 100, 200], dtype=np.int16)
+
+    assert resample(samples, 16000, 8000).tolist() == [1, 5, 150]
+
+def test_resample_upsamples_by_interpolation():
+    samples = np.array([0, 100, 200], dtype=np.int16)
+
+    assert resample(samples, 8000, 16000).tolist() == [0, 50, 100, 150, 200, 200]
+
+@pytest.mark.parametrize('rate', [8000, 16000])
+def test_resample_to_the_same_rate_is_a_no_op(rate):
+    samples = np.arange(10, dtype=np.int16)
+
+    assert resample(samples, rate, rate) is samples
+
+def test_8_bit_pcm_is_widened():
+    pcm = np.array([0, 1, -1, 127, -128], dtype=np.int8).tobytes()
+
+    converted = np.frombuffer(convert_pcm(pcm, AudioFormat(8000, 8), 8000), dtype='<i2')
+    assert converted.tolist() == [0, 256, -256, 32512, -32768]
+
+def test_16_bit_pcm_drops_an_odd_byte():
+    pcm = np.array([1, -2, 300], dtype='<i2').tobytes() + b'\x00'
+
+    assert convert_pcm(pcm, AudioFormat(8000, 16), 8000) == pcm[:-1]
+
+def test_wav_keeps_the_recorded_rate():
+    pcm = bytes(8000)
+
+    with wave.open(io.BytesIO(pcm_to_wav(pcm, AudioFormat(8000, 8))), 'rb') as wav_file:
+        assert wav_file.getframerate() == 8000
+        assert wav_file.getsampwidth() == 2
+        assert wav_file.getnframes() == 8000
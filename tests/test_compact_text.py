@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+from frame_msg import TxPlainText
+
+from utils.compact_text import (COMPACT_TEXT_CHANNEL, DICTIONARY, DICTIONARY_FILE, ESCAPE, TEXT_CHANNEL,
+                                TxCompactText, decode_text, dictionary_lua, encode_text, pack_text)
+
+TAP_APP = str(Path(__file__).resolve().parent.parent / 'lua' / 'tap_audio.lua')
+
+TEXTS = [
+    "Tap to record",
+    "The quickest way there is the number twelve bus from across the road.",
+    # non-ASCII UTF-8, whose bytes would otherwise read as tokens
+    "The café in Zürich is about 5 € – it's the best.",
+    # the escape byte itself, next to a token and a non-ASCII character
+    "a\x01 the\x01\x01é",
+    "",
+]
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_round_trip(text):
+    assert decode_text(encode_text(text)) == text
+
+def test_tokens_travel_as_one_byte():
+    assert encode_text("Tap to record") == bytes((0x80,))
+    assert encode_text(" the and") == bytes((0x80 + DICTIONARY.index(" the"), 0x80 + DICTIONARY.index(" and")))
+
+def test_non_ascii_and_escape_bytes_are_escaped():
+    assert encode_text("é") == bytes((ESCAPE, 0xc3, ESCAPE, 0xa9))
+    assert encode_text("\x01") == bytes((ESCAPE, ESCAPE))
+
+def test_compact_message_when_it_is_smaller():
+    code, payload = pack_text("The answer is in the box.")
+
+    assert code == COMPACT_TEXT_CHANNEL
+    assert payload == TxCompactText("The answer is in the box.").pack()
+
+def test_plain_message_when_nothing_is_gained():
+    # no tokens, and the compact header's dictionary id byte makes it one byte longer
+    assert pack_text("xyz", x=5) == (TEXT_CHANNEL, TxPlainText("xyz", x=5).pack())
+
+@pytest.fixture
+def lua_decoder():
+    pytest.importorskip('lupa')
+    from utils.lua_harness import LuaHarness
+    lua = LuaHarness(TAP_APP, files={DICTIONARY_FILE: dictionary_lua()}).lua
+    lua.execute(b"compact_text = require('compact_text')")
+    return lua.globals()[b'compact_text'][b'parse_compact_text']
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_frame_decodes_the_packed_text(lua_decoder, text):
+    parsed = lua_decoder(TxCompactText(text, x=20, y=40, palette_offset=3).pack())
+
+    assert parsed[b'string'].decode('utf-8') == text
+    assert (parsed[b'x'], parsed[b'y'], parsed[b'palette_offset']) == (20, 40, 3)
+
+def test_frame_refuses_text_for_another_dictionary(lua_decoder):
+    payload = bytearray(TxCompactText("Tap to record").pack())
+    payload[6] ^= 0xff
+
+    assert lua_decoder(bytes(payload)) is None
@@ -0,0 +1,90 @@
+import pytest
+
+from utils.gestures import CONFIRMED, REVOKED, TENTATIVE, GestureClassifier, classify_timeline
+
+ACTIONS = {
+    'idle': {'single': 'record', 'double': 'next_page', 'triple': 'repeat'},
+    'recording': {'single': 'record', 'double': 'cancel'},
+    'paging': {'single': 'next_page'},
+}
+
+def summary(events):
+    return [(event.gesture, event.status, event.action) for event in events]
+
+def test_single_tap_is_acted_on_at_once_and_confirmed_when_the_window_expires():
+    events = classify_timeline(GestureClassifier(ACTIONS), [1.0])
+
+    assert summary(events) == [('single', TENTATIVE, 'record'), ('single', CONFIRMED, 'record')]
+    assert events[0].time == 1.0
+    assert events[1].time == pytest.approx(1.3)
+
+def test_double_tap_revokes_the_single_tap():
+    events = classify_timeline(GestureClassifier(ACTIONS), [1.0, 1.2])
+
+    assert summary(events) == [
+        ('single', TENTATIVE, 'record'),
+        ('single', REVOKED, 'record'),
+        ('double', CONFIRMED, 'next_page'),
+    ]
+    assert events[1].time == 1.2
+    assert events[2].time == pytest.approx(1.5)
+
+def test_triple_tap_confirms_without_waiting_for_the_window():
+    events = classify_timeline(GestureClassifier(ACTIONS), [1.0, 1.2, 1.4])
+
+    assert summary(events) == [
+        ('single', TENTATIVE, 'record'),
+        ('single', REVOKED, 'record'),
+        ('triple', CONFIRMED, 'repeat'),
+    ]
+    assert events[2].time == 1.4
+
+def test_taps_further_apart_than_the_window_are_separate_gestures():
+    events = classify_timeline(GestureClassifier(ACTIONS), [1.0, 1.5])
+
+    assert summary(events) == [('single', TENTATIVE, 'record'), ('single', CONFIRMED, 'record')] * 2
+
+def test_bounce_is_not_a_second_tap():
+    events = classify_timeline(GestureClassifier(ACTIONS), [1.0, 1.02])
+
+    assert summary(events) == [('single', TENTATIVE, 'record'), ('single', CONFIRMED, 'record')]
+    # the bounce still extends the window
+    assert events[1].time == pytest.approx(1.32)
+
+def test_mode_without_multi_taps_confirms_single_taps_at_once():
+    events = classify_timeline(GestureClassifier(ACTIONS, mode='paging'), [1.0, 1.2])
+
+    assert summary(events) == [('single', CONFIRMED, 'next_page')]
+
+def test_double_tap_is_the_largest_gesture_while_recording():
+    events = classify_timeline(GestureClassifier(ACTIONS, mode='recording'), [1.0, 1.2, 1.4])
+
+    assert summary(events) == [
+        ('single', TENTATIVE, 'record'),
+        ('single', REVOKED, 'record'),
+        ('double', CONFIRMED, 'cancel'),
+    ]
+
+def test_sequence_keeps_the_mode_it_started_in():
+    classifier = GestureClassifier(ACTIONS)
+    events = classifier.tap(1.0)
+    # acting on the tentative single tap starts a recording
+    classifier.mode = 'recording'
+    events += classifier.tap(1.2)
+    events += classifier.expire(2.0)
+
+    assert summary(events)[-1] == ('double', CONFIRMED, 'next_page')
+    assert {event.mode for event in events} == {'idle'}
+
+def test_unresolved_sequence_has_a_deadline():
+    classifier = GestureClassifier(ACTIONS)
+    assert classifier.deadline is None
+
+    classifier.tap(1.0)
+    assert classifier.deadline == pytest.approx(1.3)
+    assert classifier.expire(1.2) == []
+
+    classifier.tap(1.2)
+    assert classifier.deadline == pytest.approx(1.5)
+    assert summary(classifier.expire(1.5)) == [('double', CONFIRMED, 'next_page')]
+    assert classifier.deadline is None
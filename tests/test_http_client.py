@@ -0,0 +1,86 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import ai_utils, audio_utils, http_client
+from utils.audio_format import DEFAULT_FORMAT, pcm_to_wav
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """Stands in for the transcription and chat completions APIs, with keep-alive connections."""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.paths.append(self.path)
+        if self.path.endswith('/audio/transcriptions'):
+            body = {'text': "What time is it?"}
+        else:
+            body = {
+                'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': 'test',
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': "Noon."}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+            }
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def openai_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenAI)
+    server.connections = 0
+    server.paths = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    monkeypatch.setenv('OPENAI_BASE_URL', f'http://127.0.0.1:{server.server_port}/v1')
+    ai_utils.clear_conversation_history()
+    yield server
+    server.shutdown()
+    ai_utils.clear_conversation_history()
+
+def test_transcription_and_chat_share_one_connection(openai_server, tmp_path):
+    wav_file_path = tmp_path / 'question.wav'
+    wav_file_path.write_bytes(pcm_to_wav(bytes(1600), DEFAULT_FORMAT))
+
+    async def run():
+        try:
+            await http_client.prewarm_connection(f'http://127.0.0.1:{openai_server.server_port}/v1')
+            transcript = await audio_utils.transcribe_audio(wav_file_path)
+            return transcript, await ai_utils.get_ai_response(transcript, slo=None)
+        finally:
+            await http_client.close_http_client()
+
+    assert asyncio.run(run()) == ("What time is it?", "Noon.")
+    assert openai_server.paths == ['/v1/audio/transcriptions', '/v1/chat/completions']
+    assert openai_server.connections == 1
+
+def test_closing_the_client_drops_the_clients_built_on_it(openai_server):
+    async def ask():
+        try:
+            return await ai_utils.get_ai_response("What time is it?", slo=None)
+        finally:
+            await http_client.close_http_client()
+
+    # each run closes the shared client; the second must not reuse the closed one
+    assert asyncio.run(ask()) == "Noon."
+    assert asyncio.run(ask()) == "Noon."
+    assert audio_utils._client is None
+    assert ai_utils._chatbot_apps == {}
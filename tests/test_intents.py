@@ -0,0 +1,42 @@
+import pytest
+
+from tap_audio import build_intent_router
+from utils.intents import IntentRouter, words_agree
+
+@pytest.fixture
+def intents() -> IntentRouter:
+    return build_intent_router(frame=None, rx_battery=None, last_displayed=lambda: None)
+
+def matched(intents: IntentRouter, transcript: str) -> str | None:
+    result = intents.match(transcript)
+    return result[0].name if result is not None else None
+
+@pytest.mark.parametrize('transcript, intent', [
+    ("What time is it?", 'time'),
+    ("Could you please tell me the time.", 'time'),
+    ("Whats the time", 'time'),
+    ("How much battery is left?", 'battery'),
+    ("Battery level.", 'battery'),
+    ("Show the batery.", 'battery'),
+    ("Repeat that, please.", 'repeat'),
+    ("Start over.", 'clear_history'),
+])
+def test_commands_are_matched(intents, transcript, intent):
+    assert matched(intents, transcript) == intent
+
+@pytest.mark.parametrize('transcript', [
+    "How much time is left?",
+    "What time is it in Tokyo?",
+    "What's the weather like?",
+    "What did you see?",
+    "Clear the table.",
+    "How much is left?",
+    "Time travel",
+    "",
+])
+def test_questions_go_to_the_model(intents, transcript):
+    assert matched(intents, transcript) is None
+
+def test_a_different_word_is_not_forgiven():
+    assert not words_agree("how much battery is left", "how much time is left")
+    assert words_agree("how much battery is left", "how much batery is left")
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from utils.keyword_spotter import TemplateKeywordSpotter
+
+SAMPLE_RATE = 8000
+
+def chirp(seconds: float = 0.4, low: float = 300.0, high: float = 1500.0) -> np.ndarray:
+    """A rising tone standing in for a spoken keyword."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    phase = 2 * np.pi * (low * t + (high - low) * t ** 2 / (2 * seconds))
+    return (8000 * np.sin(phase)).astype(np.int16)
+
+def clip_with_keyword() -> bytes:
+    rng = np.random.default_rng(0)
+    silence = lambda seconds: rng.normal(0, 30, int(seconds * SAMPLE_RATE)).astype(np.int16)
+    return np.concatenate((silence(0.5), chirp(), silence(0.5))).astype('<i2').tobytes()
+
+def spotter() -> TemplateKeywordSpotter:
+    spotter = TemplateKeywordSpotter(sample_rate=SAMPLE_RATE, budget_ms=1000.0)
+    spotter.enroll('hey frame', chirp())
+    return spotter
+
+def feed(spotter: TemplateKeywordSpotter, pcm: bytes, chunk_size: int) -> list[str]:
+    return [hit for offset in range(0, len(pcm), chunk_size)
+            if (hit := spotter.process_chunk(pcm[offset:offset + chunk_size])) is not None]
+
+@pytest.mark.parametrize('chunk_size', [240, 241, 101])
+def test_keyword_is_detected_whatever_the_chunk_size(chunk_size):
+    assert feed(spotter(), clip_with_keyword(), chunk_size) == ['hey frame']
+
+def test_odd_chunks_lose_no_samples():
+    pcm = clip_with_keyword()
+    keyword_spotter = spotter()
+    feed(keyword_spotter, pcm, 241)
+
+    samples_seen = keyword_spotter._frames_seen * keyword_spotter.frame_step + len(keyword_spotter._tail)
+    assert samples_seen == len(pcm) // 2
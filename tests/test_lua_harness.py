@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+from frame_msg import TxCode
+
+pytest.importorskip('lupa')
+
+from utils.compact_text import DICTIONARY_FILE, dictionary_lua
+from utils.lua_harness import LuaHarness
+
+TAP_APP = str(Path(__file__).resolve().parent.parent / 'lua' / 'tap_audio.lua')
+
+# msg_codes of lua/tap_audio.lua
+TAP_SUBS_MSG = 0x10
+TAP_MSG = 0x09
+
+def tap_app(**kwargs) -> LuaHarness:
+    return LuaHarness(TAP_APP, files={DICTIONARY_FILE: dictionary_lua()}, **kwargs)
+
+def test_idle_app_loops_without_sending():
+    result = tap_app().run(3.0)
+
+    startup, *loop = result.iterations
+    # the startup iteration shows the splash screen for a second before the loop starts
+    assert (startup.time, startup.sleep) == (0.0, 1.0)
+    assert len(loop) == pytest.approx(200, abs=1)
+    assert all(iteration.sleep == 0.01 for iteration in loop)
+    assert sum(iteration.packets for iteration in loop) == 0
+    assert result.sent == []
+    assert result.prints == ['Frame app is running']
+
+def test_taps_are_sent_once_subscribed():
+    harness = tap_app()
+    harness.tap(1.2)
+    harness.message(1.5, TAP_SUBS_MSG, TxCode(value=1).pack())
+    harness.tap(2.0)
+    result = harness.run(3.0)
+
+    # the tap before the subscription is ignored; the message itself is acknowledged with a 0 byte
+    assert [(round(at, 2), packet) for at, packet in result.sent] == [(1.5, b'\x00'), (2.0, bytes([TAP_MSG]))]
+    assert result.summary()['packets_by_flag'] == {0: 1, TAP_MSG: 1}
@@ -0,0 +1,39 @@
+import asyncio
+
+from utils.model_router import ModelEndpoint, ModelRouter
+
+def endpoint(name: str, delay: float) -> ModelEndpoint:
+    async def invoke(state):
+        await asyncio.sleep(delay)
+        return {"messages": [name]}
+    return ModelEndpoint(name=name, invoke=invoke, expected_latency=delay)
+
+def router_with(fast_latencies: list[float], strong_latencies: list[float], slo: float) -> ModelRouter:
+    router = ModelRouter(fast=endpoint('fast', 1.0), strong=endpoint('strong', 3.0), slo=slo)
+    for seconds in fast_latencies:
+        router.histograms['fast'].add(seconds)
+    for seconds in strong_latencies:
+        router.histograms['strong'].add(seconds)
+    return router
+
+def test_hedge_waits_for_the_primary_to_be_late():
+    router = router_with([1.0] * 10, [2.0] * 9 + [3.0], slo=6.0)
+
+    assert router.hedge_delay(router.strong, router.fast) == 3.0
+
+def test_no_hedge_when_the_secondary_cannot_make_the_slo():
+    router = router_with([1.0] * 10, [2.0] * 9 + [3.5], slo=4.0)
+
+    assert router.hedge_delay(router.strong, router.fast) is None
+
+def test_cancelled_loser_is_not_a_latency_sample():
+    router = ModelRouter(fast=endpoint('fast', 0.01), strong=endpoint('strong', 0.05), slo=1.0, hedge_quantile=0.0)
+    router.strong.expected_latency = 0.001
+
+    async def run():
+        # the strong model is asked first and hedged straight away, so the fast one wins
+        return await router.ainvoke({"messages": []}, "Explain why the sky is blue")
+
+    assert asyncio.run(run())[1] == 'fast'
+    assert len(router.histograms['strong']) == 0
+    assert len(router.histograms['strong'].censored) == 1
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from frame_msg import TxSprite
+from PIL import Image
+
+from utils.sprite import PackedTxSprite, convert_image, max_strip_width, strip_line_height
+
+def photo(width: int, height: int) -> Image.Image:
+    return Image.fromarray((np.random.default_rng(0).random((height, width, 3)) * 255).astype(np.uint8))
+
+@pytest.mark.parametrize('num_colors', [2, 4, 16])
+@pytest.mark.parametrize('max_payload', [240, 150])
+def test_every_strip_fits_in_one_packet(num_colors, max_payload):
+    conversion = convert_image(photo(640, 400), num_colors=num_colors, max_payload=max_payload)
+
+    assert all(len(message) <= max_payload for message in conversion.messages)
+    assert conversion.sprite.width <= max_strip_width(conversion.sprite.bpp, num_colors, max_payload)
+
+def test_wide_16_colour_image_is_narrowed_to_fit():
+    conversion = convert_image(photo(640, 400), num_colors=16, max_payload=240)
+
+    assert conversion.sprite.width == 370
+    assert conversion.line_height == 1
+
+def test_row_wider_than_payload_is_rejected():
+    with pytest.raises(ValueError):
+        strip_line_height(640, 4, 16, 240)
+
+@pytest.mark.parametrize('num_colors', [2, 4, 16])
+def test_packing_matches_txsprite(num_colors):
+    pixels = np.random.default_rng(1).integers(0, num_colors, 37 * 5, dtype=np.uint8).tobytes()
+    palette = bytes(num_colors * 3)
+
+    assert PackedTxSprite(37, 5, num_colors, palette, pixels).pack() == TxSprite(37, 5, num_colors, palette, pixels).pack()
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from utils.audio_format import DEFAULT_FORMAT, pcm_to_wav
+from utils.transcription import TranscriptionBackend, TranscriptionRouter
+
+class FakeBackend(TranscriptionBackend):
+    """Answers with a fixed transcript, or fails with the given error."""
+
+    def __init__(self, name: str, error: Exception | None = None):
+        self.name = name
+        self.error = error
+
+    async def transcribe(self, audio_file_path) -> str:
+        if self.error is not None:
+            raise self.error
+        return f"{self.name} transcript"
+
+@pytest.fixture
+def clip(tmp_path):
+    path = tmp_path / 'clip.wav'
+    path.write_bytes(pcm_to_wav(bytes(3200), DEFAULT_FORMAT))
+    return path
+
+def test_unreachable_cloud_falls_back_to_local(clip):
+    router = TranscriptionRouter(local=FakeBackend('local'), cloud=FakeBackend('cloud', ConnectionRefusedError()),
+                                 max_local_seconds=0)
+
+    assert asyncio.run(router.transcribe(clip)) == "local transcript"
+    assert not router.online
+
+def test_other_os_errors_are_not_treated_as_offline(clip):
+    router = TranscriptionRouter(local=FakeBackend('local'), cloud=FakeBackend('cloud', FileNotFoundError(clip)),
+                                 max_local_seconds=0)
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(router.transcribe(clip))
+    assert router.online
@@ -0,0 +1,170 @@
+import asyncio
+import base64
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from tap_audio import complete_interaction
+from utils import ai_utils, vision
+from utils.http_client import close_http_client
+from utils.pipeline import Interaction
+from utils.vision import PhotoCapture
+from utils.worker_pool import WorkerPool
+
+class FakeChatCompletions(BaseHTTPRequestHandler):
+    """Stands in for the chat completions API: answers from what the request contains."""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(request)
+        content = request['messages'][-1]['content']
+        images = [part['image_url']['url'] for part in content if part['type'] == 'image_url'] \
+            if isinstance(content, list) else []
+        answer = f"I see a {describe(images[0])} photo." if images else "No photo."
+        # a server set to truncate answers as if it ran out of tokens mid-sentence
+        finish_reason = 'length' if self.server.truncate else 'stop'
+        if self.server.truncate:
+            answer += " It is a"
+        body = json.dumps({
+            'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': request['model'],
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': finish_reason}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def describe(data_url: str) -> str:
+    """Size and main colour of a data URL image, as the fake model 'sees' it."""
+    image = Image.open(io.BytesIO(base64.b64decode(data_url.split(',', 1)[1])))
+    red, green, blue = image.convert('RGB').resize((1, 1)).getpixel((0, 0))
+    colour = 'red' if red > max(green, blue) else 'other'
+    return f"{image.width}x{image.height} {colour}"
+
+def frame_photo() -> bytes:
+    """A 720px JPEG like the ones RxPhoto delivers."""
+    output = io.BytesIO()
+    Image.new('RGB', (720, 720), (200, 30, 30)).save(output, format='JPEG')
+    return output.getvalue()
+
+@pytest.fixture
+def vision_model(monkeypatch):
+    """A local stand-in for the model API; yields the server, holding the requests it received."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeChatCompletions)
+    server.requests = []
+    server.truncate = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    monkeypatch.setenv('OPENAI_BASE_URL', f'http://127.0.0.1:{server.server_port}/v1')
+    ai_utils.clear_conversation_history()
+    yield server
+    server.shutdown()
+    ai_utils.clear_conversation_history()
+
+async def answer_with_photo(photo_queue: asyncio.Queue, pool=None, **kwargs) -> Interaction:
+    photo = PhotoCapture(photo_queue, pool=pool, **kwargs)
+    photo.start()
+    interaction = Interaction(id=1, transcript="What am I looking at?", photo=photo)
+    try:
+        await complete_interaction(interaction)
+    finally:
+        await close_http_client()
+    return interaction
+
+def test_question_is_answered_about_the_photo(vision_model):
+    async def run():
+        photo_queue = asyncio.Queue()
+        await photo_queue.put(frame_photo())
+        return await answer_with_photo(photo_queue)
+
+    interaction = asyncio.run(run())
+
+    # downscaled to max_size and rotated upright before it was sent
+    assert interaction.response == "I see a 512x512 red photo."
+    request, = vision_model.requests
+    assert request['model'] == ai_utils.VISION_MODEL
+    assert request['messages'][-1]['content'][0] == {'type': 'text', 'text': "What am I looking at?"}
+
+def test_photo_prepared_in_worker_process(vision_model):
+    async def run():
+        pool = WorkerPool(workers=1)
+        try:
+            photo_queue = asyncio.Queue()
+            await photo_queue.put(frame_photo())
+            return await answer_with_photo(photo_queue, pool=pool, max_size=256), pool.jobs
+        finally:
+            await pool.close()
+
+    interaction, jobs = asyncio.run(run())
+
+    assert interaction.response == "I see a 256x256 red photo."
+    assert jobs == 1
+
+def test_missing_photo_falls_back_to_text(vision_model):
+    interaction = asyncio.run(answer_with_photo(asyncio.Queue(), timeout=0.1))
+
+    assert interaction.response == "No photo."
+    request, = vision_model.requests
+    assert request['model'] != ai_utils.VISION_MODEL
+    # history only ever keeps the text of the question
+    assert all(isinstance(message.content, str) for message in ai_utils.conversation_history)
+
+def test_cancelled_capture_does_not_leave_its_photo_for_the_next():
+    async def run():
+        photo_queue = asyncio.Queue()
+        abandoned = PhotoCapture(photo_queue, max_size=64)
+        abandoned.start()
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        photo = PhotoCapture(photo_queue, max_size=128)
+        photo.start()
+
+        # the abandoned capture's photo arrives first, then the one asked for next
+        stale = io.BytesIO()
+        Image.new('RGB', (720, 720), (30, 30, 200)).save(stale, format='JPEG')
+        photo_queue.put_nowait(stale.getvalue())
+        photo_queue.put_nowait(frame_photo())
+        return await photo.result()
+
+    assert describe(asyncio.run(run())) == "128x128 red"
+
+def test_lost_photo_of_a_cancelled_capture_does_not_take_the_next(monkeypatch):
+    monkeypatch.setattr(vision, 'ORPHAN_GRACE_SECONDS', 0.05)
+
+    async def run():
+        photo_queue = asyncio.Queue()
+        abandoned = PhotoCapture(photo_queue, max_size=64)
+        abandoned.start()
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        photo = PhotoCapture(photo_queue, max_size=128)
+        photo.start()
+
+        # the abandoned capture's photo never comes; the next one arrives after the grace period
+        await asyncio.sleep(0.1)
+        photo_queue.put_nowait(frame_photo())
+        return await photo.result()
+
+    assert describe(asyncio.run(run())) == "128x128 red"
+
+def test_history_keeps_the_trimmed_answer(vision_model):
+    vision_model.truncate = True
+
+    async def run():
+        try:
+            return await ai_utils.get_ai_response("What am I looking at?", slo=None)
+        finally:
+            await close_http_client()
+
+    assert asyncio.run(run()) == "No photo."
+    assert ai_utils.conversation_history[-1].content == "No photo."
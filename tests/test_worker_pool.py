@@ -0,0 +1,54 @@
+import asyncio
+import os
+
+import pytest
+
+from utils import worker_pool
+from utils.worker_pool import WorkerPool
+
+def reverse(payload: memoryview) -> bytes:
+    return bytes(payload)[::-1]
+
+def crash(payload: memoryview) -> bytes:
+    os._exit(1)
+
+def test_dead_worker_is_replaced():
+    async def run():
+        pool = WorkerPool(workers=1)
+        try:
+            with pytest.raises(RuntimeError, match="exited"):
+                await pool.submit(crash, b'x')
+            return await pool.submit(reverse, b'abc'), pool.restarts, pool.inline
+        finally:
+            await pool.close()
+
+    assert asyncio.run(run()) == (b'cba', 1, 0)
+
+def test_jobs_run_in_process_once_no_worker_is_left(monkeypatch):
+    monkeypatch.setattr(worker_pool, 'RESTART_LIMIT', 0)
+
+    async def run():
+        pool = WorkerPool(workers=2)
+        try:
+            for _ in range(2):
+                with pytest.raises(RuntimeError, match="exited"):
+                    await pool.submit(crash, b'x')
+            return await asyncio.gather(*(pool.submit(reverse, b'abc') for _ in range(3))), pool.inline
+        finally:
+            await pool.close()
+
+    assert asyncio.run(run()) == ([b'cba'] * 3, 3)
+
+def test_worker_found_dead_before_sending_is_skipped():
+    async def run():
+        pool = WorkerPool(workers=2)
+        try:
+            await pool.start()
+            # killed without the pipe being read yet, as if it died between jobs
+            pool._workers[0].process.kill()
+            pool._workers[0].process.join()
+            return await pool.submit(reverse, b'abc'), pool.restarts
+        finally:
+            await pool.close()
+
+    assert asyncio.run(run()) == (b'cba', 1)
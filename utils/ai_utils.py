@@ -1,22 +1,48 @@
 from typing import TypedDict, Annotated
-from langgraph.graph import add_messages, StateGraph, END
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import AIMessage, HumanMessage
 from dotenv import load_dotenv
 import os
+import threading
+
+from utils.http_client import get_http_client, on_close
+from utils.model_router import LATENCY_SLO, ModelEndpoint, ModelRouter
+from utils.response_budget import ResponseStats, response_budget, trim_to_sentence
+from utils.text import format_text_for_frame
 
 load_dotenv()
 
-class BasicChatState(TypedDict):
-    messages: Annotated[list, add_messages]
+# Model for text-only questions, and for questions that come with a photo
+CHAT_MODEL = "gpt-4"
+VISION_MODEL = "gpt-4o"
+
+# Latency routing: simple text questions go to FAST_MODEL and ones that need reasoning to
+# CHAT_MODEL, hedging with the other model when the first is slower than the SLO allows.
+# Each model's expected latency (seconds) is a prior until its own is measured.
+FAST_MODEL = "gpt-4o-mini"
+FAST_MODEL_LATENCY = 1.5
+CHAT_MODEL_LATENCY = 3.0
+
+# Display pages an answer should fit on; the model is asked for that many words and
+# capped at a matching number of tokens (None for no limit)
+RESPONSE_PAGES = 3
 
-def _setup_chatbot():
-    """Set up and return the chatbot graph."""
-    llm = ChatOpenAI(model="gpt-4", api_key=os.environ['OPENAI_API_KEY'])
+def _setup_chatbot(model: str = CHAT_MODEL):
+    """Set up and return the chatbot graph for the given model."""
+    # LangGraph/LangChain take seconds to import, so only pay for them when the graph is built
+    from langgraph.graph import add_messages, StateGraph, END
+    from langchain_openai import ChatOpenAI
 
-    def chatbot(state: BasicChatState):
+    class BasicChatState(TypedDict):
+        messages: Annotated[list, add_messages]
+        max_tokens: int | None
+
+    # share the keep-alive connection pool with the transcription client
+    llm = ChatOpenAI(model=model, api_key=os.environ['OPENAI_API_KEY'], http_async_client=get_http_client())
+
+    async def chatbot(state: BasicChatState):
+        max_tokens = state.get("max_tokens")
+        bound_llm = llm if max_tokens is None else llm.bind(max_tokens=max_tokens)
         return {
-            "messages": [llm.invoke(state["messages"])]
+            "messages": [await bound_llm.ainvoke(state["messages"])]
         }
 
     graph = StateGraph(BasicChatState)
@@ -26,18 +52,64 @@ def _setup_chatbot():
     
     return graph.compile()
 
-# Initialize the chatbot once
-chatbot_app = _setup_chatbot()
+# Each model's chatbot is built once, on first use (or by an explicit warm-up)
+_chatbot_apps = {}
+_chatbot_lock = threading.Lock()
+
+def get_chatbot_app(model: str = CHAT_MODEL):
+    """
+    Return the chatbot graph for a model, building it on the first call.
+
+    Safe to call from a worker thread, e.g. to warm it up while connecting to Frame.
+    """
+    if model not in _chatbot_apps:
+        with _chatbot_lock:
+            if model not in _chatbot_apps:
+                _chatbot_apps[model] = _setup_chatbot(model)
+    return _chatbot_apps[model]
+
+def _forget_chatbot_apps():
+    """Drop the chatbot graphs once the HTTP client their models send through is closed."""
+    with _chatbot_lock:
+        _chatbot_apps.clear()
+
+on_close(_forget_chatbot_apps)
+
+def _endpoint(model: str, expected_latency: float) -> ModelEndpoint:
+    """A router endpoint that invokes the chatbot graph for a model."""
+    async def invoke(state):
+        return await get_chatbot_app(model).ainvoke(state)
+    return ModelEndpoint(name=model, invoke=invoke, expected_latency=expected_latency)
+
+_model_router = None
+
+def get_model_router() -> ModelRouter:
+    """Return the router between FAST_MODEL and CHAT_MODEL, creating it on the first call."""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter(fast=_endpoint(FAST_MODEL, FAST_MODEL_LATENCY),
+                                    strong=_endpoint(CHAT_MODEL, CHAT_MODEL_LATENCY))
+    return _model_router
 
 # Store conversation history
 conversation_history = []
 
-async def get_ai_response(text: str) -> str:
+# How often answers overran their display budget
+response_stats = ResponseStats()
+
+async def get_ai_response(text: str, image_url: str | None = None, pages: int | None = RESPONSE_PAGES,
+                          slo: float | None = LATENCY_SLO) -> str:
     """
     Get a response from the AI chatbot for the given text, maintaining conversation history.
     
     Args:
         text: The input text to get a response for
+        image_url: Optional image (e.g. a data URL from utils.vision) the question is about;
+            the question is then answered by VISION_MODEL
+        pages: Display pages the answer should fit on (None for no limit); an answer
+            cut off at the token limit is trimmed back to its last full sentence
+        slo: Latency target in seconds for routing a text question between FAST_MODEL and
+            CHAT_MODEL (see utils.model_router); None to always ask CHAT_MODEL
         
     Returns:
         str: The AI's response text
@@ -45,21 +117,53 @@ async def get_ai_response(text: str) -> str:
     Raises:
         Exception: If there's an error getting the response
     """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
     try:
-        # Add the user's message to history
-        conversation_history.append(HumanMessage(content=text))
-        
+        user_message = HumanMessage(content=text)
+        if image_url is None:
+            model = CHAT_MODEL
+            request_message = user_message
+        else:
+            # the photo only goes with this question; history keeps the text so later requests stay small
+            model = VISION_MODEL
+            request_message = HumanMessage(content=[
+                {"type": "text", "text": text},
+                {"type": "image_url", "image_url": {"url": image_url}},
+            ])
+
+        # the length instruction goes with each request rather than into the history
+        budget = response_budget(pages) if pages is not None else None
+        instructions = [SystemMessage(content=budget.instruction())] if budget is not None else []
+
         # Get response using full conversation history
-        result = chatbot_app.invoke({
-            "messages": conversation_history
-        })
+        state = {
+            "messages": instructions + conversation_history + [request_message],
+            "max_tokens": budget.max_tokens if budget is not None else None,
+        }
+        if image_url is None and slo is not None:
+            result, model = await get_model_router().ainvoke(state, text, slo=slo)
+            print(f"Answered by {model}")
+        else:
+            result = await get_chatbot_app(model).ainvoke(state)
         
         # Extract the response text from the result
         if result and "messages" in result and len(result["messages"]) > 0:
             ai_message = result["messages"][-1]
-            # Add AI's response to history
+
+            response = ai_message.content
+            if budget is not None:
+                truncated = ai_message.response_metadata.get("finish_reason") == "length"
+                if truncated:
+                    response = trim_to_sentence(response)
+                    # the history holds what was shown, so a follow-up doesn't refer to the cut-off part
+                    ai_message = ai_message.model_copy(update={"content": response})
+                response_stats.record(budget, len(format_text_for_frame(response)), truncated)
+
+            # Add the exchange to history
+            conversation_history.append(user_message)
             conversation_history.append(ai_message)
-            return ai_message.content
+            return response
         else:
             raise Exception("No response received from AI")
             
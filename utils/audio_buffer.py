@@ -0,0 +1,112 @@
+import numpy as np
+
+class AudioRingBuffer:
+    """
+    Fixed-size ring buffer holding the most recent N seconds of 16-bit mono PCM.
+
+    Samples are addressed by their absolute position in the stream (the number of
+    samples written before them), so a caller can mark a point in the past and later
+    read everything from that mark up to "now" as long as it hasn't been overwritten.
+    The backing array is allocated once; writes copy straight into it.
+    """
+
+    def __init__(self, seconds: float = 30.0, sample_rate: int = 8000):
+        """
+        Args:
+            seconds: How much audio history to keep
+            sample_rate: Sample rate of the incoming PCM in Hz
+        """
+        self.sample_rate = sample_rate
+        self.capacity = int(seconds * sample_rate)
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._written = 0
+        # reassembles a sample whose two bytes were split across chunks
+        self._carry = bytearray(2)
+        self._has_carry = False
+
+    @property
+    def position(self) -> int:
+        """Absolute position (in samples) of the next sample to be written."""
+        return self._written
+
+    @property
+    def oldest(self) -> int:
+        """Absolute position of the oldest sample still held in the buffer."""
+        return max(self._written - self.capacity, 0)
+
+    def clear(self) -> None:
+        """Forget all buffered audio without releasing the backing array."""
+        self._written = 0
+        self._has_carry = False
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Append a chunk of little-endian signed 16-bit PCM straight from RxAudio.
+
+        Args:
+            chunk: Raw PCM bytes; an odd trailing byte is held until the next chunk
+        """
+        view = memoryview(chunk)
+        if self._has_carry and len(view) > 0:
+            self._carry[1] = view[0]
+            self._store(np.frombuffer(self._carry, dtype='<i2'))
+            self._has_carry = False
+            view = view[1:]
+
+        whole = len(view) & ~1
+        if whole:
+            self._store(np.frombuffer(view[:whole], dtype='<i2'))
+        if len(view) > whole:
+            self._carry[0] = view[whole]
+            self._has_carry = True
+
+    def _store(self, samples: np.ndarray) -> None:
+        """Copy samples into the ring, overwriting the oldest audio if necessary."""
+        count = len(samples)
+        if count >= self.capacity:
+            # only the tail can survive, so don't bother copying the rest
+            samples = samples[-self.capacity:]
+            self._written += count - self.capacity
+            count = self.capacity
+
+        start = self._written % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        self._buffer[:count - first] = samples[first:]
+        self._written += count
+
+    def mark(self, preroll: float = 0.0) -> int:
+        """
+        Return a position `preroll` seconds before now, clamped to the oldest held sample.
+
+        Args:
+            preroll: How far back in time the mark should be placed, in seconds
+        """
+        return max(self._written - int(preroll * self.sample_rate), self.oldest)
+
+    def read(self, start: int, end: int | None = None) -> np.ndarray:
+        """
+        Copy out the samples between two absolute positions.
+
+        Args:
+            start: Absolute position of the first sample (clamped to the oldest held sample)
+            end: Absolute position one past the last sample (default: now)
+
+        Returns:
+            np.ndarray: The int16 samples in chronological order
+        """
+        end = self._written if end is None else min(end, self._written)
+        start = max(start, self.oldest)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+
+        first_index = start % self.capacity
+        count = end - start
+        if first_index + count <= self.capacity:
+            return self._buffer[first_index:first_index + count].copy()
+        split = self.capacity - first_index
+        return np.concatenate((self._buffer[first_index:], self._buffer[:count - split]))
+
+    def read_bytes(self, start: int, end: int | None = None) -> bytes:
+        """Same as read(), but returns PCM bytes ready for RxAudio.to_wav_bytes()."""
+        return self.read(start, end).astype('<i2', copy=False).tobytes()
@@ -0,0 +1,234 @@
+import struct
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from frame_msg import RxAudio
+
+# msg_code the Frameside app (lua/tap_audio.lua) takes the microphone format on
+AUDIO_FORMAT_CHANNEL = 0x31
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """
+    A microphone format Frame supports.
+
+    Attributes:
+        sample_rate: 8000 or 16000 Hz
+        bit_depth: 8 or 16 bits per sample (signed)
+    """
+    sample_rate: int = 8000
+    bit_depth: int = 16
+
+    @property
+    def byte_rate(self) -> int:
+        """Bytes per second of audio in this format."""
+        return self.sample_rate * self.bit_depth // 8
+
+    def pack(self) -> bytes:
+        """
+        Pack the format into the binary message lua/tap_audio.lua expects.
+
+        Returns:
+            bytes: [sample_rate_msb, sample_rate_lsb, bit_depth]
+        """
+        return struct.pack('>HB', self.sample_rate, self.bit_depth)
+
+    def __str__(self) -> str:
+        return f"{self.sample_rate / 1000:g}kHz/{self.bit_depth}-bit"
+
+# The format Frame used before negotiation, and still uses until told otherwise
+DEFAULT_FORMAT = AudioFormat(8000, 16)
+
+# Formats to choose between, best for speech first; 16kHz/8-bit is left out since it costs
+# as much as 8kHz/16-bit and 8-bit quantization noise hurts recognition more than the rate
+AUDIO_FORMATS = (AudioFormat(16000, 16), AudioFormat(8000, 16), AudioFormat(8000, 8))
+
+def pcm_to_samples(pcm: bytes, audio_format: AudioFormat) -> np.ndarray:
+    """Decode raw PCM from Frame into int16 samples (8-bit samples are scaled up)."""
+    if audio_format.bit_depth == 8:
+        return np.frombuffer(pcm, dtype=np.int8).astype(np.int16) << 8
+    return np.frombuffer(pcm[:len(pcm) & ~1], dtype='<i2')
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """
+    Resample int16 samples.
+
+    Whole-number downsampling averages each group of samples (a box filter, so energy above
+    the new Nyquist rate is attenuated rather than aliased); anything else interpolates linearly.
+    """
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    if from_rate % to_rate == 0:
+        factor = from_rate // to_rate
+        usable = len(samples) - len(samples) % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1).round().astype(np.int16)
+
+    count = len(samples) * to_rate // from_rate
+    positions = np.arange(count) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).round().astype(np.int16)
+
+def convert_pcm(pcm: bytes, from_format: AudioFormat, to_rate: int) -> bytes:
+    """
+    Convert raw PCM from Frame to 16-bit little-endian PCM at to_rate.
+
+    Args:
+        pcm: Raw PCM in from_format
+        from_format: The format Frame recorded in
+        to_rate: Sample rate of the result
+
+    Returns:
+        bytes: Signed 16-bit PCM
+    """
+    samples = resample(pcm_to_samples(pcm, from_format), from_format.sample_rate, to_rate)
+    return samples.astype('<i2').tobytes()
+
+def pcm_to_wav(pcm: bytes, from_format: AudioFormat, to_rate: int | None = None) -> bytes:
+    """
+    Convert raw PCM from Frame into a 16-bit mono WAV file (e.g. for transcription).
+
+    By default the recorded sample rate is kept: both Whisper backends resample on their
+    side, and upsampling here would only make the upload bigger. 8-bit audio is always
+    widened, since not every backend reads 8-bit WAV.
+
+    Takes any bytes-like pcm, so it can run in a WorkerPool on a shared memory payload.
+
+    Args:
+        pcm: Raw PCM in from_format
+        from_format: The format Frame recorded in
+        to_rate: Sample rate of the WAV file, defaults to the recorded rate
+    """
+    to_rate = from_format.sample_rate if to_rate is None else to_rate
+    return RxAudio.to_wav_bytes(convert_pcm(pcm, from_format, to_rate), sample_rate=to_rate,
+                                bits_per_sample=16, channels=1)
+
+class AudioFormatPolicy:
+    """
+    Chooses the microphone format from the Bluetooth throughput the audio stream achieves.
+
+    Frame sends audio as it records; if the link can't carry the format's byte rate the
+    backlog grows and the end of the clip arrives late. Each clip received through a
+    TimedRxAudio is checked for that lag: a late clip gives a throughput measurement
+    (its bytes over its transfer time) that pulls the estimate down, while clips that keep
+    up only show the link carries the current format. After a run of those, the policy
+    tries the next better format, and backs off again if it lags; each probe that lags
+    doubles the run needed before the next one, so a link that can't carry the better
+    format doesn't pay for a lagging clip every few recordings.
+    """
+
+    def __init__(self, initial: AudioFormat = DEFAULT_FORMAT, headroom: float = 0.85, smoothing: float = 0.5,
+                 lag_threshold: float = 0.5, upgrade_after: int = 3, max_sample_rate: int | None = None):
+        """
+        Args:
+            initial: Format to start with; the throughput estimate starts just high enough for it
+            headroom: Fraction of the estimated throughput a format may use
+            smoothing: Weight (0-1) of each new throughput measurement
+            lag_threshold: Seconds after the stop a clip may finish arriving and still count as keeping up
+            upgrade_after: Clips that must keep up before trying the next better format (at first)
+            max_sample_rate: Highest sample rate to choose (e.g. 8000 when the audio feeds an 8kHz ring buffer)
+        """
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.lag_threshold = lag_threshold
+        self.upgrade_after = upgrade_after
+        self.max_sample_rate = max_sample_rate
+        self.throughput = initial.byte_rate / headroom
+        self.current = initial
+        self.stopped_at: float | None = None
+        self._clips_kept_up = 0
+        # clips to wait before the next probe; doubled each time a probe lags
+        self._probe_interval = upgrade_after
+        self._probe: AudioFormat | None = None
+
+    def choose(self) -> AudioFormat:
+        """Pick the best format the estimated throughput carries, and make it current."""
+        candidates = [audio_format for audio_format in AUDIO_FORMATS
+                      if self.max_sample_rate is None or audio_format.sample_rate <= self.max_sample_rate]
+        chosen = candidates[-1]
+        for audio_format in candidates:
+            if audio_format.byte_rate <= self.throughput * self.headroom:
+                chosen = audio_format
+                break
+        if chosen != self.current:
+            print(f"Audio format: {chosen} (link estimate {self.throughput / 1000:.1f} kB/s)")
+        self.current = chosen
+        return chosen
+
+    def format_message(self) -> tuple[int, bytes]:
+        """Choose the format and return the (msg_code, payload) that tells Frame to use it."""
+        return AUDIO_FORMAT_CHANNEL, self.choose().pack()
+
+    def recording_stopped(self) -> None:
+        """Note when the host stopped the microphone, to measure how late the clip ends."""
+        self.stopped_at = time.monotonic()
+
+    def clip_received(self, size: int, first_chunk_time: float, final_chunk_time: float) -> None:
+        """
+        Update the throughput estimate from a received clip.
+
+        Args:
+            size: Bytes of audio received
+            first_chunk_time: When the first chunk arrived (time.monotonic())
+            final_chunk_time: When the final chunk arrived
+        """
+        if self.stopped_at is None:
+            return
+        lag = final_chunk_time - self.stopped_at
+        self.stopped_at = None
+        transfer_time = final_chunk_time - first_chunk_time
+        if transfer_time <= 0:
+            return
+
+        probed = self._probe is not None and self.current == self._probe
+        self._probe = None
+        if lag > self.lag_threshold:
+            measured = size / transfer_time
+            self.throughput += self.smoothing * (measured - self.throughput)
+            self._clips_kept_up = 0
+            if probed:
+                # the link still can't carry it, so wait longer before paying for another try
+                self._probe_interval *= 2
+            print(f"Audio lagged {lag:.2f}s behind: {measured / 1000:.1f} kB/s over the link")
+            return
+
+        if probed:
+            self._probe_interval = self.upgrade_after
+        self._clips_kept_up += 1
+        if self._clips_kept_up >= self._probe_interval:
+            self._clips_kept_up = 0
+            better = [audio_format for audio_format in AUDIO_FORMATS
+                      if audio_format.byte_rate > self.current.byte_rate
+                      and (self.max_sample_rate is None or audio_format.sample_rate <= self.max_sample_rate)]
+            if better:
+                # probe the next step up; a lagging clip brings the estimate back down
+                self._probe = min(better, key=lambda audio_format: audio_format.byte_rate)
+                self.throughput = max(self.throughput, self._probe.byte_rate / self.headroom)
+
+class TimedRxAudio(RxAudio):
+    """
+    RxAudio that times each clip's chunks and reports them to an AudioFormatPolicy.
+    """
+
+    def __init__(self, policy: AudioFormatPolicy, **kwargs):
+        """
+        Args:
+            policy: Policy whose format_message() sets the format Frame records in
+            **kwargs: Passed on to RxAudio
+        """
+        super().__init__(**kwargs)
+        self.policy = policy
+        self._first_chunk_time = None
+        self._received = 0
+
+    def handle_data(self, data: bytes) -> None:
+        now = time.monotonic()
+        if self._first_chunk_time is None:
+            self._first_chunk_time = now
+        self._received += len(data) - 1
+
+        if data[0] == self.final_chunk_flag:
+            self.policy.clip_received(self._received, self._first_chunk_time, now)
+            self._first_chunk_time = None
+            self._received = 0
+
+        super().handle_data(data)
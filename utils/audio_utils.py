@@ -1,12 +1,39 @@
-import openai
 from dotenv import load_dotenv
 import os
 from pathlib import Path
 import glob
+import threading
+
+from utils.http_client import get_http_client, on_close
 
 load_dotenv()
 
-client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# The OpenAI client is created once, on first use (or by an explicit warm-up)
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Return the shared async OpenAI client, importing openai and creating it on the first call.
+    It sends its requests through the shared keep-alive pool from get_http_client().
+
+    Safe to call from a worker thread, e.g. to warm it up while connecting to Frame.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import openai
+                _client = openai.AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=get_http_client())
+    return _client
+
+def _forget_client():
+    """Drop the OpenAI client once the HTTP client it sends through is closed."""
+    global _client
+    with _client_lock:
+        _client = None
+
+on_close(_forget_client)
 
 def cleanup_old_audio_files(audio_dir='audio', keep_count=5):
     """
@@ -52,7 +79,7 @@ async def transcribe_audio(audio_file_path: str | Path) -> str:
             
         # Open and transcribe the audio file
         with open(audio_path, 'rb') as audio_file:
-            transcription = client.audio.transcriptions.create(
+            transcription = await get_client().audio.transcriptions.create(
                 file=audio_file,
                 model="whisper-1"
             )
@@ -0,0 +1,60 @@
+import asyncio
+
+from frame_msg import TxCode
+
+# msg_code the Frameside app answers battery requests on (the stdlua battery library's code)
+BATTERY_FLAG = 0x0c
+
+# msg_code of the request the Frameside app (lua/tap_audio.lua) listens for
+BATTERY_REQUEST_CHANNEL = 0x12
+
+class RxBattery:
+    """
+    Receives battery level reports from the Frameside battery library.
+
+    The Frame app loop owns the Lua VM while it runs, so frame.battery_level() can't be
+    queried with send_lua(); instead request() asks the app to report it.
+    """
+
+    def __init__(self, battery_flag: int = BATTERY_FLAG):
+        """
+        Args:
+            battery_flag: The message type identifier for battery reports
+        """
+        self.battery_flag = battery_flag
+        self.level: int | None = None
+        self._report: asyncio.Event | None = None
+
+    def handle_data(self, data: bytes) -> None:
+        """
+        Process an incoming battery report.
+
+        Args:
+            data: The battery_flag byte followed by the level in percent
+        """
+        self.level = data[1]
+        if self._report is not None:
+            self._report.set()
+
+    async def request(self, frame, timeout: float = 2.0) -> int | None:
+        """
+        Ask Frame for its battery level.
+
+        Returns:
+            int | None: The level in percent, or None if Frame didn't answer in time
+        """
+        self._report = asyncio.Event()
+        await frame.send_message(BATTERY_REQUEST_CHANNEL, TxCode(value=1).pack())
+        try:
+            await asyncio.wait_for(self._report.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.level
+
+    async def attach(self, frame) -> None:
+        """Attach the battery handler to the Frame data response."""
+        frame.register_data_response_handler(self, [self.battery_flag], self.handle_data)
+
+    def detach(self, frame) -> None:
+        """Detach the battery handler from the Frame data response."""
+        frame.unregister_data_response_handler(self)
@@ -0,0 +1,217 @@
+import json
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+from frame_msg import RxPhoto, TxCaptureSettings
+
+# Resolutions the policy chooses between (Frame accepts even values from 256 to 720)
+RESOLUTIONS = (720, 640, 576, 512, 448, 384, 320, 256)
+
+# Names of the TxCaptureSettings quality_index values
+QUALITY_NAMES = ('VERY_LOW', 'LOW', 'MEDIUM', 'HIGH', 'VERY_HIGH')
+
+# Starting guesses of JPEG bytes per pixel for each quality index, refined by every capture
+DEFAULT_BYTES_PER_PIXEL = (0.03, 0.05, 0.08, 0.12, 0.18)
+
+# Starting guesses for the link, also refined by every capture
+DEFAULT_THROUGHPUT = 15000.0  # bytes per second on the RxPhoto stream
+DEFAULT_CAPTURE_OVERHEAD = 0.5  # seconds from the request to the first chunk (capture and encode)
+
+@dataclass
+class CaptureRecord:
+    """
+    What one capture asked for and what it actually achieved.
+
+    Attributes:
+        timestamp: Wall clock time of the request
+        resolution: Requested resolution
+        quality_index: Requested JPEG quality index
+        latency_budget: Target seconds from request to complete photo, if one was given
+        estimated_latency: What the policy predicted for these settings
+        size: Bytes received over Bluetooth
+        latency: Seconds from request to the final chunk
+        transfer_time: Seconds from the first to the final chunk
+        throughput: Bytes per second while the chunks were arriving
+    """
+    timestamp: float
+    resolution: int
+    quality_index: int
+    latency_budget: float | None
+    estimated_latency: float
+    size: int
+    latency: float
+    transfer_time: float
+    throughput: float
+
+class CapturePolicy:
+    """
+    Chooses capture resolution and JPEG quality so a photo arrives within a latency budget.
+
+    The policy keeps running estimates of the Bluetooth throughput of the photo stream,
+    the time Frame takes to capture and start sending, and the JPEG size per pixel at
+    each quality. Each capture received through a TimedRxPhoto updates the estimates
+    and is kept as a CaptureRecord (optionally appended to a JSON Lines log) so the
+    defaults can be tuned from real captures.
+    """
+
+    def __init__(self, latency_budget: float = 2.0, smoothing: float = 0.3, log_path: str | None = None):
+        """
+        Args:
+            latency_budget: Default target seconds from request to complete photo
+            smoothing: Weight of the newest capture in the running estimates (0-1)
+            log_path: Optional JSON Lines file every CaptureRecord is appended to
+        """
+        self.latency_budget = latency_budget
+        self.smoothing = smoothing
+        self.log_path = log_path
+
+        self.throughput = DEFAULT_THROUGHPUT
+        self.capture_overhead = DEFAULT_CAPTURE_OVERHEAD
+        self.bytes_per_pixel = list(DEFAULT_BYTES_PER_PIXEL)
+        self.records: list[CaptureRecord] = []
+
+        # requests whose photo hasn't arrived yet, oldest first (Frame answers them in order)
+        self._pending = deque()
+
+    def estimate_size(self, resolution: int, quality_index: int) -> float:
+        """Expected JPEG bytes for a capture at these settings."""
+        return resolution * resolution * self.bytes_per_pixel[quality_index]
+
+    def estimate_latency(self, resolution: int, quality_index: int) -> float:
+        """Expected seconds from request to complete photo at these settings."""
+        return self.capture_overhead + self.estimate_size(resolution, quality_index) / self.throughput
+
+    def choose(self, latency_budget: float | None = None) -> tuple[int, int]:
+        """
+        Pick the settings that fit the budget, preferring the most detail (largest expected JPEG).
+
+        Args:
+            latency_budget: Target seconds from request to complete photo; defaults to the policy's
+
+        Returns:
+            tuple: (resolution, quality_index); the smallest settings if nothing fits
+        """
+        budget = self.latency_budget if latency_budget is None else latency_budget
+        candidates = sorted(
+            ((resolution, quality_index) for resolution in RESOLUTIONS for quality_index in range(len(QUALITY_NAMES))),
+            key=lambda settings: (self.estimate_size(*settings), settings[0]),
+            reverse=True,
+        )
+        for resolution, quality_index in candidates:
+            if self.estimate_latency(resolution, quality_index) <= budget:
+                return resolution, quality_index
+        return candidates[-1]
+
+    def capture_settings(self, latency_budget: float | None = None) -> TxCaptureSettings:
+        """
+        Choose settings for the next capture and remember them so the received photo can be scored.
+
+        Send the returned message straight away: the request time is taken now.
+
+        Args:
+            latency_budget: Target seconds from request to complete photo; defaults to the policy's
+
+        Returns:
+            TxCaptureSettings: The capture request to send to Frame
+        """
+        resolution, quality_index = self.choose(latency_budget)
+        self._pending.append((
+            time.time(), time.monotonic(), resolution, quality_index, latency_budget,
+            self.estimate_latency(resolution, quality_index),
+        ))
+        return TxCaptureSettings(resolution=resolution, quality_index=quality_index)
+
+    def photo_received(self, size: int, first_chunk_time: float, final_chunk_time: float) -> CaptureRecord | None:
+        """
+        Score the photo that answered the oldest outstanding capture_settings() request and update the estimates.
+
+        Args:
+            size: Bytes received over Bluetooth
+            first_chunk_time: time.monotonic() when the first chunk arrived
+            final_chunk_time: time.monotonic() when the final chunk arrived
+
+        Returns:
+            CaptureRecord | None: The record, or None if no request was pending
+        """
+        if not self._pending:
+            return None
+        timestamp, requested, resolution, quality_index, latency_budget, estimated_latency = self._pending.popleft()
+
+        transfer_time = final_chunk_time - first_chunk_time
+        record = CaptureRecord(
+            timestamp=timestamp,
+            resolution=resolution,
+            quality_index=quality_index,
+            latency_budget=latency_budget,
+            estimated_latency=estimated_latency,
+            size=size,
+            latency=final_chunk_time - requested,
+            transfer_time=transfer_time,
+            # a photo that fits in one chunk says nothing about throughput
+            throughput=size / transfer_time if transfer_time > 0 else 0.0,
+        )
+        self.update(record)
+
+        if self.log_path:
+            with open(self.log_path, 'a') as log:
+                log.write(json.dumps(asdict(record)) + '\n')
+        return record
+
+    def update(self, record: CaptureRecord) -> None:
+        """Fold a capture into the running estimates."""
+        alpha = self.smoothing
+        if record.throughput > 0:
+            self.throughput += alpha * (record.throughput - self.throughput)
+        overhead = record.latency - record.transfer_time
+        self.capture_overhead += alpha * (overhead - self.capture_overhead)
+        bytes_per_pixel = record.size / (record.resolution * record.resolution)
+        self.bytes_per_pixel[record.quality_index] += alpha * (bytes_per_pixel - self.bytes_per_pixel[record.quality_index])
+        self.records.append(record)
+
+    def load_log(self, log_path: str) -> int:
+        """
+        Replay the records of a previous session so the estimates start from measured values.
+
+        Returns:
+            int: Number of records loaded
+        """
+        count = 0
+        with open(log_path) as log:
+            for line in log:
+                if line.strip():
+                    self.update(CaptureRecord(**json.loads(line)))
+                    count += 1
+        return count
+
+class TimedRxPhoto(RxPhoto):
+    """
+    RxPhoto that times each photo's chunks and reports them to a CapturePolicy.
+    """
+
+    def __init__(self, policy: CapturePolicy, **kwargs):
+        """
+        Args:
+            policy: Policy whose capture_settings() requests the photos
+            **kwargs: Passed on to RxPhoto
+        """
+        super().__init__(**kwargs)
+        self.policy = policy
+        self._first_chunk_time = None
+        self._received = 0
+
+    def handle_data(self, data: bytes) -> None:
+        now = time.monotonic()
+        if self._first_chunk_time is None:
+            self._first_chunk_time = now
+        self._received += len(data) - 1
+
+        if data[0] == self.final_chunk_flag:
+            record = self.policy.photo_received(self._received, self._first_chunk_time, now)
+            if record is not None:
+                print(f"Photo {record.resolution}px {QUALITY_NAMES[record.quality_index]}: "
+                      f"{record.size} bytes in {record.latency:.2f}s ({record.throughput / 1000:.1f} kB/s)")
+            self._first_chunk_time = None
+            self._received = 0
+
+        super().handle_data(data)
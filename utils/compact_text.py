@@ -0,0 +1,136 @@
+import re
+import struct
+import zlib
+from dataclasses import dataclass
+
+from frame_msg import TxPlainText
+
+# msg_code the Frameside compact text parser (lua/compact_text.lua) is registered under
+COMPACT_TEXT_CHANNEL = 0x0e
+
+# msg_code of plain TxPlainText pages, used when compact encoding doesn't save anything
+TEXT_CHANNEL = 0x0a
+
+# Name the dictionary is uploaded to Frame under, for lua/compact_text.lua to require()
+DICTIONARY_FILE = 'text_dictionary.lua'
+
+# Tokens that each travel as a single byte (0x80 for the first, up to 0xff). The app's own
+# status strings come first, then frequent English words and word parts; a leading space
+# is part of most words, since pages are laid out with one between every word.
+# Changing this changes DICTIONARY_ID, so an old dictionary left on Frame is detected.
+DICTIONARY = (
+    # status strings from tap_audio.py
+    "Tap to record", "Recording...", "Processing...", "Display failed", "Recording failed",
+    "Processing failed", "Error occurred", "Cancelled", "Nothing to repeat", "Conversation cleared",
+    "Battery level unavailable", "Battery: ",
+    # words, with the space before them
+    " the", " and", " to", " of", " a", " in", " is", " you", " that", " it", " for", " on",
+    " are", " with", " as", " be", " can", " this", " or", " your", " have", " from", " by",
+    " at", " an", " not", " but", " more", " about", " which", " will", " if", " one", " their",
+    " they", " there", " these", " what", " when", " also", " some", " other", " most", " time",
+    " like", " its", " use", " has", " was", " into", " than", " make", " each", " so", " do",
+    " how", " all", " may", " such", " many", " well", " where", " help", " way",
+    " people", " because", " usually", " around", " between", " different", " important",
+    " should", " would", " could", " often", " best", " need",
+    " them", " any", " after", " before", " over", " just", " only", " up", " out", " it's",
+    # sentence and line starts
+    "The ", "It ", "This ", "You ", "In ", "If ", "For ", "the ", "and ", "to ", "of ", "is ",
+    # word parts
+    "ing", "tion", "ation", "ment", "ally", "ould", "ight", "ness", "ent", "ers",
+    "est", "ies", "ed ", "es ", "s ", ". ", ", ",
+)
+
+# Identifies the dictionary, so a decoder holding a different one can refuse the text
+DICTIONARY_ID = zlib.crc32('\0'.join(DICTIONARY).encode('utf-8')) & 0xFF
+
+# Byte that makes the following byte literal: non-ASCII UTF-8 bytes (which would read as
+# tokens) and ESCAPE itself
+ESCAPE = 0x01
+
+# x, y, palette_offset and spacing, as TxPlainText packs them
+_TEXT_HEADER_SIZE = 6
+
+_TOKEN_BYTES = {token.encode('ascii'): bytes((0x80 + index,)) for index, token in enumerate(DICTIONARY)}
+# longest tokens first, so the alternation matches greedily; then anything needing an escape
+_ENCODE_PATTERN = re.compile(
+    b'|'.join(re.escape(token) for token in sorted(_TOKEN_BYTES, key=len, reverse=True)) + rb'|[\x01\x80-\xff]')
+
+def encode_text(text: str) -> bytes:
+    """
+    Encode text with the dictionary.
+
+    Returns:
+        bytes: ASCII as is, a byte 0x80+i for DICTIONARY[i], and ESCAPE before any
+            other byte from 0x80 up (and before ESCAPE itself)
+    """
+    return _ENCODE_PATTERN.sub(
+        lambda match: _TOKEN_BYTES.get(match.group()) or bytes((ESCAPE,)) + match.group(), text.encode('utf-8'))
+
+def decode_text(encoded: bytes) -> str:
+    """Reverse encode_text(), as lua/compact_text.lua does on Frame."""
+    output = bytearray()
+    escaped = False
+    for byte in encoded:
+        if escaped or byte < 0x80 and byte != ESCAPE:
+            output.append(byte)
+            escaped = False
+        elif byte == ESCAPE:
+            escaped = True
+        else:
+            output += DICTIONARY[byte - 0x80].encode('ascii')
+    return output.decode('utf-8')
+
+def dictionary_lua() -> str:
+    """
+    Lua source of the dictionary module lua/compact_text.lua requires, to upload as DICTIONARY_FILE.
+
+    Tokens are keyed by their one-byte code, so the table can go straight to string.gsub().
+    """
+    tokens = ',\n'.join(f'\t\t["\\{0x80 + index}"] = "{token}"' for index, token in enumerate(DICTIONARY))
+    return (f"-- Generated by utils/compact_text.py: the token each byte from 0x80 up stands for\n"
+            f"return {{\n\tid = {DICTIONARY_ID},\n\ttokens = {{\n{tokens}\n\t}}\n}}\n")
+
+@dataclass
+class TxCompactText:
+    """
+    TxPlainText whose text is encoded with the shared dictionary, for lua/compact_text.lua.
+
+    Attributes:
+        text: The plain text content to be transmitted
+        x: X-coordinate for text position (1-640, Lua/1-based indexing)
+        y: Y-coordinate for text position (1-400, Lua/1-based indexing)
+        palette_offset: Color palette offset (1-15, 0/'VOID' is invalid)
+        spacing: Character spacing value
+    """
+    text: str
+    x: int = 1
+    y: int = 1
+    palette_offset: int = 1
+    spacing: int = 4
+
+    def pack(self) -> bytes:
+        """
+        Pack the message into a binary format.
+
+        Returns:
+            bytes: [x_msb, x_lsb, y_msb, y_lsb, palette_offset, spacing, dictionary_id, encoded_text...]
+        """
+        header = struct.pack('>HHBBB', self.x, self.y, self.palette_offset & 0x0F, self.spacing & 0xFF,
+                             DICTIONARY_ID)
+        return header + encode_text(self.text)
+
+def pack_text(text: str, **kwargs) -> tuple[int, bytes]:
+    """
+    The smaller of the compact and the plain message for text.
+
+    Args:
+        text: The text to show
+        **kwargs: Position and formatting, as for TxPlainText
+
+    Returns:
+        tuple: (msg_code, payload) to send, on COMPACT_TEXT_CHANNEL or TEXT_CHANNEL
+    """
+    compact = TxCompactText(text, **kwargs).pack()
+    if len(compact) < _TEXT_HEADER_SIZE + len(text.encode('utf-8')):
+        return COMPACT_TEXT_CHANNEL, compact
+    return TEXT_CHANNEL, TxPlainText(text, **kwargs).pack()
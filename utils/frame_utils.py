@@ -1,5 +1,5 @@
 from frame_msg import FrameMsg, RxAudio, RxTap, TxCode
-from utils.message import safe_send_message
+from utils.message import safe_send_batch
 
 async def cleanup(frame: FrameMsg, rx_audio: RxAudio, rx_tap: RxTap, recording: bool) -> None:
     """
@@ -12,12 +12,11 @@ async def cleanup(frame: FrameMsg, rx_audio: RxAudio, rx_tap: RxTap, recording:
         recording: Whether audio is currently being recorded
     """
     try:
-        # Stop recording if still recording
+        # Stop recording if still recording, and stop listening for taps
+        stop_messages = [(0x10, TxCode(value=0).pack())]
         if recording:
-            await safe_send_message(frame, 0x30, TxCode(value=0).pack())
-        
-        # Stop listening for taps
-        await safe_send_message(frame, 0x10, TxCode(value=0).pack())
+            stop_messages.insert(0, (0x30, TxCode(value=0).pack()))
+        await safe_send_batch(frame, stop_messages)
         
         # Clean up
         rx_audio.detach(frame)
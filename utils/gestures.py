@@ -0,0 +1,230 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+# Gesture names by number of taps
+GESTURES = {1: 'single', 2: 'double', 3: 'triple'}
+
+# What single, double and triple taps do while idle and while recording in tap_audio.py.
+# A single tap acts straight away and is taken back if it turns out to start a multi-tap.
+GESTURE_ACTIONS = {
+    'idle': {'single': 'record', 'double': 'next_page', 'triple': 'repeat'},
+    'recording': {'single': 'record', 'double': 'cancel'},
+}
+
+# Event statuses: a tentative single tap is acted on straight away and may be revoked
+# if it turns out to be the start of a multi-tap
+TENTATIVE = 'tentative'
+CONFIRMED = 'confirmed'
+REVOKED = 'revoked'
+
+# msg_code of the raw tap messages sent by the Frameside tap library
+TAP_FLAG = 0x09
+
+@dataclass
+class GestureEvent:
+    """
+    A classified gesture, or a change to the status of one.
+
+    Attributes:
+        gesture: 'single', 'double' or 'triple'
+        action: The action the gesture maps to in the mode it started in (None if unmapped)
+        status: TENTATIVE (act now, may be revoked), CONFIRMED or REVOKED
+        time: Host timestamp of the tap that produced the event, or of the window expiring
+        mode: The mode the gesture started in
+    """
+    gesture: str
+    action: str | None
+    status: str
+    time: float
+    mode: str
+
+class GestureClassifier:
+    """
+    Classifies host-timestamped raw taps into single, double and triple taps.
+
+    A first tap is reported at once as a tentative single tap, so its action doesn't wait
+    for the multi-tap window. If a second tap arrives within the window the single tap is
+    revoked; the multi-tap is confirmed when the window after the last tap expires, or
+    straight away once the largest gesture mapped in the current mode is reached (so a
+    mode without multi-taps confirms single taps immediately).
+
+    Pure and clock-free: feed it tap times and expiry times, e.g. from a synthetic timeline.
+    """
+
+    def __init__(self, actions: dict[str, dict[str, str]], mode: str | None = None,
+                 window: float = 0.3, debounce: float = 0.04):
+        """
+        Args:
+            actions: Per mode, a map of gesture name to action name,
+                e.g. {'idle': {'single': 'record', 'double': 'next_page'}}
+            mode: Initial mode, defaults to the first one in actions
+            window: Seconds after a tap in which another tap extends the gesture
+            debounce: Taps closer together than this are treated as one
+        """
+        self.actions = actions
+        self.mode = mode or next(iter(actions))
+        self.window = window
+        self.debounce = debounce
+
+        self._count = 0
+        self._last_tap = None
+        self._sequence_mode = None
+        self._resolved = False
+
+    @property
+    def deadline(self) -> float | None:
+        """When the current tap sequence resolves if no further tap arrives, or None if idle."""
+        if self._count == 0 or self._resolved:
+            return None
+        return self._last_tap + self.window
+
+    def _event(self, taps: int, status: str, timestamp: float) -> GestureEvent:
+        gesture = GESTURES[taps]
+        return GestureEvent(gesture, self.actions[self._sequence_mode].get(gesture), status, timestamp, self._sequence_mode)
+
+    def _max_taps(self) -> int:
+        mapped = [taps for taps, gesture in GESTURES.items() if gesture in self.actions[self._sequence_mode]]
+        return max(mapped, default=1)
+
+    def tap(self, timestamp: float) -> list[GestureEvent]:
+        """
+        Register a raw tap.
+
+        Args:
+            timestamp: Host timestamp of the tap (seconds, monotonic)
+
+        Returns:
+            list: Events to act on now, in order
+        """
+        events = self.expire(timestamp)
+
+        if self._last_tap is not None and timestamp - self._last_tap < self.debounce:
+            self._last_tap = timestamp
+            return events
+
+        if self._count == 0:
+            # a new sequence; its actions come from the mode it started in
+            self._sequence_mode = self.mode
+            self._count = 1
+            self._last_tap = timestamp
+            if self._max_taps() == 1:
+                self._resolved = True
+                events.append(self._event(1, CONFIRMED, timestamp))
+            else:
+                events.append(self._event(1, TENTATIVE, timestamp))
+            return events
+
+        self._last_tap = timestamp
+        if self._resolved:
+            # extra taps after the largest gesture are part of it
+            return events
+
+        self._count += 1
+        if self._count == 2:
+            events.append(self._event(1, REVOKED, timestamp))
+        if self._count >= self._max_taps():
+            self._resolved = True
+            events.append(self._event(self._count, CONFIRMED, timestamp))
+        return events
+
+    def expire(self, timestamp: float) -> list[GestureEvent]:
+        """
+        Resolve the current sequence if its window has passed.
+
+        Args:
+            timestamp: The current host timestamp
+
+        Returns:
+            list: The confirmation of the gesture, if it resolved now
+        """
+        if self._count == 0 or timestamp < self._last_tap + self.window:
+            return []
+
+        events = [] if self._resolved else [self._event(self._count, CONFIRMED, self._last_tap + self.window)]
+        self._count = 0
+        self._resolved = False
+        return events
+
+def classify_timeline(classifier: GestureClassifier, taps: list[float], end: float | None = None) -> list[GestureEvent]:
+    """
+    Run a synthetic tap timeline through a classifier.
+
+    Args:
+        classifier: The classifier to drive
+        taps: Tap times in seconds, ascending
+        end: Time to run to after the last tap (default: until everything has resolved)
+
+    Returns:
+        list: Every event, in order, as the live receiver would have emitted them
+    """
+    events = []
+    for timestamp in taps:
+        deadline = classifier.deadline
+        if deadline is not None and deadline <= timestamp:
+            events.extend(classifier.expire(deadline))
+        events.extend(classifier.tap(timestamp))
+    deadline = classifier.deadline
+    if deadline is not None:
+        events.extend(classifier.expire(deadline if end is None else max(deadline, end)))
+    elif end is not None:
+        events.extend(classifier.expire(end))
+    return events
+
+class RxGesture:
+    """
+    Drop-in alternative to RxTap that classifies raw taps on the host.
+
+    Like RxTap, attach() returns a queue; it receives GestureEvents instead of tap counts,
+    the first one as soon as the first tap arrives.
+    """
+
+    def __init__(self, classifier: GestureClassifier, tap_flag: int = TAP_FLAG):
+        """
+        Args:
+            classifier: Classifier holding the gesture to action map and the current mode
+            tap_flag: The message type identifier for tap events
+        """
+        self.classifier = classifier
+        self.tap_flag = tap_flag
+        self.queue: asyncio.Queue | None = None
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _publish(self, events: list[GestureEvent]) -> None:
+        for event in events:
+            self.queue.put_nowait(event)
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        deadline = self.classifier.deadline
+        if deadline is not None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(max(0.0, deadline - time.monotonic()), self._expire)
+
+    def _expire(self) -> None:
+        self._timer = None
+        if self.queue is not None:
+            self._publish(self.classifier.expire(time.monotonic()))
+
+    def handle_data(self, data: bytes) -> None:
+        """Timestamp a raw tap message and publish whatever it resolves."""
+        if self.queue is None:
+            return
+        self._publish(self.classifier.tap(time.monotonic()))
+
+    async def attach(self, frame) -> asyncio.Queue:
+        """
+        Attach to the Frame data response and return a queue that will receive GestureEvents.
+        """
+        self.queue = asyncio.Queue()
+        frame.register_data_response_handler(self, [self.tap_flag], self.handle_data)
+        return self.queue
+
+    def detach(self, frame) -> None:
+        """Detach from the Frame data response and stop any pending timer."""
+        frame.unregister_data_response_handler(self)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.queue = None
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+# Base URL every OpenAI request goes to; pre-warming opens a connection to this host
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+
+# How long an idle pooled connection is kept open before it is closed
+KEEPALIVE_EXPIRY = 120.0
+
+# The shared client is created once, on first use
+_http_client = None
+_http_client_lock = threading.Lock()
+_last_used = 0.0
+
+# Called when the shared client is closed, so the clients built on it can be dropped too
+_close_callbacks = []
+
+async def _mark_used(_response) -> None:
+    """httpx response hook: remember when the pool last carried a request."""
+    global _last_used
+    _last_used = time.monotonic()
+
+def get_http_client():
+    """
+    Return the shared async HTTP client used by both the transcription and chat clients.
+
+    Using one client means Whisper and chat requests share a single keep-alive connection
+    pool, so a connection opened (or pre-warmed) for one is reused by the other.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                import httpx
+                _http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=10,
+                        max_keepalive_connections=10,
+                        keepalive_expiry=KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    event_hooks={'response': [_mark_used]},
+                )
+    return _http_client
+
+async def prewarm_connection(url: str = OPENAI_BASE_URL) -> bool:
+    """
+    Open (or refresh) a pooled connection to the API host ahead of a request.
+
+    Call this as soon as we know a request is coming (e.g. on the tap that starts a
+    recording) so the TCP and TLS handshakes are done before the audio is ready.
+    Does nothing if the pool carried a request recently enough to still be warm.
+
+    Args:
+        url: Any URL on the host to warm up; the response itself is ignored
+
+    Returns:
+        bool: True if a warm-up request was made, False if the pool was already warm
+    """
+    if time.monotonic() - _last_used < KEEPALIVE_EXPIRY / 2:
+        return False
+    try:
+        # the status doesn't matter, only that the connection is left in the pool
+        await get_http_client().head(url)
+        return True
+    except Exception as e:
+        print(f"Error pre-warming connection: {e}")
+        return False
+
+def on_close(callback) -> None:
+    """
+    Register a callback run whenever the shared client is closed.
+
+    Modules that cache a client built on get_http_client() (the OpenAI client, the chat
+    models) register one that drops the cache, so the next request builds a new client
+    instead of using the closed one.
+    """
+    _close_callbacks.append(callback)
+
+async def close_http_client() -> None:
+    """Close the shared client and its pooled connections."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        for callback in _close_callbacks:
+            callback()
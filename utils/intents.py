@@ -0,0 +1,137 @@
+import difflib
+import re
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+# Words that carry no meaning for a command, dropped from transcripts and phrases alike
+# so "could you please tell me the time" and "time" compare on what matters
+FILLER_WORDS = {
+    'a', 'again', 'can', 'could', 'hey', 'just', 'me', 'my', 'ok', 'okay',
+    'please', 'so', 'tell', 'the', 'uh', 'um', 'would', 'you',
+}
+
+# How similar (difflib ratio, 0-1) a transcript must be to a phrase to trigger its intent;
+# every word on either side must also be at least this similar to a word on the other
+MATCH_THRESHOLD = 0.8
+
+IntentHandler = Callable[[str], Awaitable[str]]
+
+def normalize(text: str) -> str:
+    """Lowercase, strip punctuation and filler words, and collapse whitespace."""
+    words = re.sub(r"[^\w\s']", ' ', text.lower()).split()
+    return ' '.join(word for word in words if word not in FILLER_WORDS)
+
+def words_agree(phrase: str, text: str, threshold: float = MATCH_THRESHOLD) -> bool:
+    """
+    Whether every word of either normalized string has a similar word in the other.
+
+    The whole-string ratio forgives a different word as long as the rest lines up
+    ("how much time is left" is 0.84 like "how much battery is left"); this doesn't,
+    while still allowing for a misheard letter or two.
+    """
+    phrase_words, text_words = phrase.split(), text.split()
+
+    def has_counterpart(word, others):
+        return word in others or any(
+            difflib.SequenceMatcher(None, word, other, autojunk=False).ratio() >= threshold for other in others
+        )
+
+    return (all(has_counterpart(word, text_words) for word in phrase_words)
+            and all(has_counterpart(word, phrase_words) for word in text_words))
+
+@dataclass
+class Intent:
+    """
+    A command handled on the host instead of by the model.
+
+    Attributes:
+        name: Identifier, e.g. 'time'
+        phrases: Example utterances that trigger it
+        handler: Async callable(transcript) returning the text to display
+    """
+    name: str
+    phrases: list[str]
+    handler: IntentHandler
+
+class IntentRouter:
+    """
+    Registry of local intents with fuzzy matching over the transcript.
+
+    Transcripts that closely match one of an intent's phrases are answered by its handler
+    in milliseconds; anything else falls through (route() returns None) to the model.
+    Matching is deliberately strict: a near miss costs a model round trip, while a false
+    match answers the wrong question. So besides the overall similarity, each word has to
+    match a word of the phrase (see words_agree()).
+    """
+
+    def __init__(self, threshold: float = MATCH_THRESHOLD):
+        """
+        Args:
+            threshold: Minimum difflib similarity between the normalized transcript and a phrase
+        """
+        self.threshold = threshold
+        self.intents: list[Intent] = []
+        self._phrases: list[tuple[str, Intent]] = []
+
+    def register(self, name: str, phrases: list[str], handler: IntentHandler) -> Intent:
+        """
+        Add an intent.
+
+        Args:
+            name: Identifier for the intent
+            phrases: Example utterances that trigger it
+            handler: Async callable(transcript) returning the text to display
+
+        Returns:
+            Intent: The registered intent
+        """
+        intent = Intent(name, phrases, handler)
+        self.intents.append(intent)
+        self._phrases.extend((normalize(phrase), intent) for phrase in phrases)
+        return intent
+
+    def match(self, transcript: str) -> tuple[Intent, float] | None:
+        """
+        Find the intent whose phrase is most similar to the transcript.
+
+        Returns:
+            tuple | None: (intent, similarity), or None if nothing reaches the threshold
+        """
+        text = normalize(transcript)
+        if not text:
+            return None
+
+        best = None
+        best_score = self.threshold
+        # seq2 is the side difflib indexes, so index the transcript once and swap phrases in
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(text)
+        for phrase, intent in self._phrases:
+            # ratio() is at most 2 * shorter / total length, so skip phrases that can't win
+            if 2 * min(len(phrase), len(text)) / (len(phrase) + len(text)) < best_score:
+                continue
+            matcher.set_seq1(phrase)
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score >= best_score and words_agree(phrase, text, self.threshold):
+                best, best_score = intent, score
+        return (best, best_score) if best is not None else None
+
+    async def route(self, transcript: str) -> str | None:
+        """
+        Answer the transcript locally if it matches an intent.
+
+        Returns:
+            str | None: The handler's response, or None to fall through to the model
+        """
+        start = time.perf_counter()
+        matched = self.match(transcript)
+        if matched is None:
+            return None
+
+        intent, score = matched
+        response = await intent.handler(transcript)
+        print(f"Handled locally as '{intent.name}' (match {score:.2f}) in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return response
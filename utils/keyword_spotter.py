@@ -0,0 +1,339 @@
+import time
+import wave
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+@lru_cache(maxsize=8)
+def _mel_filterbank(sample_rate: int, n_fft: int, num_filters: int) -> np.ndarray:
+    """Triangular mel filters as a (num_filters, n_fft // 2 + 1) matrix."""
+    mel_points = np.linspace(_hz_to_mel(0.0), _hz_to_mel(sample_rate / 2), num_filters + 2)
+    bins = np.floor((n_fft + 1) * _mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    fbank = np.zeros((num_filters, n_fft // 2 + 1))
+    for m in range(1, num_filters + 1):
+        left, centre, right = bins[m - 1], bins[m], bins[m + 1]
+        if centre > left:
+            fbank[m - 1, left:centre] = (np.arange(left, centre) - left) / (centre - left)
+        if right > centre:
+            fbank[m - 1, centre:right] = (right - np.arange(centre, right)) / (right - centre)
+    return fbank
+
+@lru_cache(maxsize=8)
+def _dct_matrix(num_filters: int, num_ceps: int) -> np.ndarray:
+    """Orthonormal DCT-II basis as a (num_filters, num_ceps) matrix."""
+    n = np.arange(num_filters)
+    k = np.arange(num_ceps)
+    basis = np.cos(np.pi / num_filters * (n[:, None] + 0.5) * k[None, :])
+    basis *= np.sqrt(2.0 / num_filters)
+    basis[:, 0] /= np.sqrt(2.0)
+    return basis
+
+def mfcc(samples: np.ndarray, sample_rate: int = 8000, frame_length: int = 200,
+         frame_step: int = 80, n_fft: int = 256, num_filters: int = 26, num_ceps: int = 13) -> np.ndarray:
+    """
+    Compute MFCC features for a block of audio, vectorized over all frames at once.
+
+    Args:
+        samples: Mono PCM samples (any numeric dtype)
+        sample_rate: Sample rate in Hz (default: 8000, as streamed by Frame)
+        frame_length: Analysis window in samples (default: 200, i.e. 25ms at 8kHz)
+        frame_step: Hop between windows in samples (default: 80, i.e. 10ms at 8kHz)
+        n_fft: FFT size
+        num_filters: Number of mel filters
+        num_ceps: Number of cepstral coefficients to keep
+
+    Returns:
+        np.ndarray: (num_frames, num_ceps) feature matrix; empty if there is less than one frame
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if len(samples) < frame_length:
+        return np.zeros((0, num_ceps), dtype=np.float32)
+
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    frames = np.lib.stride_tricks.sliding_window_view(emphasized, frame_length)[::frame_step]
+    frames = frames * np.hamming(frame_length).astype(np.float32)
+
+    power = np.abs(np.fft.rfft(frames, n=n_fft)) ** 2 / n_fft
+    energies = power @ _mel_filterbank(sample_rate, n_fft, num_filters).T
+    log_energies = np.log(np.maximum(energies, 1e-10))
+    return (log_energies @ _dct_matrix(num_filters, num_ceps)).astype(np.float32)
+
+def _keyword_features(samples: np.ndarray, sample_rate: int, frame_length: int, frame_step: int,
+                      num_ceps: int) -> np.ndarray:
+    """MFCCs without c0, so matching follows spectral shape rather than loudness."""
+    return mfcc(samples, sample_rate, frame_length, frame_step, num_ceps=num_ceps)[:, 1:]
+
+def subsequence_dtw(template: np.ndarray, window: np.ndarray) -> float:
+    """
+    Best average per-frame distance of the template against any stretch of the window.
+
+    Uses the symmetric (1,1), (1,2), (2,1) step pattern so every row only depends on
+    earlier rows and can be computed as a single vector operation.
+
+    Args:
+        template: (T, num_ceps) template features
+        window: (N, num_ceps) recent input features
+
+    Returns:
+        float: Normalized alignment cost (lower is a better match), inf if no alignment fits
+    """
+    rows, cols = len(template), len(window)
+    if rows == 0 or cols < (rows + 1) // 2:
+        return float('inf')
+
+    cost = np.sqrt(((template[:, None, :] - window[None, :, :]) ** 2).sum(axis=2))
+
+    inf = np.full(2, np.inf)
+    prev2 = np.full(cols + 2, np.inf)
+    # free start: the keyword may begin anywhere in the window
+    prev1 = np.concatenate((inf, cost[0]))
+    for i in range(1, rows):
+        diag = prev1[1:-1]
+        skip_input = prev1[:-2]
+        skip_template = prev2[1:-1]
+        row = cost[i] + np.minimum(np.minimum(diag, skip_input), skip_template)
+        prev2, prev1 = prev1, np.concatenate((inf, row))
+
+    return float(prev1[2:].min() / rows)
+
+class KeywordSpotter(ABC):
+    """
+    Base class for on-CPU keyword spotters fed with streamed RxAudio PCM.
+
+    Subclasses implement process_chunk(); tap_audio.main() treats a returned
+    keyword exactly like a tap, so any spotter can be dropped in as a trigger.
+    """
+
+    @abstractmethod
+    def process_chunk(self, chunk: bytes) -> str | None:
+        """
+        Consume one chunk of 16-bit PCM and report a detection, if any.
+
+        Args:
+            chunk: Little-endian signed 16-bit PCM bytes; an odd trailing byte is held until the next chunk
+
+        Returns:
+            str | None: The detected keyword, or None
+        """
+
+    def reset(self) -> None:
+        """Drop any buffered audio state."""
+
+class TemplateKeywordSpotter(KeywordSpotter):
+    """
+    Keyword spotter that matches MFCC templates against the latest audio with DTW.
+
+    Features are computed incrementally (only for newly arrived frames) and matching is
+    throttled so each chunk stays within budget_ms of CPU on average.
+    """
+
+    def __init__(self, sample_rate: int = 8000, threshold: float = 6.0, budget_ms: float = 5.0,
+                 refractory: float = 1.0, min_rms: float = 200.0, num_ceps: int = 13):
+        """
+        Args:
+            sample_rate: Sample rate of the incoming PCM in Hz
+            threshold: Maximum normalized DTW cost accepted as a detection
+            budget_ms: Target CPU time per chunk, in milliseconds
+            refractory: Seconds after a detection during which no further detections fire
+            min_rms: Audio quieter than this (RMS over the match window) is never matched
+            num_ceps: Cepstral coefficients computed per frame (c0 is then dropped)
+        """
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.budget_ms = budget_ms
+        self.refractory = refractory
+        self.min_rms = min_rms
+        self.num_ceps = num_ceps
+        self.frame_length = int(0.025 * sample_rate)
+        self.frame_step = int(0.010 * sample_rate)
+
+        self.templates: dict[str, np.ndarray] = {}
+        # frames of feature history kept for matching (at least one second)
+        self._window_frames = 100
+        self.reset()
+
+    def reset(self) -> None:
+        self._tail = np.zeros(0, dtype=np.int16)
+        # reassembles a sample whose two bytes were split across chunks
+        self._carry = bytearray(2)
+        self._has_carry = False
+        self._features = np.zeros((0, self.num_ceps - 1), dtype=np.float32)
+        self._rms = np.zeros(0, dtype=np.float32)
+        self._frames_seen = 0
+        self._last_detection = -np.inf
+        self._skip = 0
+        # statistics for budget tuning and benchmarks
+        self.chunks = 0
+        self.matches = 0
+        self.cpu_seconds = 0.0
+
+    def enroll(self, keyword: str, samples: np.ndarray) -> None:
+        """
+        Add a template for a keyword from an example recording.
+
+        Args:
+            keyword: Name returned when this template matches
+            samples: Mono int16 PCM of the keyword, ideally trimmed to the spoken word
+        """
+        features = _keyword_features(samples, self.sample_rate, self.frame_length, self.frame_step, self.num_ceps)
+        if len(features) == 0:
+            raise ValueError(f"Template for '{keyword}' is too short")
+        self.templates[keyword] = features
+        # keep enough history to fit the longest template stretched by the (1,2) step
+        self._window_frames = max(self._window_frames, 2 * len(features))
+
+    @classmethod
+    def from_wav_files(cls, wav_files: dict[str, str], **kwargs) -> 'TemplateKeywordSpotter':
+        """
+        Build a spotter from one 16-bit mono WAV example per keyword.
+
+        Args:
+            wav_files: Mapping of keyword to WAV file path
+            **kwargs: Passed through to the constructor
+        """
+        spotter = None
+        for keyword, path in wav_files.items():
+            samples, sample_rate = read_wav_samples(path)
+            if spotter is None:
+                spotter = cls(sample_rate=sample_rate, **kwargs)
+            spotter.enroll(keyword, samples)
+        if spotter is None:
+            raise ValueError("At least one keyword template is required")
+        return spotter
+
+    def process_chunk(self, chunk: bytes) -> str | None:
+        start = time.perf_counter()
+        self.chunks += 1
+        try:
+            self._extend_features(self._samples(chunk))
+            if self._skip > 0:
+                self._skip -= 1
+                return None
+            return self._match()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.cpu_seconds += elapsed
+            # over budget: spread the next matches out so the average stays within it
+            overrun = elapsed * 1000.0 / self.budget_ms
+            if overrun > 1.0:
+                self._skip = int(overrun)
+
+    def _samples(self, chunk: bytes) -> np.ndarray:
+        """The whole samples in a chunk, holding an odd trailing byte until the next one."""
+        view = memoryview(chunk)
+        if self._has_carry and len(view) > 0:
+            self._carry[1] = view[0]
+            view = bytes(self._carry) + view[1:]
+            self._has_carry = False
+
+        whole = len(view) & ~1
+        if len(view) > whole:
+            self._carry[0] = view[whole]
+            self._has_carry = True
+        return np.frombuffer(view[:whole], dtype='<i2')
+
+    def _extend_features(self, samples: np.ndarray) -> None:
+        """Compute features for the newly completed frames only and trim the history."""
+        audio = np.concatenate((self._tail, samples))
+        if len(audio) < self.frame_length:
+            self._tail = audio
+            return
+
+        new_frames = (len(audio) - self.frame_length) // self.frame_step + 1
+        used = (new_frames - 1) * self.frame_step + self.frame_length
+        features = _keyword_features(audio[:used], self.sample_rate, self.frame_length, self.frame_step,
+                                     self.num_ceps)
+        frames = np.lib.stride_tricks.sliding_window_view(audio[:used].astype(np.float32), self.frame_length)[::self.frame_step]
+        rms = np.sqrt((frames ** 2).mean(axis=1))
+
+        self._tail = audio[new_frames * self.frame_step:]
+        self._frames_seen += new_frames
+        self._features = np.concatenate((self._features, features))[-self._window_frames:]
+        self._rms = np.concatenate((self._rms, rms))[-self._window_frames:]
+
+    def _match(self) -> str | None:
+        """Compare every template against the current window and return the best hit."""
+        if not self.templates or len(self._features) == 0:
+            return None
+        now = self._frames_seen * self.frame_step / self.sample_rate
+        if now - self._last_detection < self.refractory:
+            return None
+        if self._rms.max() < self.min_rms:
+            return None
+
+        self.matches += 1
+        window = self._features
+        best_keyword, best_cost = None, self.threshold
+        for keyword, template in self.templates.items():
+            cost = subsequence_dtw(template, window)
+            if cost < best_cost:
+                best_keyword, best_cost = keyword, cost
+
+        if best_keyword is not None:
+            self._last_detection = now
+        return best_keyword
+
+def read_wav_samples(path: str) -> tuple[np.ndarray, int]:
+    """
+    Read a 16-bit mono WAV file (e.g. one saved by tap_audio) into int16 samples.
+
+    Returns:
+        tuple: (samples, sample_rate)
+    """
+    with wave.open(str(path), 'rb') as wav_file:
+        if wav_file.getsampwidth() != 2 or wav_file.getnchannels() != 1:
+            raise ValueError(f"{path} must be 16-bit mono PCM")
+        frames = wav_file.readframes(wav_file.getnframes())
+        return np.frombuffer(frames, dtype='<i2'), wav_file.getframerate()
+
+def evaluate(spotter: KeywordSpotter, clips, chunk_size: int = 240, sample_rate: int = 8000) -> dict:
+    """
+    Run labelled clips through a spotter chunk by chunk, as RxAudio would deliver them.
+
+    Args:
+        spotter: The spotter under test (reset before every clip)
+        clips: Iterable of (int16 samples, expected keyword or None)
+        chunk_size: Bytes per simulated RxAudio chunk (default: 240, one BLE packet)
+        sample_rate: Sample rate of the clips in Hz
+
+    Returns:
+        dict: accuracy, false_accepts, false_rejects, cpu_per_audio_second and the clip count
+    """
+    correct = false_accepts = false_rejects = total = 0
+    cpu_seconds = audio_seconds = 0.0
+
+    for samples, expected in clips:
+        spotter.reset()
+        pcm = np.asarray(samples, dtype='<i2').tobytes()
+        detected = None
+        start = time.process_time()
+        for offset in range(0, len(pcm), chunk_size):
+            hit = spotter.process_chunk(pcm[offset:offset + chunk_size])
+            if hit is not None and detected is None:
+                detected = hit
+        cpu_seconds += time.process_time() - start
+        audio_seconds += len(samples) / sample_rate
+
+        total += 1
+        if detected == expected:
+            correct += 1
+        elif expected is None:
+            false_accepts += 1
+        else:
+            false_rejects += 1
+
+    return {
+        'clips': total,
+        'accuracy': correct / total if total else 0.0,
+        'false_accepts': false_accepts,
+        'false_rejects': false_rejects,
+        'cpu_per_audio_second': cpu_seconds / audio_seconds if audio_seconds else 0.0,
+    }
@@ -0,0 +1,443 @@
+import os
+import statistics
+import struct
+import time
+from dataclasses import dataclass, field
+from importlib.resources import files
+from pathlib import Path
+
+from utils.capture_policy import DEFAULT_THROUGHPUT
+
+# The project root, which holds lua/ and examples/lua/
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Directories searched for require()d modules: this project's Lua apps, then the stdlua
+# libraries that FrameMsg.upload_stdlua_libs() sends (data.min, audio.min, ...)
+LUA_PATHS = (str(_PROJECT_ROOT / 'lua'), str(_PROJECT_ROOT / 'examples' / 'lua'), str(files('frame_msg').joinpath('lua')))
+
+# Bluetooth payload size of a typical connection (what frame.bluetooth.max_length() returns)
+DEFAULT_MTU = 240
+
+# Frame's microphone buffer; audio not read within this many bytes is lost
+MIC_BUFFER_BYTES = 32768
+
+# Memory (KB) at which the harness runs a full collection itself, since the automatic
+# collector is stopped so allocations can be counted exactly
+HARNESS_GC_KB = 1024
+
+# Lua run before the app: counts explicit collections and what they free
+_PRELUDE = b"""
+local gc = collectgarbage
+harness_gc = { calls = 0, freed = 0 }
+gc('stop')
+function harness_memory() return gc('count') end
+function harness_collect()
+    local before = gc('count')
+    gc('collect')
+    return before - gc('count')
+end
+collectgarbage = function(opt, ...)
+    if opt == nil or opt == 'collect' then
+        harness_gc.calls = harness_gc.calls + 1
+        harness_gc.freed = harness_gc.freed + harness_collect()
+        return 0
+    end
+    return gc(opt, ...)
+end
+"""
+
+class StopHarness(Exception):
+    """Raised into the app from frame.sleep() when the run's time is up."""
+
+@dataclass
+class HostEvent:
+    """
+    Something the host does at a point in (virtual) time.
+
+    Attributes:
+        time: Seconds since the app started
+        kind: 'message' (a send_message() to the app) or 'tap'
+        code: msg_code, for messages
+        payload: Packed payload, for messages
+    """
+    time: float
+    kind: str
+    code: int = 0
+    payload: bytes = b''
+
+@dataclass
+class Iteration:
+    """
+    One pass of the app's main loop, from the end of one loop sleep to the end of the next.
+
+    Attributes:
+        time: Virtual time the iteration started
+        cpu: Host seconds spent running the iteration's Lua (relative, not Frame's speed)
+        sleep: Seconds the loop slept at the end of it
+        busy_wait: Virtual seconds spent waiting for Bluetooth during it
+        allocated_kb: Kilobytes the Lua code allocated
+        memory_kb: Kilobytes in use at its end
+        gc_calls: Explicit collectgarbage() calls
+        packets: Bluetooth packets sent to the host
+        bytes: Bytes sent to the host
+    """
+    time: float
+    cpu: float
+    sleep: float
+    busy_wait: float
+    allocated_kb: float
+    memory_kb: float
+    gc_calls: int
+    packets: int
+    bytes: int
+
+@dataclass
+class HarnessResult:
+    """
+    What a run of a Lua app did.
+
+    Attributes:
+        iterations: Per-iteration stats, the first one (module loading and startup) included
+        sent: (virtual time, packet) for everything sent to the host
+        prints: Lines the app printed
+        display_calls: Number of frame.display calls
+        max_mic_backlog: Most audio bytes waiting in the microphone buffer
+        dropped_audio: Audio bytes lost because the buffer overflowed
+        duration: Virtual seconds run
+    """
+    iterations: list[Iteration] = field(default_factory=list)
+    sent: list[tuple[float, bytes]] = field(default_factory=list)
+    prints: list[str] = field(default_factory=list)
+    display_calls: int = 0
+    max_mic_backlog: int = 0
+    dropped_audio: int = 0
+    duration: float = 0.0
+
+    def summary(self) -> dict:
+        """Loop statistics over the iterations after startup."""
+        loop = self.iterations[1:] or self.iterations
+        cpus = sorted(iteration.cpu for iteration in loop)
+        span = self.duration - loop[0].time if loop else 0.0
+        by_flag = {}
+        for _, packet in self.sent:
+            flag = packet[0] if packet else None
+            by_flag[flag] = by_flag.get(flag, 0) + 1
+        return {
+            'iterations': len(loop),
+            'loops_per_second': len(loop) / span if span else 0.0,
+            'cpu_p50_us': statistics.median(cpus) * 1e6 if cpus else 0.0,
+            'cpu_p99_us': cpus[min(len(cpus) - 1, int(0.99 * len(cpus)))] * 1e6 if cpus else 0.0,
+            'alloc_kb_per_iteration': statistics.fmean(i.allocated_kb for i in loop) if loop else 0.0,
+            'peak_memory_kb': max((i.memory_kb for i in loop), default=0.0),
+            'gc_calls_per_second': sum(i.gc_calls for i in loop) / span if span else 0.0,
+            'busy_wait': sum(i.busy_wait for i in loop),
+            'packets': len(self.sent),
+            'bytes_per_second': sum(len(packet) for _, packet in self.sent) / self.duration if self.duration else 0.0,
+            'packets_by_flag': by_flag,
+        }
+
+class LuaHarness:
+    """
+    Runs a Frameside Lua app on the host in an embedded Lua 5.4 (lupa), against Python
+    stubs of the frame API, on a virtual clock.
+
+    The real stdlua libraries (data, audio, tap, camera, ...) run unmodified on top of the
+    stubs, so the measured loop is the code that is deployed. frame.sleep() advances the
+    virtual clock instead of sleeping, and (unless it's a wait to retry a busy send)
+    marks the end of a loop iteration; host events
+    (messages split into MTU packets, taps) are delivered during those sleeps, as the
+    Bluetooth receive callback would interrupt them on Frame. The microphone produces
+    audio at its configured rate on the virtual clock, and sends are limited to a
+    Bluetooth throughput, failing as "busy" (for the app to retry) when it's exceeded.
+
+    lupa is an optional dependency, only needed to run the harness.
+    """
+
+    def __init__(self, app: str, events: list[HostEvent] | None = None, mtu: int = DEFAULT_MTU,
+                 throughput: float | None = DEFAULT_THROUGHPUT, lua_paths: tuple[str, ...] = LUA_PATHS,
+                 files: dict[str, str] | None = None):
+        """
+        Args:
+            app: Path of the Lua app to run, e.g. 'lua/tap_audio.lua'
+            events: Host events to deliver, in any order
+            mtu: Value of frame.bluetooth.max_length()
+            throughput: Bytes per second Frame can send, or None for unlimited
+            lua_paths: Directories to search for require()d modules
+            files: Modules generated by the host rather than read from lua_paths, as
+                {Frame filename: Lua source}, like the host's upload_file_from_string() calls
+        """
+        try:
+            from lupa.lua54 import LuaRuntime
+        except ImportError:
+            raise ImportError("The Lua harness needs lupa: pip install lupa") from None
+
+        self.app = app
+        self.events = sorted(events or [], key=lambda event: event.time)
+        self.mtu = mtu
+        self.throughput = throughput
+        self.lua_paths = lua_paths
+        self.files = files or {}
+        self.lua = LuaRuntime(encoding=None, unpack_returned_tuples=True)
+        self.lua.execute(_PRELUDE)
+        self._globals = self.lua.globals()
+
+        self.now = 0.0
+        self.result = HarnessResult()
+        self._duration = 0.0
+        self._stopped = False
+        self._next_event = 0
+        self._receive_callback = None
+        self._tap_callback = None
+        self._link_free_at = 0.0
+        self._busy = False
+        self._mic = None
+        self._photo = None
+        self._iteration_start = None
+        self._counters = None
+        self._install_frame()
+
+    # -- host side
+
+    def message(self, at: float, code: int, payload: bytes) -> None:
+        """Schedule a send_message(code, payload) from the host at virtual time at."""
+        self.events.append(HostEvent(at, 'message', code, payload))
+        self.events.sort(key=lambda event: event.time)
+
+    def tap(self, at: float) -> None:
+        """Schedule a tap at virtual time at."""
+        self.events.append(HostEvent(at, 'tap'))
+        self.events.sort(key=lambda event: event.time)
+
+    def _packets(self, code: int, payload: bytes) -> list[bytes]:
+        """Split a message into packets the way FrameMsg.send_message() does."""
+        first = bytes((code,)) + struct.pack('>H', len(payload)) + payload[:self.mtu - 3]
+        packets = [first]
+        for start in range(self.mtu - 3, len(payload), self.mtu - 1):
+            packets.append(bytes((code,)) + payload[start:start + self.mtu - 1])
+        return packets
+
+    def _deliver_events(self) -> None:
+        while self._next_event < len(self.events) and self.events[self._next_event].time <= self.now:
+            event = self.events[self._next_event]
+            self._next_event += 1
+            if event.kind == 'tap':
+                if self._tap_callback is not None:
+                    self._tap_callback()
+            elif self._receive_callback is not None:
+                for packet in self._packets(event.code, event.payload):
+                    self._receive_callback(packet)
+
+    # -- frame API stubs
+
+    def _install_frame(self) -> None:
+        lua = self.lua
+        harness = self
+
+        def display_call(*args):
+            harness.result.display_calls += 1
+
+        def send(data):
+            data = bytes(data)
+            if harness.throughput is not None:
+                if harness._link_free_at > harness.now:
+                    # the app retries; the time until the link is free is spent spinning
+                    harness._counters['busy_wait'] += harness._link_free_at - harness.now
+                    harness.now = harness._link_free_at
+                    harness._busy = True
+                    raise RuntimeError("bluetooth busy")
+                harness._link_free_at = harness.now + len(data) / harness.throughput
+            harness.result.sent.append((harness.now, data))
+            harness._counters['packets'] += 1
+            harness._counters['bytes'] += len(data)
+
+        def mic_start(args=None):
+            rate, depth = 8000, 16
+            if args is not None:
+                rate = args[b'sample_rate'] or rate
+                depth = args[b'bit_depth'] or depth
+            harness._mic = {'rate': rate * depth // 8, 'start': harness.now, 'read': 0, 'stopped': None}
+
+        def mic_backlog() -> int:
+            mic = harness._mic
+            end = harness.now if mic['stopped'] is None else mic['stopped']
+            produced = int((end - mic['start']) * mic['rate']) & ~1
+            backlog = produced - mic['read']
+            if backlog > MIC_BUFFER_BYTES:
+                harness.result.dropped_audio += backlog - MIC_BUFFER_BYTES
+                mic['read'] += backlog - MIC_BUFFER_BYTES
+                backlog = MIC_BUFFER_BYTES
+            harness.result.max_mic_backlog = max(harness.result.max_mic_backlog, backlog)
+            return backlog
+
+        def mic_read(count):
+            if harness._mic is None:
+                return None
+            backlog = mic_backlog()
+            if backlog == 0:
+                if harness._mic['stopped'] is not None:
+                    harness._mic = None
+                    return None
+                return b''
+            count = min(int(count), backlog)
+            harness._mic['read'] += count
+            return bytes(count)
+
+        def mic_stop():
+            if harness._mic is not None and harness._mic['stopped'] is None:
+                harness._mic['stopped'] = harness.now
+
+        def camera_capture(args=None):
+            # a capture takes about half a second; a 720px photo at the default quality is ~40 KB
+            harness._photo = {'ready_at': harness.now + 0.5, 'remaining': 40000}
+
+        def camera_image_ready():
+            return harness._photo is not None and harness.now >= harness._photo['ready_at']
+
+        def camera_read(count):
+            if harness._photo is None or harness._photo['remaining'] == 0:
+                harness._photo = None
+                return None
+            count = min(int(count), harness._photo['remaining'])
+            harness._photo['remaining'] -= count
+            return bytes(count)
+
+        def camera_auto(settings=None):
+            brightness = lua.table_from({b'r': 0.5, b'g': 0.5, b'b': 0.5, b'average': 0.5})
+            return lua.table_from({
+                b'error': 0.0, b'shutter': 1600.0, b'analog_gain': 1.0,
+                b'red_gain': 1.9, b'green_gain': 1.0, b'blue_gain': 2.2,
+                b'brightness': lua.table_from({b'center_weighted_average': 0.5, b'scene': 0.5,
+                                               b'matrix': brightness, b'spot': brightness}),
+            })
+
+        def set_receive_callback(callback):
+            harness._receive_callback = callback
+
+        def set_tap_callback(callback):
+            harness._tap_callback = callback
+
+        def lua_print(*args):
+            if harness._stopped:
+                # the app reporting the StopHarness error as it exits its loop
+                return
+            harness.result.prints.append('\t'.join(
+                arg.decode(errors='replace') if isinstance(arg, bytes) else str(arg) for arg in args))
+
+        noop = lambda *args: None
+        table = lua.table_from
+        frame = table({
+            b'sleep': self._sleep,
+            b'display': table({b'text': display_call, b'show': display_call, b'bitmap': display_call,
+                               b'assign_color': display_call, b'clear': display_call}),
+            b'time': table({b'utc': lambda: harness.now}),
+            b'imu': table({b'tap_callback': set_tap_callback,
+                           b'raw': lambda: table({b'compass': table({b'x': 0, b'y': 0, b'z': 0}),
+                                                  b'accelerometer': table({b'x': 0, b'y': 0, b'z': 0})})}),
+            b'bluetooth': table({b'send': send, b'max_length': lambda: harness.mtu,
+                                 b'receive_callback': set_receive_callback, b'is_connected': lambda: True}),
+            b'microphone': table({b'start': mic_start, b'read': mic_read, b'stop': mic_stop}),
+            b'camera': table({b'capture': camera_capture, b'image_ready': camera_image_ready,
+                              b'read': camera_read, b'read_raw': camera_read, b'auto': camera_auto,
+                              b'set_shutter': noop, b'set_gain': noop, b'set_white_balance': noop}),
+            b'fpga_read': lambda address, count: bytes(int(count)),
+            b'battery_level': lambda: 80,
+        })
+        self._globals[b'frame'] = frame
+        self._globals[b'print'] = lua_print
+
+        # Frame's filesystem is flat, so require('data.min') loads data.min.lua
+        def find_module(name):
+            filename = name.decode() + '.lua'
+            if filename in harness.files:
+                return None, harness.files[filename].encode()
+            for directory in harness.lua_paths:
+                path = os.path.join(directory, filename)
+                if os.path.exists(path):
+                    return path.encode(), None
+            return None, None
+
+        self._globals[b'harness_find_module'] = find_module
+        lua.execute(b"""
+            table.insert(package.searchers, 2, function(name)
+                local path, source = harness_find_module(name)
+                if source ~= nil then return assert(load(source, '@' .. name .. '.lua')), name end
+                if path == nil then return 'no file ' .. name .. '.lua in the harness paths' end
+                return assert(loadfile(path)), path
+            end)
+        """)
+
+    def _sleep(self, seconds=None):
+        seconds = float(seconds) if seconds is not None else 0.0
+        if self._busy:
+            # the wait before retrying a send that found Bluetooth busy, inside the iteration
+            self._busy = False
+            self._counters['busy_wait'] += seconds
+            self.now += seconds
+            self._deliver_events()
+            self._check_time()
+            return
+
+        self._end_iteration(seconds)
+        self.now += seconds
+        self._deliver_events()
+        self._check_time()
+        self._start_iteration()
+
+    def _check_time(self) -> None:
+        if self.now >= self._duration:
+            self._stopped = True
+            raise StopHarness()
+
+    # -- measurement
+
+    def _gc_state(self) -> tuple[float, float, int]:
+        gc = self._globals[b'harness_gc']
+        return self._globals[b'harness_memory'](), gc[b'freed'], gc[b'calls']
+
+    def _start_iteration(self) -> None:
+        memory, freed, calls = self._gc_state()
+        if memory > HARNESS_GC_KB:
+            # the harness's own collection isn't counted as the app's
+            self._globals[b'harness_collect']()
+            memory = self._globals[b'harness_memory']()
+        self._counters = {'busy_wait': 0.0, 'packets': 0, 'bytes': 0,
+                          'memory': memory, 'freed': freed, 'calls': calls, 'time': self.now}
+        self._iteration_start = time.perf_counter()
+
+    def _end_iteration(self, sleep: float) -> None:
+        cpu = time.perf_counter() - self._iteration_start
+        memory, freed, calls = self._gc_state()
+        counters = self._counters
+        self.result.iterations.append(Iteration(
+            time=counters['time'],
+            cpu=cpu,
+            sleep=sleep,
+            busy_wait=counters['busy_wait'],
+            allocated_kb=(memory - counters['memory']) + (freed - counters['freed']),
+            memory_kb=memory,
+            gc_calls=calls - counters['calls'],
+            packets=counters['packets'],
+            bytes=counters['bytes'],
+        ))
+
+    def run(self, duration: float) -> HarnessResult:
+        """
+        Run the app until duration virtual seconds have passed.
+
+        Returns:
+            HarnessResult: What the app did; result.prints has any Lua errors it reported
+        """
+        self._duration = duration
+        self._start_iteration()
+        with open(self.app, 'rb') as f:
+            chunk = self.lua.execute(b'return function(source, name) return assert(load(source, name)) end')(f.read(), ('@' + self.app).encode())
+        try:
+            chunk()
+        except StopHarness:
+            pass
+        except Exception as e:
+            # errors that the app didn't catch itself
+            if 'StopHarness' not in str(e):
+                raise
+        self.result.duration = min(self.now, duration)
+        return self.result
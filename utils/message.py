@@ -1,6 +1,45 @@
 import asyncio
+import struct
+from dataclasses import dataclass, field
 from frame_msg import TxPlainText
 
+# msg_code the Frameside batch parser (lua/batch.lua) is registered under
+BATCH_CHANNEL = 0x0b
+
+# msg_code + 2 byte length that send_message() prepends to the first packet
+MESSAGE_HEADER_SIZE = 3
+
+# msg_code + 2 byte length that precedes each message inside a batch
+_BATCH_ITEM_HEADER_SIZE = 3
+
+@dataclass
+class TxBatch:
+    """
+    A message carrying several (msg_code, payload) pairs so they can be delivered
+    to the Frameside app in one write and unpacked in a single pass by lua/batch.lua.
+
+    Attributes:
+        messages: The (msg_code, packed payload) pairs, in the order they should be parsed
+    """
+    messages: list[tuple[int, bytes]] = field(default_factory=list)
+
+    @staticmethod
+    def item_size(payload: bytes) -> int:
+        """Number of bytes a payload occupies inside a packed batch."""
+        return _BATCH_ITEM_HEADER_SIZE + len(payload)
+
+    def pack(self) -> bytes:
+        """
+        Pack the messages into the binary format expected by lua/batch.lua.
+
+        Returns:
+            bytes: Repeated [msg_code, length_msb, length_lsb, payload...]
+        """
+        return b''.join(
+            struct.pack('>BH', msg_code & 0xFF, len(payload)) + payload
+            for msg_code, payload in self.messages
+        )
+
 async def safe_send_message(frame, msg_code, payload, max_retries=2):
     """
     Safely send a message to the Frame with retries.
@@ -24,6 +63,31 @@ async def safe_send_message(frame, msg_code, payload, max_retries=2):
                 await asyncio.sleep(0.5)  # Wait before retry
     return False
 
+async def send_uninterrupted(frame, msg_code, payload, max_retries=2):
+    """
+    safe_send_message() that always finishes a message once it has started sending.
+
+    Cancelling the caller mid-message would leave the packets sent so far in the Frameside
+    data accumulator, where they'd corrupt the next message with the same msg_code; instead
+    the cancellation takes effect once the whole message is sent.
+
+    Args:
+        frame: The FrameMsg instance
+        msg_code: The message code to send
+        payload: The message payload
+        max_retries: Maximum number of retry attempts (default: 2)
+
+    Returns:
+        bool: True if message was sent successfully, False otherwise
+    """
+    send = asyncio.ensure_future(safe_send_message(frame, msg_code, payload, max_retries))
+    try:
+        return await asyncio.shield(send)
+    except asyncio.CancelledError:
+        # asyncio.wait() doesn't cancel the send even if this task is cancelled again
+        await asyncio.wait({send})
+        raise
+
 async def safe_send_text(frame, text, max_retries=2):
     """
     Safely send a text message to the Frame with retries.
@@ -36,4 +100,61 @@ async def safe_send_text(frame, text, max_retries=2):
     Returns:
         bool: True if message was sent successfully, False otherwise
     """
-    return await safe_send_message(frame, 0x0a, TxPlainText(text).pack(), max_retries) 
\ No newline at end of file
+    return await safe_send_message(frame, 0x0a, TxPlainText(text).pack(), max_retries)
+
+def pack_batches(messages, max_payload):
+    """
+    Group messages into as few batches as possible, each fitting in a single write.
+
+    Args:
+        messages: Iterable of (msg_code, packed payload) pairs
+        max_payload: Maximum number of payload bytes per write (e.g. frame.max_data_payload() - 3)
+
+    Returns:
+        list: Groups of (msg_code, payload) pairs; a message too large to share a write
+              with anything else ends up in a group of its own
+    """
+    groups = []
+    current = []
+    current_size = 0
+
+    for msg_code, payload in messages:
+        size = TxBatch.item_size(payload)
+        if current and current_size + size > max_payload:
+            groups.append(current)
+            current = []
+            current_size = 0
+        current.append((msg_code, payload))
+        current_size += size
+
+    if current:
+        groups.append(current)
+
+    return groups
+
+async def safe_send_batch(frame, messages, max_retries=2):
+    """
+    Safely send several messages to the Frame, packing them into as few MTU-sized
+    TxBatch writes as possible so the Frameside app handles them in one loop iteration.
+
+    Args:
+        frame: The FrameMsg instance
+        messages: List of (msg_code, packed payload) pairs, sent in order
+        max_retries: Maximum number of retry attempts per write (default: 2)
+
+    Returns:
+        bool: True if every message was sent successfully, False otherwise
+    """
+    max_payload = frame.max_data_payload() - MESSAGE_HEADER_SIZE
+    success = True
+
+    for group in pack_batches(messages, max_payload):
+        if len(group) == 1:
+            # nothing to share the write with, so skip the batch framing
+            msg_code, payload = group[0]
+            sent = await safe_send_message(frame, msg_code, payload, max_retries)
+        else:
+            sent = await safe_send_message(frame, BATCH_CHANNEL, TxBatch(group).pack(), max_retries)
+        success = success and sent
+
+    return success
@@ -0,0 +1,252 @@
+import asyncio
+import bisect
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+# Seconds an answer should take; routing and hedging aim to meet this
+LATENCY_SLO = 4.0
+
+# Upper bounds (seconds) of the buckets latency histograms are reported in
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0, float('inf'))
+
+# Samples a model needs before its observed latency replaces its prior
+MIN_SAMPLES = 5
+
+# Words that suggest a question needs reasoning rather than a quick fact
+REASONING_WORDS = {
+    'analyse', 'analyze', 'calculate', 'compare', 'cons', 'debug', 'difference', 'explain',
+    'plan', 'pros', 'prove', 'recommend', 'step', 'steps', 'summarise', 'summarize',
+    'translate', 'why', 'write',
+}
+
+# Complexity score (0-1) at and above which a question goes to the strong model
+COMPLEXITY_THRESHOLD = 0.4
+
+Invoke = Callable[[dict], Awaitable[Any]]
+
+def query_complexity(text: str, history_length: int = 0) -> float:
+    """
+    Score how much a question needs the strong model, from 0 (a quick fact) to 1.
+
+    Long questions, reasoning words ("why", "explain", "compare", ...) and long
+    conversations (follow-ups lean on context) all push the score up.
+
+    Args:
+        text: The question
+        history_length: Messages already in the conversation
+    """
+    words = re.findall(r"[\w']+", text.lower())
+    score = min(len(words) / 40, 1.0) * 0.5
+    if REASONING_WORDS.intersection(words):
+        score += 0.4
+    if history_length > 6:
+        score += 0.1
+    return min(score, 1.0)
+
+class LatencyHistogram:
+    """
+    Rolling window of a model's recent latencies.
+
+    Requests cancelled before they answered (hedged losers) are kept apart as censored
+    samples: their elapsed time is only a lower bound, and counting it as a latency
+    would make the model look faster than it is.
+    """
+
+    def __init__(self, window: int = 100):
+        """
+        Args:
+            window: Number of most recent samples kept
+        """
+        self.samples = deque(maxlen=window)
+        self.censored = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def add_censored(self, seconds: float) -> None:
+        """Record a request that was cancelled after this many seconds without answering."""
+        self.censored.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """
+        The q quantile (0-1) of the window, or None with fewer than MIN_SAMPLES samples.
+        """
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def counts(self) -> list[int]:
+        """Number of samples in each of LATENCY_BUCKETS."""
+        counts = [0] * len(LATENCY_BUCKETS)
+        for seconds in self.samples:
+            counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        return counts
+
+@dataclass
+class ModelEndpoint:
+    """
+    A model the router can send requests to.
+
+    Attributes:
+        name: Identifier used in stats, e.g. the model name
+        invoke: Async callable taking the chatbot graph state and returning its result
+        expected_latency: Prior guess at its latency (seconds) until enough are observed
+    """
+    name: str
+    invoke: Invoke
+    expected_latency: float
+
+class ModelRouter:
+    """
+    Routes each question to a fast or a strong model to meet a latency SLO, hedging
+    with the other model when the first is slow.
+
+    The question's features pick the preferred model, unless that model's typical
+    (median) observed latency already misses the SLO and the other is quicker. If the
+    chosen model hasn't answered by its hedge_quantile latency, the same request is
+    sent to the other model and whichever answers first is used, provided the other
+    typically answers within what is left of the SLO by then (and hedging is on).
+    A request that fails outright falls back to the other model.
+    """
+
+    def __init__(self, fast: ModelEndpoint, strong: ModelEndpoint, slo: float = LATENCY_SLO,
+                 hedge_quantile: float = 0.9, complexity_threshold: float = COMPLEXITY_THRESHOLD,
+                 window: int = 100, hedging: bool = True):
+        """
+        Args:
+            fast: Endpoint for simple questions
+            strong: Endpoint for questions that need reasoning
+            slo: Default target latency in seconds
+            hedge_quantile: Quantile of the primary's latency after which a request is hedged
+            complexity_threshold: query_complexity() score that selects the strong model
+            window: Latency samples kept per model
+            hedging: Whether to hedge slow requests; if not, only errors fall back
+        """
+        self.fast = fast
+        self.strong = strong
+        self.slo = slo
+        self.hedge_quantile = hedge_quantile
+        self.complexity_threshold = complexity_threshold
+        self.hedging = hedging
+        self.histograms = {fast.name: LatencyHistogram(window), strong.name: LatencyHistogram(window)}
+
+        self.requests = 0
+        self.hedged = 0
+        self.fallbacks = 0
+        self.wins = {fast.name: 0, strong.name: 0}
+
+    def expected_latency(self, endpoint: ModelEndpoint, q: float = 0.5) -> float:
+        """The endpoint's observed q quantile latency, or its prior."""
+        observed = self.histograms[endpoint.name].percentile(q)
+        return endpoint.expected_latency if observed is None else observed
+
+    def route(self, text: str, slo: float | None = None, history_length: int = 0) -> tuple[ModelEndpoint, ModelEndpoint]:
+        """
+        Choose the model to ask first.
+
+        Returns:
+            tuple: (primary, secondary) endpoints
+        """
+        slo = self.slo if slo is None else slo
+        if query_complexity(text, history_length) >= self.complexity_threshold:
+            primary, secondary = self.strong, self.fast
+        else:
+            primary, secondary = self.fast, self.strong
+
+        if self.expected_latency(primary) > slo and self.expected_latency(secondary) < self.expected_latency(primary):
+            primary, secondary = secondary, primary
+        return primary, secondary
+
+    def hedge_delay(self, primary: ModelEndpoint, secondary: ModelEndpoint, slo: float | None = None) -> float | None:
+        """
+        Seconds to wait for the primary before also asking the secondary.
+
+        That's when the primary is later than usual (its hedge_quantile latency); a hedge
+        any sooner would mostly duplicate requests the primary answers in time.
+
+        Returns:
+            float | None: The delay, or None not to hedge because the secondary typically
+                (at its median) wouldn't answer within what is left of the SLO by then
+        """
+        slo = self.slo if slo is None else slo
+        usual = self.expected_latency(primary, self.hedge_quantile)
+        if usual + self.expected_latency(secondary) > slo:
+            return None
+        return usual
+
+    async def _timed(self, endpoint: ModelEndpoint, state: dict) -> Any:
+        start = time.monotonic()
+        try:
+            result = await endpoint.invoke(state)
+        except asyncio.CancelledError:
+            # a hedged loser only shows it takes at least this long, so it's kept out of the percentiles
+            self.histograms[endpoint.name].add_censored(time.monotonic() - start)
+            raise
+        self.histograms[endpoint.name].add(time.monotonic() - start)
+        return result
+
+    async def ainvoke(self, state: dict, text: str, slo: float | None = None) -> tuple[Any, str]:
+        """
+        Run a chatbot graph request through the router.
+
+        Args:
+            state: The chatbot graph state to invoke with
+            text: The question, for routing on its features
+            slo: Target latency for this request (default: the router's)
+
+        Returns:
+            tuple: (graph result, name of the endpoint that answered)
+
+        Raises:
+            Exception: The secondary's error, if both models fail
+        """
+        self.requests += 1
+        primary, secondary = self.route(text, slo, history_length=len(state.get("messages", [])))
+        tasks = {asyncio.create_task(self._timed(primary, state)): primary}
+        try:
+            timeout = self.hedge_delay(primary, secondary, slo) if self.hedging else None
+            done, _ = await asyncio.wait(tasks, timeout=timeout)
+            if not done:
+                self.hedged += 1
+            elif next(iter(done)).exception() is not None:
+                self.fallbacks += 1
+                print(f"Error from {primary.name}, falling back to {secondary.name}: {next(iter(done)).exception()}")
+                tasks.clear()
+            else:
+                self.wins[primary.name] += 1
+                return next(iter(done)).result(), primary.name
+
+            tasks[asyncio.create_task(self._timed(secondary, state))] = secondary
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    endpoint = tasks.pop(task)
+                    if task.exception() is None:
+                        self.wins[endpoint.name] += 1
+                        return task.result(), endpoint.name
+                    error = task.exception()
+                    print(f"Error from {endpoint.name}: {error}")
+            raise error
+        finally:
+            # the losing request, or both if we were cancelled (e.g. superseded by a new question)
+            for task in tasks:
+                task.cancel()
+
+    def report(self) -> str:
+        """One line per model: answers won and its latency histogram."""
+        lines = [f"{self.requests} requests, {self.hedged} hedged, {self.fallbacks} fallbacks"]
+        for name, histogram in self.histograms.items():
+            buckets = ' '.join(f"<{bound:g}s:{count}" for bound, count in zip(LATENCY_BUCKETS, histogram.counts()) if count)
+            p50 = histogram.percentile(0.5)
+            p90 = histogram.percentile(0.9)
+            percentiles = f"p50 {p50:.2f}s p90 {p90:.2f}s" if p50 is not None else "too few samples"
+            censored = f", {len(histogram.censored)} cancelled" if histogram.censored else ""
+            lines.append(f"{name}: {self.wins[name]} answers, {percentiles}, {buckets or 'no samples'}{censored}")
+        return '\n'.join(lines)
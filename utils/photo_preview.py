@@ -0,0 +1,154 @@
+import asyncio
+import io
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+from frame_msg import RxPhoto
+from PIL import Image, ImageFile
+
+# JPEG end-of-image marker; appending it lets a truncated baseline JPEG decode cleanly,
+# with the rows that haven't arrived yet filled in mid-grey by the decoder
+JPEG_EOI = b'\xff\xd9'
+
+@dataclass
+class PhotoPreview:
+    """
+    A low-resolution decode of the part of a photo received so far.
+
+    Attributes:
+        image: Downscaled image; rows not yet received are mid-grey
+        coverage: Fraction of the image rows (top down) that have been decoded
+        bytes_received: Bytes of the JPEG received when the preview was made
+        elapsed: Seconds since the first chunk of the photo arrived
+    """
+    image: Image.Image
+    coverage: float
+    bytes_received: int
+    elapsed: float
+
+def decode_partial_jpeg(jpeg_prefix: bytes, preview_size: int = 160, upright: bool = True) -> tuple[Image.Image, float]:
+    """
+    Decode the first part of a baseline JPEG into a small preview.
+
+    The decoder is asked to scale down while decoding (Pillow draft mode), so this is
+    cheap enough to run on the event loop a few times a second.
+
+    Args:
+        jpeg_prefix: The bytes of the JPEG received so far (including the header)
+        preview_size: Longest side of the preview in pixels (approximate: draft scales by powers of two)
+        upright: Whether to rotate the preview to correct for the sensor orientation
+
+    Returns:
+        tuple: (preview image, fraction of rows decoded)
+    """
+    image = Image.open(io.BytesIO(jpeg_prefix + JPEG_EOI))
+    image.draft('RGB', (preview_size, preview_size))
+    image.load()
+
+    # rows that haven't arrived are filled with exactly 128 in every channel
+    rows = np.asarray(image).reshape(image.size[1], -1)
+    decoded = rows.shape[0]
+    while decoded > 0 and (rows[decoded - 1] == 128).all():
+        decoded -= 1
+    coverage = decoded / rows.shape[0]
+
+    if upright:
+        image = image.transpose(Image.ROTATE_90)
+    return image, coverage
+
+class ProgressiveRxPhoto(RxPhoto):
+    """
+    RxPhoto that also publishes low-resolution previews while a photo is still arriving.
+
+    Frame sends baseline JPEGs top to bottom, so a preview of the received prefix shows
+    the top of the scene early. Pillow's incremental ImageFile.Parser is fed the stream
+    until it has parsed the JPEG header (giving the full size before the pixel data
+    arrives); it can't decode JPEG scan data incrementally itself, so previews decode
+    the received prefix in draft mode instead.
+
+    The complete photo is still put on the queue returned by attach(); previews are put
+    on preview_queue, which only ever holds the newest preview.
+    """
+
+    def __init__(self, preview_size: int = 160, preview_interval: float = 0.25,
+                 clock: Callable[[], float] = time.monotonic, **kwargs):
+        """
+        Args:
+            preview_size: Longest side of each preview in pixels
+            preview_interval: Minimum seconds between previews
+            clock: Time source, replaceable to replay recorded streams
+            **kwargs: Passed on to RxPhoto
+        """
+        super().__init__(**kwargs)
+        self.preview_size = preview_size
+        self.preview_interval = preview_interval
+        self.clock = clock
+        self.preview_queue: asyncio.Queue | None = None
+
+        # size of the photo being received, known once its header has been parsed
+        self.photo_size: tuple[int, int] | None = None
+        self._parser = None
+        self._first_chunk_time = None
+        self._last_preview_time = None
+
+    async def attach(self, frame) -> asyncio.Queue:
+        self.preview_queue = asyncio.Queue(maxsize=1)
+        self._reset_preview()
+        return await super().attach(frame)
+
+    def detach(self, frame) -> None:
+        super().detach(frame)
+        self.preview_queue = None
+        self._reset_preview()
+
+    def partial_bytes(self) -> bytes:
+        """The JPEG bytes of the photo being received so far."""
+        return bytes(self._image_data)
+
+    def handle_data(self, data: bytes) -> None:
+        now = self.clock()
+        if self._first_chunk_time is None:
+            self._first_chunk_time = now
+            self._parser = ImageFile.Parser()
+            # raw photos arrive without a header; the stored one is already in _image_data
+            if self._image_data:
+                self._parser.feed(bytes(self._image_data))
+
+        if self.photo_size is None:
+            # only the header is needed from the parser, so stop feeding it once it has the size
+            self._parser.feed(data[1:])
+            if self._parser.image is not None:
+                self.photo_size = self._parser.image.size
+
+        super().handle_data(data)
+
+        if data[0] == self.final_chunk_flag:
+            self._reset_preview()
+        elif self.photo_size is not None and self.preview_queue is not None and (
+                self._last_preview_time is None or now - self._last_preview_time >= self.preview_interval):
+            self._last_preview_time = now
+            self._publish_preview(now)
+
+    def _publish_preview(self, now: float) -> None:
+        jpeg_prefix = self.partial_bytes()
+        try:
+            image, coverage = decode_partial_jpeg(jpeg_prefix, self.preview_size, self.upright)
+        except Exception:
+            return
+        if coverage == 0:
+            # not enough scan data for a single row yet
+            return
+        preview = PhotoPreview(image=image, coverage=coverage, bytes_received=len(jpeg_prefix),
+                               elapsed=now - self._first_chunk_time)
+        # keep only the newest preview for slow consumers
+        if self.preview_queue.full():
+            self.preview_queue.get_nowait()
+        self.preview_queue.put_nowait(preview)
+
+    def _reset_preview(self) -> None:
+        self.photo_size = None
+        self._parser = None
+        self._first_chunk_time = None
+        self._last_preview_time = None
@@ -0,0 +1,201 @@
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+@dataclass
+class Interaction:
+    """
+    One question/answer round trip as it moves through the pipeline stages.
+
+    Attributes:
+        id: Sequence number, increasing with every submitted interaction
+        capture_start: Ring buffer position where the recording began (continuous capture only)
+        photo: Pending PhotoCapture fired when the recording started (vision mode)
+        audio_format: The AudioFormat Frame recorded audio_samples in (None for the default)
+        audio_samples: Raw PCM of the recording, filled in by the capture stage
+        wav_file_path: Where the recording was saved, for the transcription backend
+        transcript: The transcribed question
+        response: The answer to display
+        cancelled: Set when the interaction has been cancelled or superseded
+        timings: Seconds spent in each stage, keyed by stage name
+    """
+    id: int
+    capture_start: int | None = None
+    photo: Any = None
+    audio_format: Any = None
+    audio_samples: bytes | None = None
+    wav_file_path: str | None = None
+    transcript: str | None = None
+    response: str | None = None
+    cancelled: bool = False
+    created: float = field(default_factory=time.monotonic)
+    timings: dict[str, float] = field(default_factory=dict)
+
+Stage = Callable[[Interaction], Awaitable[None]]
+
+class InteractionScheduler:
+    """
+    Runs interactions through a chain of concurrent stages connected by bounded queues,
+    e.g. capture -> transcribe -> complete -> display.
+
+    Each stage works on one interaction at a time, so a new recording can be captured
+    and transcribed while the previous answer is still being paged on the display.
+    The final stage is treated as the display: when a newer interaction reaches it
+    (or supersede() is called) the answer currently on screen is cancelled.
+    """
+
+    def __init__(self, stages: list[tuple[str, Stage]], queue_size: int = 1,
+                 on_error: Callable[[Interaction, str, Exception], Awaitable[None]] | None = None):
+        """
+        Args:
+            stages: (name, async handler) pairs in pipeline order; handlers update the interaction
+            queue_size: Interactions allowed to wait in front of each stage
+            on_error: Optional async callback(interaction, stage name, exception) for failed stages
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_error = on_error
+
+        self._ids = itertools.count(1)
+        self._queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+        self._workers: list[asyncio.Task] = []
+        self._current: list[Interaction | None] = [None] * len(stages)
+        self._current_tasks: list[asyncio.Task | None] = [None] * len(stages)
+
+        # the interaction most recently shown on the display, e.g. to repeat it
+        self.last_displayed: Interaction | None = None
+
+        # statistics
+        self.completed = 0
+        self.dropped = 0
+        self.superseded = 0
+        self._started = time.monotonic()
+
+    def start(self) -> None:
+        """Start one worker task per stage."""
+        self._started = time.monotonic()
+        for index in range(len(self.stages)):
+            self._workers.append(asyncio.create_task(self._run_stage(index)))
+
+    async def stop(self) -> None:
+        """Cancel all workers and any interaction in flight."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def submit(self, stage: str | None = None, **fields) -> Interaction:
+        """
+        Queue a new interaction without waiting.
+
+        If the stage's queue is full, the oldest waiting interaction is dropped
+        so the newest request always gets through.
+
+        Args:
+            stage: Name of the stage to enter at, e.g. "display" to show a known answer;
+                defaults to the first stage
+            **fields: Initial Interaction fields, e.g. capture_start
+
+        Returns:
+            Interaction: The queued interaction
+        """
+        index = 0 if stage is None else [name for name, _ in self.stages].index(stage)
+        interaction = Interaction(id=next(self._ids), **fields)
+        self._put_nowait(index, interaction)
+        return interaction
+
+    def supersede(self) -> bool:
+        """
+        Cancel the interaction that is currently in the display (final) stage.
+
+        Returns:
+            bool: True if something was on screen and has been cancelled
+        """
+        return self._cancel_stage(len(self.stages) - 1)
+
+    def cancel_all(self) -> None:
+        """Cancel every queued and in-flight interaction."""
+        for index, queue in enumerate(self._queues):
+            while not queue.empty():
+                queue.get_nowait().cancelled = True
+            self._cancel_stage(index)
+
+    @property
+    def busy(self) -> bool:
+        """True while any stage is working on, or has queued, an interaction."""
+        return any(self._current) or any(not queue.empty() for queue in self._queues)
+
+    @property
+    def interactions_per_minute(self) -> float:
+        """Answered interactions (fully shown or superseded on screen) per minute since start()."""
+        elapsed = time.monotonic() - self._started
+        return self.completed * 60.0 / elapsed if elapsed > 0 else 0.0
+
+    def _cancel_stage(self, index: int) -> bool:
+        interaction, task = self._current[index], self._current_tasks[index]
+        if interaction is None or task is None or task.done():
+            return False
+        interaction.cancelled = True
+        # handlers shield work that mustn't be cut short, e.g. the display finishes sending
+        # the page in flight, so the cancellation may take effect a little later
+        task.cancel()
+        if index == len(self.stages) - 1:
+            self.superseded += 1
+        return True
+
+    def _put_nowait(self, index: int, interaction: Interaction) -> None:
+        queue = self._queues[index]
+        if queue.full():
+            oldest = queue.get_nowait()
+            oldest.cancelled = True
+            self.dropped += 1
+            print(f"Dropping interaction {oldest.id} waiting for {self.stages[index][0]}")
+        queue.put_nowait(interaction)
+
+    async def _run_stage(self, index: int) -> None:
+        name, handler = self.stages[index]
+        is_display = index == len(self.stages) - 1
+
+        while True:
+            interaction = await self._queues[index].get()
+            if interaction.cancelled:
+                continue
+
+            self._current[index] = interaction
+            if is_display:
+                self.last_displayed = interaction
+            self._current_tasks[index] = asyncio.create_task(handler(interaction))
+            start = time.monotonic()
+            try:
+                await self._current_tasks[index]
+            except asyncio.CancelledError:
+                # a cancelled handler is expected (superseded); a cancelled worker is shutdown
+                if asyncio.current_task().cancelling():
+                    self._current_tasks[index].cancel()
+                    raise
+                if is_display:
+                    # a superseded answer was still shown, so it counts towards throughput
+                    self.completed += 1
+                continue
+            except Exception as e:
+                print(f"Error in {name} stage for interaction {interaction.id}: {e}")
+                if self.on_error is not None:
+                    await self.on_error(interaction, name, e)
+                continue
+            finally:
+                interaction.timings[name] = time.monotonic() - start
+                self._current[index] = None
+                self._current_tasks[index] = None
+
+            if interaction.cancelled:
+                continue
+            if is_display:
+                self.completed += 1
+            else:
+                next_index = index + 1
+                if next_index == len(self.stages) - 1:
+                    # a fresh answer replaces whatever is still being paged on screen
+                    self.supersede()
+                self._put_nowait(next_index, interaction)
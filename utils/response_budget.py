@@ -0,0 +1,124 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from utils.text import format_text_for_frame
+
+# Rough length of an English token for OpenAI's tokenizers, in characters
+CHARS_PER_TOKEN = 4.0
+
+# Typical answer text used to measure how many characters a page really holds once words
+# are wrapped to the Frame's character widths (short lines waste the end of the line)
+REFERENCE_TEXT = (
+    "The quickest way to get there is to take the number twelve bus from the stop across "
+    "the road and change at the station. It runs every ten minutes until midnight, and the "
+    "whole trip takes about half an hour. If you would rather walk, follow the river path "
+    "north; it is flat, well lit and only a little longer than the bus once you count the wait."
+)
+
+# Sentence ends to cut a truncated answer back to
+_SENTENCE_END = re.compile(r'[.!?](?=\s|$)')
+
+@lru_cache(maxsize=None)
+def page_capacity(max_line_length: int = 20, max_lines: int = 6) -> int:
+    """
+    Characters of typical text that fit on one display page.
+
+    Measured by wrapping REFERENCE_TEXT with format_text_for_frame, so it reflects the
+    font's character widths and the space lost to word wrapping.
+    """
+    text = REFERENCE_TEXT
+    while True:
+        blocks = format_text_for_frame(text, max_line_length=max_line_length, max_lines=max_lines, ellipsis=False)
+        if len(blocks) > 1:
+            break
+        text = text + ' ' + REFERENCE_TEXT
+    # count the page's characters as they were in the source text, i.e. with newlines as spaces
+    return len(blocks[0]) + 1
+
+@dataclass
+class ResponseBudget:
+    """
+    How long an answer may be to fit a number of display pages.
+
+    Attributes:
+        pages: Display pages the answer should fit on
+        characters: Characters that fit on those pages
+        max_tokens: Token limit for the model (the hard cap)
+        words: Word count to ask for in the instructions (the soft target)
+    """
+    pages: int
+    characters: int
+    max_tokens: int
+    words: int
+
+    def instruction(self) -> str:
+        """System instruction asking the model to fit its answer in the budget."""
+        page_text = "one page" if self.pages == 1 else f"{self.pages} pages"
+        return (f"Your answer is shown on a small heads-up display that holds {page_text} of text. "
+                f"Answer in at most {self.words} words, in plain sentences without lists or markdown. "
+                f"Put the most important information first.")
+
+def response_budget(pages: int, max_line_length: int = 20, max_lines: int = 6, headroom: float = 1.25) -> ResponseBudget:
+    """
+    Compute the response budget for a number of display pages.
+
+    Args:
+        pages: Display pages the answer should fit on
+        max_line_length: Display line width, as passed to format_text_for_frame
+        max_lines: Lines per page, as passed to format_text_for_frame
+        headroom: Factor the token limit allows above the display capacity, so an answer
+            that slightly overruns the word target finishes its sentence instead of being cut
+
+    Returns:
+        ResponseBudget: Character, token and word limits
+    """
+    characters = pages * page_capacity(max_line_length, max_lines)
+    words = len(REFERENCE_TEXT.split()) * characters // (len(REFERENCE_TEXT) + 1)
+    max_tokens = max(16, round(characters / CHARS_PER_TOKEN * headroom))
+    return ResponseBudget(pages=pages, characters=characters, max_tokens=max_tokens, words=words)
+
+def trim_to_sentence(text: str) -> str:
+    """Cut a truncated answer back to its last complete sentence, or add an ellipsis if it has none."""
+    ends = list(_SENTENCE_END.finditer(text))
+    if ends:
+        return text[:ends[-1].end()]
+    return text.rstrip() + '...'
+
+@dataclass
+class ResponseStats:
+    """
+    Running record of answer lengths against their budgets.
+
+    Attributes:
+        responses: Number of answers recorded
+        truncated: Answers the model stopped at max_tokens
+        over_budget: Answers that needed more display pages than budgeted
+        pages: Histogram of display pages used per answer
+    """
+    responses: int = 0
+    truncated: int = 0
+    over_budget: int = 0
+    pages: dict[int, int] = field(default_factory=dict)
+
+    def record(self, budget: ResponseBudget, pages: int, truncated: bool) -> None:
+        """
+        Record one answer.
+
+        Args:
+            budget: The budget the answer was requested with
+            pages: Display pages the answer took
+            truncated: Whether the model hit max_tokens
+        """
+        self.responses += 1
+        self.truncated += truncated
+        self.over_budget += pages > budget.pages
+        self.pages[pages] = self.pages.get(pages, 0) + 1
+
+    def report(self) -> str:
+        """One line summary, e.g. for printing at exit."""
+        if self.responses == 0:
+            return "No responses"
+        pages = ', '.join(f"{count}x{size}p" for size, count in sorted(self.pages.items()))
+        return (f"{self.responses} responses: {self.truncated} truncated ({self.truncated / self.responses:.0%}), "
+                f"{self.over_budget} over budget; pages used {pages}")
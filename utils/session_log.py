@@ -0,0 +1,379 @@
+import asyncio
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+# Record kinds: what crossed the link, and in which direction
+OUTBOUND = 0  # send_message() from the host: code and the whole payload, before it's split into packets
+DATA = 1      # a data packet from Frame: code is the flag byte, payload the rest of the packet
+PRINT = 2     # a print() line from the Frameside app: code 0, payload the UTF-8 text
+
+KIND_NAMES = {OUTBOUND: 'out', DATA: 'in', PRINT: 'print'}
+
+# Channel names for the summary, by direction (the codes used by tap_audio.py and the stdlua libraries)
+CHANNEL_NAMES = {
+    OUTBOUND: {0x0a: 'text', 0x0b: 'batch', 0x0d: 'capture', 0x0e: 'compact text', 0x10: 'tap subscription',
+               0x12: 'battery request', 0x20: 'sprite', 0x30: 'audio control', 0x31: 'audio format'},
+    DATA: {0x05: 'audio', 0x06: 'audio (final)', 0x07: 'photo', 0x08: 'photo (final)',
+           0x09: 'tap', 0x0c: 'battery'},
+    PRINT: {0: 'print'},
+}
+
+# Log file header: magic, format version, header size, wall clock time the session started
+_HEADER = struct.Struct('<4sHHd')
+_MAGIC = b'FRSL'
+_VERSION = 1
+
+# Record header in the log: seconds since the session started (monotonic), kind, code, payload length
+_RECORD = struct.Struct('<dBBH')
+
+# The index (<log>.idx) repeats each record header with its offset in the log, so a session
+# can be summarized and searched by time without touching the payloads
+_INDEX = struct.Struct('<dQBBH')
+INDEX_DTYPE = np.dtype([('time', '<f8'), ('offset', '<u8'), ('kind', 'u1'), ('code', 'u1'), ('length', '<u2')])
+
+def index_path(path: str) -> str:
+    """Path of the index file that accompanies a session log."""
+    return path + '.idx'
+
+class SessionRecorder:
+    """
+    Records everything that crosses the Bluetooth link to an append-only binary log.
+
+    Each record is a 12 byte header and the payload, written to a buffered file with its
+    index entry alongside; writes are flushed every flush_interval seconds, so the cost
+    per packet is a couple of memory copies and a session survives a crash minus the
+    last interval.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        """
+        Args:
+            path: Log file to write; an existing log is replaced
+            flush_interval: Seconds between flushes of the log and index to disk
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+
+        self._start = time.monotonic()
+        self._last_flush = self._start
+        self._log = open(path, 'wb')
+        self._index = open(index_path(path), 'wb')
+        self._log.write(_HEADER.pack(_MAGIC, _VERSION, _HEADER.size, time.time()))
+        self._offset = _HEADER.size
+        self._originals = None
+
+    def record(self, kind: int, code: int, payload) -> None:
+        """
+        Append a record timestamped now.
+
+        Args:
+            kind: OUTBOUND, DATA or PRINT
+            code: msg_code or flag byte (0 for PRINT)
+            payload: bytes-like payload (at most 65535 bytes)
+        """
+        if self._log is None:
+            return
+        now = time.monotonic()
+        timestamp = now - self._start
+        length = len(payload)
+        self._log.write(_RECORD.pack(timestamp, kind, code, length))
+        self._log.write(payload)
+        self._index.write(_INDEX.pack(timestamp, self._offset, kind, code, length))
+        self._offset += _RECORD.size + length
+        self.records += 1
+
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+
+    def flush(self) -> None:
+        """Write buffered records to disk, log first so the index never points past it."""
+        if self._log is not None:
+            self._log.flush()
+            self._index.flush()
+
+    def attach(self, frame) -> None:
+        """
+        Start recording a connected FrameMsg's traffic.
+
+        Wraps send_message() and the data and print response handlers, so call it after
+        connect() and attach_print_response_handler().
+        """
+        ble = frame.ble
+        send_message = frame.send_message
+        data_handler = ble._user_data_response_handler
+        print_handler = ble._user_print_response_handler
+        self._originals = (send_message, data_handler, print_handler)
+
+        async def recorded_send_message(msg_code: int, payload: bytes, show_me: bool = False) -> None:
+            self.record(OUTBOUND, msg_code, payload)
+            await send_message(msg_code, payload, show_me)
+
+        async def recorded_data_response(data) -> None:
+            if data:
+                self.record(DATA, data[0], data[1:])
+            if data_handler is not None:
+                if asyncio.iscoroutinefunction(data_handler):
+                    await data_handler(data)
+                else:
+                    data_handler(data)
+
+        async def recorded_print_response(text: str) -> None:
+            self.record(PRINT, 0, text.encode())
+            if print_handler is not None:
+                if asyncio.iscoroutinefunction(print_handler):
+                    await print_handler(text)
+                else:
+                    print_handler(text)
+
+        frame.send_message = recorded_send_message
+        ble._user_data_response_handler = recorded_data_response
+        ble._user_print_response_handler = recorded_print_response
+
+    def detach(self, frame) -> None:
+        """Stop recording and restore the FrameMsg's own send_message() and handlers."""
+        if self._originals is None:
+            return
+        _, data_handler, print_handler = self._originals
+        # send_message was the class method, so removing the wrapper restores it
+        frame.__dict__.pop('send_message', None)
+        frame.ble._user_data_response_handler = data_handler
+        frame.ble._user_print_response_handler = print_handler
+        self._originals = None
+
+    def close(self) -> None:
+        """Flush and close the log; further records are ignored."""
+        if self._log is None:
+            return
+        self.flush()
+        self._log.close()
+        self._index.close()
+        self._log = None
+        self._index = None
+
+@dataclass
+class SessionRecord:
+    """
+    One record from a session log.
+
+    Attributes:
+        time: Seconds since the session started
+        kind: OUTBOUND, DATA or PRINT
+        code: msg_code or flag byte (0 for PRINT)
+        payload: The payload, a view into the memory-mapped log
+    """
+    time: float
+    kind: int
+    code: int
+    payload: memoryview
+
+    @property
+    def packet(self) -> bytes:
+        """An inbound data packet as FrameMsg received it, flag byte first."""
+        return bytes((self.code,)) + self.payload
+
+class SessionLog:
+    """
+    Read-only, memory-mapped view of a session log for random access by record number or time.
+
+    The index is loaded as a NumPy array. If the recorder didn't close cleanly, records
+    the index is missing are recovered by scanning the log, and a torn last record is dropped.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Log file written by SessionRecorder
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path} is not a session log")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size, self.start_time = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {_VERSION} session log")
+        self.index = self._load_index(header_size, size)
+
+    def _load_index(self, header_size: int, size: int) -> np.ndarray:
+        try:
+            with open(index_path(self.path), 'rb') as f:
+                raw = f.read()
+            index = np.frombuffer(raw[:len(raw) - len(raw) % INDEX_DTYPE.itemsize], dtype=INDEX_DTYPE)
+        except FileNotFoundError:
+            index = np.empty(0, dtype=INDEX_DTYPE)
+
+        # keep only entries whose record is complete in the log
+        ends = index['offset'] + _RECORD.size + index['length']
+        index = index[:int(np.searchsorted(ends > size, True))]
+
+        offset = int(ends[len(index) - 1]) if len(index) else header_size
+        recovered = []
+        while offset + _RECORD.size <= size:
+            timestamp, kind, code, length = _RECORD.unpack_from(self._map, offset)
+            if offset + _RECORD.size + length > size:
+                break
+            recovered.append((timestamp, offset, kind, code, length))
+            offset += _RECORD.size + length
+        if recovered:
+            index = np.concatenate([index, np.array(recovered, dtype=INDEX_DTYPE)])
+        return index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, i: int) -> SessionRecord:
+        timestamp, offset, kind, code, length = self.index[i].tolist()
+        start = offset + _RECORD.size
+        return SessionRecord(timestamp, kind, code, memoryview(self._map)[start:start + length])
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the session start to the last record."""
+        return float(self.index['time'][-1]) if len(self.index) else 0.0
+
+    def records(self, kinds: tuple[int, ...] | None = None, start: float = 0.0, end: float | None = None):
+        """
+        Iterate over records in time order.
+
+        Args:
+            kinds: Only these record kinds (default: all)
+            start: Skip records before this many seconds into the session
+            end: Stop at this many seconds into the session (default: the end)
+
+        Yields:
+            SessionRecord: Each record, its payload a view into the log
+        """
+        times = self.index['time']
+        first = int(np.searchsorted(times, start, side='left'))
+        last = len(times) if end is None else int(np.searchsorted(times, end, side='right'))
+        selected = np.arange(first, last)
+        if kinds is not None:
+            selected = selected[np.isin(self.index['kind'][first:last], kinds)]
+        for i in selected:
+            yield self[int(i)]
+
+    def close(self) -> None:
+        """Release the memory map; payload views must not be used afterwards."""
+        self.index = None
+        try:
+            self._map.close()
+        except BufferError:
+            # a payload view is still alive; the map is released when it goes
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@dataclass
+class ChannelSummary:
+    """
+    Traffic on one channel over a session.
+
+    Attributes:
+        kind: OUTBOUND, DATA or PRINT
+        code: msg_code or flag byte
+        name: Channel name from CHANNEL_NAMES, or the code in hex
+        count: Number of records
+        bytes: Total payload bytes
+        bytes_per_second: Payload bytes over the channel's active span (first to last record)
+        mean_gap: Mean seconds between consecutive records
+        max_gap: Longest silence between consecutive records, in seconds
+        max_gap_at: Seconds into the session the longest silence started
+    """
+    kind: int
+    code: int
+    name: str
+    count: int
+    bytes: int
+    bytes_per_second: float
+    mean_gap: float
+    max_gap: float
+    max_gap_at: float
+
+def summarize(log: SessionLog) -> list[ChannelSummary]:
+    """
+    Per-channel bandwidth and gaps, computed from the index alone.
+
+    Returns:
+        list: One ChannelSummary per (kind, code), outbound channels first
+    """
+    index = log.index
+    keys = index['kind'].astype(np.uint16) << 8 | index['code']
+    summaries = []
+    for key in np.unique(keys):
+        channel = index[keys == key]
+        kind, code = int(key) >> 8, int(key) & 0xFF
+        times = channel['time']
+        total = int(channel['length'].sum())
+        span = float(times[-1] - times[0])
+        gaps = np.diff(times)
+        longest = int(gaps.argmax()) if len(gaps) else 0
+        summaries.append(ChannelSummary(
+            kind=kind,
+            code=code,
+            name=CHANNEL_NAMES.get(kind, {}).get(code, f"0x{code:02x}"),
+            count=len(channel),
+            bytes=total,
+            bytes_per_second=total / span if span > 0 else 0.0,
+            mean_gap=float(gaps.mean()) if len(gaps) else 0.0,
+            max_gap=float(gaps[longest]) if len(gaps) else 0.0,
+            max_gap_at=float(times[longest]),
+        ))
+    return summaries
+
+async def replay(log: SessionLog, frame, speed: float = 1.0, start: float = 0.0, end: float | None = None) -> int:
+    """
+    Feed a session's inbound packets back through a FrameMsg's handlers.
+
+    The FrameMsg doesn't need to be connected: receivers attached to it (RxAudio, RxGesture,
+    RxPhoto, ...) see the recorded packets as if they had just arrived, with the recorded
+    spacing divided by speed. Outbound records are skipped; they're what the host sent.
+
+    Args:
+        log: The session to replay
+        frame: FrameMsg whose data response handlers (and print handler, if attached) receive the packets
+        speed: Playback speed; 1.0 is real time, 0 replays as fast as possible
+        start: Seconds into the session to start from
+        end: Seconds into the session to stop at (default: the end)
+
+    Returns:
+        int: Number of packets replayed
+    """
+    loop = asyncio.get_running_loop()
+    began = loop.time()
+    count = 0
+    for record in log.records((DATA, PRINT), start=start, end=end):
+        if speed > 0:
+            delay = began + (record.time - start) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            # still yield so receivers' queue tasks run between packets
+            await asyncio.sleep(0)
+
+        if record.kind == DATA:
+            await frame._handle_data_response(record.packet)
+        else:
+            handler = frame.ble._user_print_response_handler
+            if handler is not None:
+                text = bytes(record.payload).decode()
+                if asyncio.iscoroutinefunction(handler):
+                    await handler(text)
+                else:
+                    handler(text)
+        count += 1
+    return count
@@ -0,0 +1,97 @@
+from multiprocessing import shared_memory
+
+# Bytes at the start of the segment for the release counter and capacity; a whole cache
+# line, so the consumer's counter updates don't share one with the producer's data
+_HEADER_SIZE = 64
+
+class SharedRing:
+    """
+    Single-producer, single-consumer FIFO of byte blocks in a shared memory segment.
+
+    The producer reserves a contiguous block (wrapping to the start when it doesn't fit
+    before the end), fills it in place and tells the consumer where it is with a small
+    control message, e.g. over a pipe. The consumer reads the block in place and releases
+    it when done. Blocks are released in the order they were reserved, so a single release
+    counter in shared memory is all the two sides share, and no lock is needed.
+    """
+
+    def __init__(self, capacity: int = 0, name: str | None = None):
+        """
+        Args:
+            capacity: Bytes of payload space, when creating the ring
+            name: Name of an existing ring to attach to (from another process's ring.name)
+        """
+        create = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=_HEADER_SIZE + capacity if create else 0)
+        # [released, capacity]; counters only ever grow, positions are taken modulo capacity
+        self._header = self.shm.buf[:16].cast('Q')
+        if create:
+            self._header[0] = 0
+            self._header[1] = capacity
+        self.capacity = self._header[1]
+        self.data = self.shm.buf[_HEADER_SIZE:_HEADER_SIZE + self.capacity]
+        self._reserved = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def in_use(self) -> int:
+        """Bytes reserved by the producer and not yet released (producer side only)."""
+        return self._reserved - self._header[0]
+
+    def reserve(self, size: int) -> tuple[int, int] | None:
+        """
+        Reserve a contiguous block (producer side).
+
+        Args:
+            size: Bytes needed, at most capacity
+
+        Returns:
+            tuple | None: (offset into data, end counter to release it with), or None if
+                the consumer hasn't released enough space yet
+        """
+        if size > self.capacity:
+            raise ValueError(f"Block of {size} bytes is larger than the ring ({self.capacity} bytes)")
+        position = self._reserved % self.capacity
+        # a block that would straddle the end starts again at the beginning, skipping the tail
+        skip = self.capacity - position if position + size > self.capacity else 0
+        end = self._reserved + skip + size
+        if end - self._header[0] > self.capacity:
+            return None
+        self._reserved = end
+        return (0 if skip else position), end
+
+    def put(self, data) -> tuple[int, int, int] | None:
+        """
+        Copy data into a newly reserved block (producer side).
+
+        Returns:
+            tuple | None: (offset, size, end) to pass to the consumer, or None if there's no room
+        """
+        data = memoryview(data).cast('B')
+        block = self.reserve(len(data))
+        if block is None:
+            return None
+        offset, end = block
+        self.data[offset:offset + len(data)] = data
+        return offset, len(data), end
+
+    def view(self, offset: int, size: int) -> memoryview:
+        """The block at offset, in place (consumer side); don't keep it past release()."""
+        return self.data[offset:offset + size]
+
+    def release(self, end: int) -> None:
+        """Free every block up to and including the one with this end counter (consumer side)."""
+        self._header[0] = end
+
+    def close(self, unlink: bool = False) -> None:
+        """
+        Detach from the segment; the process that created it should also unlink it.
+        """
+        self.data.release()
+        self._header.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
@@ -0,0 +1,334 @@
+import hashlib
+import io
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from frame_msg import TxImageSpriteBlock, TxSprite
+from PIL import Image
+
+from utils.message import MESSAGE_HEADER_SIZE, safe_send_message
+
+# msg_code the Frameside image_sprite_block parser is conventionally registered under
+SPRITE_CHANNEL = 0x20
+
+# Largest image the Frame display can show
+DISPLAY_WIDTH = 640
+DISPLAY_HEIGHT = 400
+
+# width, height, compress, bpp, num_colors that TxSprite.pack() puts before the palette
+_SPRITE_HEADER_SIZE = 7
+
+# Bits per pixel TxSprite packs each palette size into
+_BITS_PER_PIXEL = {2: 1, 4: 2, 16: 4}
+
+# 4x4 Bayer matrix, normalised to thresholds in [-0.5, 0.5)
+_BAYER_4X4 = (np.array([
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5],
+], dtype=np.float32) + 0.5) / 16 - 0.5
+
+def pack_pixels(indices: np.ndarray, bpp: int) -> bytes:
+    """
+    Pack palette indices into a continuous big-endian bit stream, as TxSprite does.
+
+    Args:
+        indices: Palette index per pixel (any shape, row-major)
+        bpp: Bits per pixel: 1, 2 or 4
+
+    Returns:
+        bytes: The packed pixels, the first pixel in the most significant bits
+    """
+    flat = np.ascontiguousarray(indices, dtype=np.uint8).ravel()
+    if bpp == 1:
+        return np.packbits(flat & 0x01).tobytes()
+
+    pixels_per_byte = 8 // bpp
+    padding = -len(flat) % pixels_per_byte
+    if padding:
+        flat = np.concatenate([flat, np.zeros(padding, dtype=np.uint8)])
+    groups = flat.reshape(-1, pixels_per_byte) & ((1 << bpp) - 1)
+    shifts = np.arange(pixels_per_byte - 1, -1, -1, dtype=np.uint8) * bpp
+    return np.bitwise_or.reduce(groups << shifts, axis=1).astype(np.uint8).tobytes()
+
+class PackedTxSprite(TxSprite):
+    """
+    TxSprite whose pixel packing is vectorized with NumPy instead of looping per pixel.
+    The packed message is byte-for-byte the same.
+    """
+
+    @staticmethod
+    def _pack_1bit(data: bytes) -> bytes:
+        return pack_pixels(np.frombuffer(data, dtype=np.uint8), 1)
+
+    @staticmethod
+    def _pack_2bit(data: bytes) -> bytes:
+        return pack_pixels(np.frombuffer(data, dtype=np.uint8), 2)
+
+    @staticmethod
+    def _pack_4bit(data: bytes) -> bytes:
+        return pack_pixels(np.frombuffer(data, dtype=np.uint8), 4)
+
+def grey_palette(num_colors: int) -> np.ndarray:
+    """An even ramp from black to white, as a (num_colors, 3) uint8 array."""
+    levels = np.linspace(0, 255, num_colors).round().astype(np.uint8)
+    return np.repeat(levels[:, None], 3, axis=1)
+
+def adaptive_palette(pixels: np.ndarray, num_colors: int, samples: int = 4096, iterations: int = 8) -> np.ndarray:
+    """
+    A palette fitted to the image with k-means on a sample of its pixels, darkest colour first.
+
+    The centres start at evenly spaced luminance quantiles, which converges in a few
+    iterations. The darkest entry is set to black, since palette index 0 is drawn as
+    transparent.
+
+    Args:
+        pixels: (height, width, 3) float32 RGB values
+        num_colors: Palette size
+        samples: Pixels sampled for fitting
+        iterations: k-means iterations
+
+    Returns:
+        np.ndarray: (num_colors, 3) uint8 palette
+    """
+    flat = pixels.reshape(-1, 3)
+    if len(flat) > samples:
+        flat = flat[np.random.default_rng(0).choice(len(flat), samples, replace=False)]
+
+    luminance = flat @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    order = np.argsort(luminance)
+    centres = flat[order[np.linspace(0, len(flat) - 1, num_colors).astype(int)]].copy()
+    for _ in range(iterations):
+        labels = nearest_palette_indices(flat, centres)
+        counts = np.bincount(labels, minlength=num_colors)
+        sums = np.zeros_like(centres)
+        np.add.at(sums, labels, flat)
+        used = counts > 0
+        centres[used] = sums[used] / counts[used, None]
+
+    palette = centres.round().clip(0, 255).astype(np.uint8)
+    palette = palette[np.argsort(palette.astype(np.int32) @ np.array([299, 587, 114]))]
+    palette[0] = 0
+    return palette
+
+def nearest_palette_indices(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """
+    Map each RGB pixel to its closest palette entry (squared Euclidean distance).
+
+    Args:
+        pixels: (..., 3) float32 RGB values
+        palette: (num_colors, 3) RGB palette
+
+    Returns:
+        np.ndarray: uint8 palette indices with the shape of pixels minus the last axis
+    """
+    palette = palette.astype(np.float32)
+    flat = pixels.reshape(-1, 3)
+    # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, and |p|^2 doesn't change the argmin
+    distances = (palette * palette).sum(axis=1) - 2.0 * (flat @ palette.T)
+    return distances.argmin(axis=1).astype(np.uint8).reshape(pixels.shape[:-1])
+
+def ordered_dither(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """
+    Quantize with a tiled 4x4 Bayer threshold map, fully vectorized.
+
+    The threshold is scaled to the average spacing between palette colours, so it
+    nudges each pixel at most about halfway towards a neighbouring colour.
+    """
+    height, width = pixels.shape[:2]
+    spread = 255.0 / max(len(palette) - 1, 1)
+    thresholds = np.tile(_BAYER_4X4, ((height + 3) // 4, (width + 3) // 4))[:height, :width]
+    return nearest_palette_indices(pixels + thresholds[..., None] * spread, palette)
+
+def floyd_steinberg_dither(image: Image.Image, palette: np.ndarray) -> np.ndarray:
+    """
+    Quantize with Floyd-Steinberg error diffusion.
+
+    Error diffusion is sequential from pixel to pixel, so it can't be vectorized with
+    NumPy; this uses Pillow's C implementation against our palette instead.
+    """
+    palette_image = Image.new('P', (1, 1))
+    # pad the palette with copies of its first colour so no unused entry is ever chosen
+    padded = np.concatenate([palette, np.repeat(palette[:1], 256 - len(palette), axis=0)])
+    palette_image.putpalette(padded.tobytes())
+    quantized = image.quantize(palette=palette_image, dither=Image.Dither.FLOYDSTEINBERG)
+    indices = np.array(quantized, dtype=np.uint8)
+    indices[indices >= len(palette)] = 0
+    return indices
+
+@dataclass
+class SpriteConversion:
+    """
+    An image converted for the Frame display, ready to send.
+
+    Attributes:
+        sprite: The whole image as one sprite
+        line_height: Rows per strip, chosen so each strip fits in one Bluetooth packet
+        messages: Packed TxImageSpriteBlock header followed by one packed TxSprite per strip
+    """
+    sprite: PackedTxSprite
+    line_height: int
+    messages: list[bytes]
+
+    @property
+    def size(self) -> int:
+        """Total bytes sent for the image."""
+        return sum(len(message) for message in self.messages)
+
+def max_strip_width(bpp: int, num_colors: int, max_payload: int) -> int:
+    """
+    Widest image whose strips fit in max_payload bytes one row at a time.
+
+    Each strip repeats the sprite header and palette, so with 16 colours and a 240-byte
+    payload that's 370 pixels; 4 colours fit the full display width.
+    """
+    return max(0, (max_payload - _SPRITE_HEADER_SIZE - num_colors * 3) * 8 // bpp)
+
+def strip_line_height(width: int, bpp: int, num_colors: int, max_payload: int) -> int:
+    """
+    Rows per sprite strip so a packed strip fits in max_payload bytes.
+
+    Raises:
+        ValueError: If not even one row fits, i.e. width is over max_strip_width()
+    """
+    available_bits = (max_payload - _SPRITE_HEADER_SIZE - num_colors * 3) * 8
+    rows = available_bits // (width * bpp)
+    if rows < 1:
+        raise ValueError(f"A {width}px row of {num_colors} colours doesn't fit in {max_payload} bytes")
+    return rows
+
+def convert_image(image: Image.Image, max_size: tuple[int, int] = (DISPLAY_WIDTH, DISPLAY_HEIGHT),
+                  num_colors: int = 16, dither: str | None = 'ordered', palette: str = 'adaptive',
+                  max_payload: int = 240, progressive_render: bool = True) -> SpriteConversion:
+    """
+    Convert an image into Frame sprite messages.
+
+    Args:
+        image: Any Pillow image (e.g. a decoded camera photo)
+        max_size: The image is scaled down to fit within this (width, height), and to
+            max_strip_width() so every strip fits in one packet
+        num_colors: Palette size: 2, 4 or 16 (1, 2 or 4 bits per pixel)
+        dither: 'ordered' (Bayer, vectorized), 'floyd-steinberg', or None
+        palette: 'adaptive' (k-means on the image) or 'grey' (fixed ramp)
+        max_payload: Largest message payload that fits in one packet
+            (frame.max_data_payload() less the message header)
+        progressive_render: Whether Frame should draw strips as they arrive
+
+    Returns:
+        SpriteConversion: The sprite and its packed messages
+    """
+    if num_colors not in _BITS_PER_PIXEL:
+        raise ValueError(f"num_colors must be 2, 4 or 16: {num_colors}")
+
+    max_width = max_strip_width(_BITS_PER_PIXEL[num_colors], num_colors, max_payload)
+    max_size = (min(max_size[0], DISPLAY_WIDTH, max_width), min(max_size[1], DISPLAY_HEIGHT))
+    # let the JPEG decoder scale down by a power of two while decoding, which is much cheaper
+    image.draft('RGB', max_size)
+    image = image.convert('RGB')
+    if image.width > max_size[0] or image.height > max_size[1]:
+        image.thumbnail(max_size, Image.Resampling.BILINEAR)
+
+    pixels = np.asarray(image, dtype=np.float32)
+    colors = grey_palette(num_colors) if palette == 'grey' else adaptive_palette(pixels, num_colors)
+    if dither == 'floyd-steinberg':
+        indices = floyd_steinberg_dither(image, colors)
+    elif dither == 'ordered':
+        indices = ordered_dither(pixels, colors)
+    else:
+        indices = nearest_palette_indices(pixels, colors)
+
+    sprite = PackedTxSprite(
+        width=image.width,
+        height=image.height,
+        num_colors=num_colors,
+        palette_data=colors.tobytes(),
+        pixel_data=indices.tobytes(),
+    )
+    line_height = strip_line_height(sprite.width, sprite.bpp, num_colors, max_payload)
+    block = TxImageSpriteBlock(sprite, sprite_line_height=line_height, progressive_render=progressive_render)
+    messages = [block.pack()] + [
+        PackedTxSprite(line.width, line.height, line.num_colors, line.palette_data, line.pixel_data).pack()
+        for line in block.sprite_lines
+    ]
+    return SpriteConversion(sprite=sprite, line_height=line_height, messages=messages)
+
+class SpriteConverter:
+    """
+    convert_image() with a cache of recent results keyed by a hash of the image content
+    and the conversion settings, so icons and repeated frames are converted once.
+    """
+
+    def __init__(self, max_entries: int = 32, **settings):
+        """
+        Args:
+            max_entries: Conversions kept, least recently used dropped first
+            **settings: Default keyword arguments for convert_image()
+        """
+        self.max_entries = max_entries
+        self.settings = settings
+        self._cache: OrderedDict[str, SpriteConversion] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _content_hash(image: Image.Image | bytes | np.ndarray, settings: dict) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        if isinstance(image, bytes):
+            digest.update(image)
+        elif isinstance(image, np.ndarray):
+            digest.update(repr((image.shape, image.dtype.str)).encode())
+            digest.update(np.ascontiguousarray(image).tobytes())
+        else:
+            digest.update(repr((image.mode, image.size)).encode())
+            digest.update(image.tobytes())
+        digest.update(repr(sorted(settings.items())).encode())
+        return digest.hexdigest()
+
+    def convert(self, image: Image.Image | bytes | np.ndarray, **settings) -> SpriteConversion:
+        """
+        Convert an image, or return the cached conversion of identical content.
+
+        Args:
+            image: A Pillow image, encoded image bytes (e.g. a JPEG from RxPhoto) or an RGB array
+            **settings: Overrides of the converter's convert_image() settings
+
+        Returns:
+            SpriteConversion: The sprite and its packed messages
+        """
+        settings = {**self.settings, **settings}
+        key = self._content_hash(image, settings)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        if isinstance(image, bytes):
+            image = Image.open(io.BytesIO(image))
+        elif isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        conversion = convert_image(image, **settings)
+
+        self._cache[key] = conversion
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return conversion
+
+async def send_sprite(frame, conversion: SpriteConversion, msg_code: int = SPRITE_CHANNEL) -> bool:
+    """
+    Send a converted image to a Frameside image_sprite_block parser.
+
+    Returns:
+        bool: True if every message was sent successfully
+    """
+    for message in conversion.messages:
+        if not await safe_send_message(frame, msg_code, message):
+            return False
+    return True
+
+def max_sprite_payload(frame) -> int:
+    """The max_payload to convert images with for this connection."""
+    return frame.max_data_payload() - MESSAGE_HEADER_SIZE
@@ -0,0 +1,194 @@
+import asyncio
+import importlib.util
+import multiprocessing
+import time
+import wave
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from utils.audio_utils import transcribe_audio
+
+# Clips up to this long are transcribed locally when a local engine is available;
+# for short clips the cloud round trip costs more than the local compute
+LOCAL_MAX_CLIP_SECONDS = 8.0
+
+# After a cloud request fails to connect, stay local for this long before trying again
+OFFLINE_RETRY_SECONDS = 60.0
+
+def clip_duration(audio_file_path: str | Path) -> float:
+    """Length of a WAV file in seconds."""
+    with wave.open(str(audio_file_path), 'rb') as wav_file:
+        return wav_file.getnframes() / wav_file.getframerate()
+
+class TranscriptionBackend(ABC):
+    """
+    Interface for speech-to-text engines: transcribe a WAV file to text.
+    """
+    name = "backend"
+
+    def available(self) -> bool:
+        """Whether the engine can be used at all (e.g. its optional dependency is installed)."""
+        return True
+
+    async def start(self) -> None:
+        """Load whatever the engine needs ahead of the first clip."""
+
+    @abstractmethod
+    async def transcribe(self, audio_file_path: str | Path) -> str:
+        """Transcribe a WAV file to text."""
+
+    async def close(self) -> None:
+        """Release the engine's resources."""
+
+class CloudTranscriber(TranscriptionBackend):
+    """
+    OpenAI Whisper over the network (whisper-1).
+    """
+    name = "cloud"
+
+    async def transcribe(self, audio_file_path: str | Path) -> str:
+        return await transcribe_audio(audio_file_path)
+
+# The model loaded in each worker process of LocalTranscriber's pool
+_worker_model = None
+
+def _load_worker_model(model_size: str, compute_type: str, cpu_threads: int) -> None:
+    """Process pool initializer: load the model once per worker."""
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_size, device='cpu', compute_type=compute_type, cpu_threads=cpu_threads)
+
+def _worker_ready() -> bool:
+    return _worker_model is not None
+
+def _worker_transcribe(audio_file_path: str, language: str | None) -> str:
+    # greedy decoding: for short spoken questions beam search costs time without helping much
+    segments, _ = _worker_model.transcribe(audio_file_path, language=language, beam_size=1, vad_filter=True)
+    return ' '.join(segment.text.strip() for segment in segments)
+
+class LocalTranscriber(TranscriptionBackend):
+    """
+    Whisper on the CPU with faster-whisper, in a persistent pool of worker processes.
+
+    Each worker loads the model once when the pool starts, so a clip only pays for
+    inference, and inference runs outside the event loop's process (and GIL).
+    faster-whisper is optional: install it with `pip install faster-whisper`.
+    """
+    name = "local"
+
+    def __init__(self, model_size: str = 'base.en', workers: int = 1, compute_type: str = 'int8',
+                 cpu_threads: int = 4, language: str | None = 'en'):
+        """
+        Args:
+            model_size: faster-whisper model name or path, e.g. 'tiny.en', 'base.en', 'small'
+            workers: Worker processes, each holding its own copy of the model
+            compute_type: CTranslate2 quantization, e.g. 'int8' or 'float32'
+            cpu_threads: Inference threads per worker
+            language: Language of the speech, or None to detect it per clip
+        """
+        self.model_size = model_size
+        self.workers = workers
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.language = language
+        self._pool = None
+
+    def available(self) -> bool:
+        return importlib.util.find_spec('faster_whisper') is not None
+
+    async def start(self) -> None:
+        if self._pool is not None:
+            return
+        # spawn rather than fork: the parent has an event loop and Bluetooth threads running
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_load_worker_model,
+            initargs=(self.model_size, self.compute_type, self.cpu_threads),
+        )
+        # workers are started on demand, so give every one a job to load its model now
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _worker_ready) for _ in range(self.workers)))
+
+    async def transcribe(self, audio_file_path: str | Path) -> str:
+        await self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _worker_transcribe, str(audio_file_path), self.language)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+class TranscriptionRouter(TranscriptionBackend):
+    """
+    Sends each clip to the local or the cloud engine.
+
+    Short clips go to the local engine, since for them the network round trip dominates,
+    and so does everything once a cloud request has failed to connect (for the next
+    OFFLINE_RETRY_SECONDS). Longer clips go to the cloud. Without a usable local engine
+    everything goes to the cloud.
+    """
+    name = "router"
+
+    def __init__(self, local: TranscriptionBackend | None = None, cloud: TranscriptionBackend | None = None,
+                 max_local_seconds: float = LOCAL_MAX_CLIP_SECONDS):
+        """
+        Args:
+            local: The on-device engine, e.g. a LocalTranscriber
+            cloud: The network engine, defaults to CloudTranscriber
+            max_local_seconds: Longest clip sent to the local engine while online
+        """
+        self.local = local if local is not None and local.available() else None
+        self.cloud = cloud or CloudTranscriber()
+        self.max_local_seconds = max_local_seconds
+        self._offline_until = 0.0
+
+    @property
+    def online(self) -> bool:
+        """False for a while after a cloud request has failed to connect."""
+        return time.monotonic() >= self._offline_until
+
+    def choose(self, audio_file_path: str | Path) -> TranscriptionBackend:
+        """The backend that would transcribe this clip now."""
+        if self.local is None:
+            return self.cloud
+        if not self.online or clip_duration(audio_file_path) <= self.max_local_seconds:
+            return self.local
+        return self.cloud
+
+    async def start(self) -> None:
+        if self.local is None:
+            return
+        try:
+            await self.local.start()
+        except Exception as e:
+            print(f"Error loading local transcription model, using the cloud only: {e}")
+            await self.local.close()
+            self.local = None
+
+    async def transcribe(self, audio_file_path: str | Path) -> str:
+        backend = self.choose(audio_file_path)
+        if backend is self.local:
+            print(f"Transcribing locally ({'short clip' if self.online else 'offline'})")
+            return await backend.transcribe(audio_file_path)
+
+        try:
+            return await backend.transcribe(audio_file_path)
+        except Exception as e:
+            if self.local is None or not _is_connection_error(e):
+                raise
+            self._offline_until = time.monotonic() + OFFLINE_RETRY_SECONDS
+            print("Transcription service unreachable, transcribing locally")
+            return await self.local.transcribe(audio_file_path)
+
+    async def close(self) -> None:
+        if self.local is not None:
+            await self.local.close()
+
+def _is_connection_error(error: Exception) -> bool:
+    """Whether a cloud request failed because the service couldn't be reached."""
+    import httpx
+    import openai
+    return isinstance(error, (openai.APIConnectionError, httpx.TransportError, ConnectionError))
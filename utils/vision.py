@@ -0,0 +1,153 @@
+import asyncio
+import base64
+import io
+import weakref
+
+from frame_msg import TxCaptureSettings
+from PIL import Image
+
+# msg_code the Frameside camera.parse_capture_settings parser is registered under
+CAPTURE_SETTINGS_CHANNEL = 0x0d
+
+# A photo can't be taken and sent this soon after it is requested, so one arriving within
+# this long of a capture starting is left to an abandoned capture still waiting for its own
+ORPHAN_GRACE_SECONDS = 0.5
+
+def prepare_image_for_model(jpeg_bytes: bytes, max_size: int = 512, quality: int = 80, upright: bool = True) -> str:
+    """
+    Downscale and re-encode a Frame photo for a vision model request.
+
+    This is CPU-bound Pillow work, so call it from a worker thread or a WorkerPool.
+
+    Args:
+        jpeg_bytes: JPEG straight from RxPhoto (with upright=False), or any bytes-like view of it
+        max_size: Longest side of the image sent to the model, in pixels
+        quality: JPEG quality of the re-encoded image
+        upright: Whether to rotate the image to correct for the sensor orientation
+
+    Returns:
+        str: A base64 JPEG data URL ready for an image_url message part
+    """
+    image = Image.open(io.BytesIO(jpeg_bytes))
+    # let the JPEG decoder scale down by a power of two while decoding, which is much cheaper
+    image.draft('RGB', (max_size, max_size))
+    if upright:
+        image = image.transpose(Image.ROTATE_90)
+    image.thumbnail((max_size, max_size), Image.Resampling.BILINEAR)
+
+    output = io.BytesIO()
+    image.convert('RGB').save(output, format='JPEG', quality=quality)
+    return 'data:image/jpeg;base64,' + base64.b64encode(output.getvalue()).decode('ascii')
+
+class PhotoCapture:
+    """
+    A photo requested at the start of a recording and prepared while the user speaks.
+
+    Sending capture_message() to Frame triggers the photo; start() then waits for the
+    JPEG on the RxPhoto queue and prepares it for the model in a worker thread (or a
+    worker process of pool), so result() is usually ready by the time the transcript lands.
+    """
+
+    # Cancelled captures still waiting for their photo, by the queue they wait on
+    _abandoned: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def __init__(self, photo_queue: asyncio.Queue, resolution: int = 720, quality_index: int = 4,
+                 max_size: int = 512, timeout: float = 15.0, policy=None, latency_budget: float | None = None,
+                 pool=None):
+        """
+        Args:
+            photo_queue: Queue from an RxPhoto attached with upright=False
+            resolution: Capture resolution requested from Frame
+            quality_index: Capture JPEG quality index (0-4, VERY_LOW to VERY_HIGH)
+            max_size: Longest side of the image sent to the model, in pixels
+            timeout: Seconds to wait for the photo to arrive
+            policy: Optional CapturePolicy that picks resolution and quality instead
+                (the queue should then come from its TimedRxPhoto)
+            latency_budget: Target seconds for the photo to arrive, used with the policy
+            pool: Optional WorkerPool to prepare the photo in, sharing the JPEG rather than copying it
+        """
+        self.photo_queue = photo_queue
+        self.resolution = resolution
+        self.quality_index = quality_index
+        self.max_size = max_size
+        self.timeout = timeout
+        self.policy = policy
+        self.latency_budget = latency_budget
+        self.pool = pool
+        self._task: asyncio.Task | None = None
+        self._cancelled = False
+        self._received = False
+
+    def capture_message(self) -> tuple[int, bytes]:
+        """The (msg_code, payload) pair that asks Frame to take the photo."""
+        if self.policy is not None:
+            settings = self.policy.capture_settings(self.latency_budget)
+            self.resolution, self.quality_index = settings.resolution, settings.quality_index
+        else:
+            settings = TxCaptureSettings(resolution=self.resolution, quality_index=self.quality_index)
+        return CAPTURE_SETTINGS_CHANNEL, settings.pack()
+
+    def start(self) -> None:
+        """Start receiving and preparing the photo in the background."""
+        # photos arrive in the order they were requested, so one still owed to an abandoned
+        # capture comes first - unless it was lost, so only wait a little longer for it
+        for abandoned in self._abandoned.get(self.photo_queue, ()):
+            abandoned._give_up_after(ORPHAN_GRACE_SECONDS)
+        self._task = asyncio.create_task(self._receive_and_prepare())
+
+    async def _receive_and_prepare(self) -> str | None:
+        jpeg_bytes = await asyncio.wait_for(self.photo_queue.get(), timeout=self.timeout)
+        self._received = True
+        if self._cancelled:
+            return None
+        if self.pool is not None:
+            return await self.pool.submit(prepare_image_for_model, jpeg_bytes, self.max_size)
+        return await asyncio.to_thread(prepare_image_for_model, jpeg_bytes, self.max_size)
+
+    async def result(self) -> str | None:
+        """
+        Wait for the prepared image.
+
+        Returns:
+            str | None: The image data URL, or None if the photo never arrived or failed to decode
+        """
+        if self._task is None:
+            return None
+        try:
+            return await self._task
+        except Exception as e:
+            print(f"Error capturing photo: {e}")
+            return None
+
+    def cancel(self) -> None:
+        """
+        Give up on the photo.
+
+        Frame still sends a photo that has been requested, so until it arrives it is
+        waited for and dropped, rather than left on the queue for the next capture.
+        Once the next capture starts it is only waited for ORPHAN_GRACE_SECONDS longer,
+        in case it was lost and the next photo to arrive is the new capture's own.
+        """
+        self._cancelled = True
+        if self._task is None:
+            return
+        if self._received:
+            self._task.cancel()
+        else:
+            abandoned = self._abandoned.setdefault(self.photo_queue, set())
+            abandoned.add(self)
+            self._task.add_done_callback(lambda task: self._dropped(abandoned, task))
+
+    def _dropped(self, abandoned: set, task: asyncio.Task) -> None:
+        """Done callback of an abandoned capture's task."""
+        abandoned.discard(self)
+        # nobody awaits result() any more, so retrieve a timeout here
+        if not task.cancelled():
+            task.exception()
+
+    def _give_up_after(self, delay: float) -> None:
+        """Stop waiting for an abandoned capture's photo if it hasn't arrived within delay seconds."""
+        def give_up():
+            if not self._received:
+                self._task.cancel()
+        asyncio.get_running_loop().call_later(delay, give_up)
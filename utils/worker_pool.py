@@ -0,0 +1,274 @@
+import asyncio
+import itertools
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from utils.shared_ring import SharedRing
+
+# Shared memory per worker for payloads in each direction: 10s of 16kHz/16-bit audio is
+# 320 kB and a Frame photo at most a few hundred, so several jobs fit in flight
+RING_BYTES = 4 * 1024 * 1024
+
+# Worker processes for CPU-heavy jobs; the event loop's process keeps the Bluetooth link
+WORKERS = 2
+
+# Seconds a worker gets to exit after being asked before it's terminated
+SHUTDOWN_TIMEOUT = 2.0
+
+# Workers that may be started to replace ones that died; after that, jobs without a
+# live worker run in a thread of this process, so a job that keeps crashing its worker
+# can't keep the pool spawning processes
+RESTART_LIMIT = 4
+
+def _send_result(conn, results: SharedRing, job_id: int, result: Any) -> None:
+    """Reply with a job's result, through the result ring if it's bytes or text and fits."""
+    kind = 'text' if isinstance(result, str) else 'bytes'
+    data = result.encode('utf-8') if kind == 'text' else result
+    if isinstance(data, (bytes, bytearray, memoryview)) and len(data) <= results.capacity:
+        block = results.put(data)
+        if block is not None:
+            conn.send((job_id, kind, block))
+            return
+    # anything else, or a ring the host hasn't drained, is pickled through the pipe instead
+    conn.send((job_id, 'object', result))
+
+def _worker_main(conn, job_ring_name: str, result_ring_name: str) -> None:
+    """Worker process: run jobs from the pipe on payloads in the job ring until told to stop."""
+    jobs = SharedRing(name=job_ring_name)
+    results = SharedRing(name=result_ring_name)
+    conn.send((0, 'ready', None))
+    try:
+        while (message := conn.recv()) is not None:
+            job_id, function, args, block, inline = message
+            payload = jobs.view(block[0], block[1]) if inline is None else memoryview(inline)
+            try:
+                result = function(payload, *args)
+            except Exception as e:
+                conn.send((job_id, 'error', f"{type(e).__name__}: {e}"))
+                continue
+            finally:
+                del payload
+                if inline is None:
+                    # the job has finished reading its payload, so the host can reuse the space
+                    jobs.release(block[2])
+            _send_result(conn, results, job_id, result)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        jobs.close()
+        results.close()
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Any
+    jobs: SharedRing
+    results: SharedRing
+    ready: asyncio.Future
+    pending: dict[int, asyncio.Future] = field(default_factory=dict)
+    space: asyncio.Event = field(default_factory=asyncio.Event)
+
+class WorkerPool:
+    """
+    Runs CPU-heavy jobs (audio conversion, JPEG decoding, image rasterization) in worker
+    processes, so they can't hold up Bluetooth traffic in the event loop's process.
+
+    Each job's payload, e.g. a recording or a photo, is written once into a shared memory
+    ring (see utils/shared_ring.py) that the worker reads in place, and the worker writes
+    bytes or text results into a second ring; only the job's function reference, its small
+    arguments and block offsets are pickled over the pipe. The pipes are watched by the
+    event loop, so waiting for a result costs no thread.
+
+    A worker that dies fails the jobs it was running and is replaced (up to RESTART_LIMIT
+    times); with no live worker left, jobs run in a thread instead.
+    """
+
+    def __init__(self, workers: int = WORKERS, ring_bytes: int = RING_BYTES):
+        """
+        Args:
+            workers: Worker processes to start
+            ring_bytes: Shared memory per worker for payloads, and again for results
+        """
+        self.workers = workers
+        self.ring_bytes = ring_bytes
+        self._workers: list[_Worker] = []
+        self._ids = itertools.count(1)
+        self._started = False
+
+        # statistics
+        self.jobs = 0
+        self.bytes_shared = 0
+        self.copied = 0
+        self.restarts = 0
+        self.inline = 0
+
+    async def start(self) -> None:
+        """Start the workers and wait until each is ready for jobs."""
+        if self._started:
+            return
+        self._started = True
+        for _ in range(self.workers):
+            self._spawn()
+        await asyncio.gather(*(worker.ready for worker in self._workers))
+
+    def _spawn(self) -> _Worker:
+        """Start a worker process and watch its pipe."""
+        loop = asyncio.get_running_loop()
+        # spawn rather than fork: the parent has an event loop and Bluetooth threads running
+        context = multiprocessing.get_context('spawn')
+        jobs = SharedRing(self.ring_bytes)
+        results = SharedRing(self.ring_bytes)
+        conn, child_conn = context.Pipe()
+        process = context.Process(target=_worker_main, args=(child_conn, jobs.name, results.name), daemon=True)
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, conn, jobs, results, loop.create_future())
+        # only start() waits for readiness, so don't leave a replacement's startup failure unretrieved
+        worker.ready.add_done_callback(lambda ready: ready.cancelled() or ready.exception())
+        loop.add_reader(conn.fileno(), self._on_readable, worker)
+        self._workers.append(worker)
+        return worker
+
+    def _live_worker(self) -> _Worker | None:
+        """The least busy worker whose process is still running, or None if there isn't one."""
+        for worker in [worker for worker in self._workers if not worker.process.is_alive()]:
+            self._fail(worker, RuntimeError("Worker process exited"))
+        if not self._workers:
+            return None
+        return min(self._workers, key=lambda candidate: len(candidate.pending))
+
+    async def submit(self, function: Callable[..., Any], payload, *args) -> Any:
+        """
+        Run function(payload, *args) in the least busy worker.
+
+        Args:
+            function: A module-level function taking the payload as a memoryview first
+                (it's pickled by reference); it must not keep the memoryview
+            payload: Bytes-like payload, shared with the worker without pickling
+            *args: Small extra arguments, pickled
+
+        Returns:
+            The function's result: bytes and text come back through shared memory
+
+        Raises:
+            RuntimeError: If the function raised, or its worker died
+        """
+        await self.start()
+        size = memoryview(payload).nbytes
+        block, inline = None, None
+        while True:
+            worker = self._live_worker()
+            if worker is None:
+                return await self._run_inline(function, payload, *args)
+            if size > worker.jobs.capacity:
+                inline = bytes(payload)
+                self.copied += 1
+                break
+            if (block := worker.jobs.put(payload)) is not None:
+                self.bytes_shared += size
+                break
+            # wait for earlier jobs to free space rather than copying through the pipe
+            # (or for the worker to die, when another one is picked)
+            worker.space.clear()
+            await worker.space.wait()
+
+        job_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        worker.pending[job_id] = future
+        try:
+            worker.conn.send((job_id, function, args, block, inline))
+        except OSError:
+            self._fail(worker, RuntimeError("Worker process exited"))
+        self.jobs += 1
+        return await future
+
+    async def _run_inline(self, function: Callable[..., Any], payload, *args) -> Any:
+        """Run a job in a thread of this process, for when no worker is left."""
+        self.inline += 1
+        try:
+            return await asyncio.to_thread(function, memoryview(payload), *args)
+        except Exception as e:
+            raise RuntimeError(f"{type(e).__name__}: {e}") from e
+
+    def _on_readable(self, worker: _Worker) -> None:
+        try:
+            while worker.conn.poll():
+                job_id, kind, value = worker.conn.recv()
+                if kind == 'ready':
+                    worker.ready.set_result(None)
+                    continue
+
+                if kind in ('bytes', 'text'):
+                    offset, size, end = value
+                    view = worker.results.view(offset, size)
+                    result = str(view, 'utf-8') if kind == 'text' else bytes(view)
+                    view.release()
+                    worker.results.release(end)
+                elif kind == 'object':
+                    result = value
+                    self.copied += 1
+
+                future = worker.pending.pop(job_id)
+                # the worker released the job's payload before replying
+                worker.space.set()
+                if future.done():
+                    continue
+                if kind == 'error':
+                    future.set_exception(RuntimeError(value))
+                else:
+                    future.set_result(result)
+        except (EOFError, OSError):
+            self._fail(worker, RuntimeError("Worker process exited"))
+
+    def _fail(self, worker: _Worker, error: Exception) -> None:
+        """Fail whatever a dead worker was working on, drop it, and start a replacement."""
+        if worker not in self._workers:
+            return
+        self._workers.remove(worker)
+        print(f"Worker process {worker.process.pid} exited, failing {len(worker.pending)} jobs")
+        asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+        for future in [worker.ready, *worker.pending.values()]:
+            if not future.done():
+                future.set_exception(error)
+        worker.pending.clear()
+        worker.space.set()
+
+        worker.process.join(0)
+        worker.conn.close()
+        worker.jobs.close(unlink=True)
+        worker.results.close(unlink=True)
+
+        if self.restarts < RESTART_LIMIT:
+            self.restarts += 1
+            self._spawn()
+
+    async def close(self) -> None:
+        """Stop the workers and free the shared memory."""
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            loop.remove_reader(worker.conn.fileno())
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, SHUTDOWN_TIMEOUT)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            for future in [worker.ready, *worker.pending.values()]:
+                if not future.done():
+                    future.cancel()
+            worker.conn.close()
+            worker.jobs.close(unlink=True)
+            worker.results.close(unlink=True)
+        self._workers.clear()
+        self._started = False
+
+    def report(self) -> str:
+        """Jobs run and how their payloads travelled."""
+        report = (f"{self.jobs} jobs in {self.workers} workers, {self.bytes_shared / 1e6:.1f} MB shared, "
+                  f"{self.copied} payloads or results copied through a pipe")
+        if self.restarts or self.inline:
+            report += f", {self.restarts} workers restarted, {self.inline} jobs run in-process"
+        return report